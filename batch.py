@@ -0,0 +1,269 @@
+# batch.py
+# -----------------------------------------------------------------------------
+# Batched move selection for offline work: self-play, replay regression and
+# analysis over many game states.
+#
+# choose_moves(game_states) returns the same MoveResponses as calling
+# move.choose_move on each state in turn. Boards are grouped by size and
+# stacked into NumPy arrays, one row per board and one column per cell. The
+# whole-board passes of the planner then run once per group:
+#   - legal-move masks,
+#   - the threat model's arrival waves and danger levels (threats.py),
+#   - the areas next to each head and the timed flood that sizes each first
+#     step (planner.directional_spaces),
+#   - the BFS from each head (distances.DistanceOracle).
+# Every flood is a BFS over all boards at once: each wave gathers the
+# neighbours of the current frontier of every board in one indexing step.
+#
+# The rest of the cascade (food, doors, centres, space delta) then runs per
+# board on those results, in request order.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from board import Board, decode
+from distances import DistanceOracle
+from grid import Components, Grid
+from move import ENGINE, _respond, planner_move
+from threats import DEADLY, EQUAL, LONGER, SHORTER, TIE, US
+from utils import MoveResponse
+
+NEVER = np.iinfo(np.int32).max
+
+
+def choose_moves(game_states: Sequence[dict | Board], engine: Optional[str] = None) -> List[MoveResponse]:
+    """move.choose_move for every state (no sessions), with the planner's board passes batched."""
+    boards = [gs if isinstance(gs, Board) else decode(gs) for gs in game_states]
+    groups: Dict[Tuple[int, int], List[int]] = {}
+    for k, b in enumerate(boards):
+        groups.setdefault((b.width, b.height), []).append(k)
+
+    precomputed: List[dict] = [{}] * len(boards)
+    for members in groups.values():
+        for k, pre in zip(members, precompute([boards[k] for k in members])):
+            precomputed[k] = pre
+
+    return [_respond(b, None, planner_move(b, **pre), engine or ENGINE) for b, pre in zip(boards, precomputed)]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Stacked board passes
+# ──────────────────────────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=None)
+def _directions(width: int, height: int) -> np.ndarray:
+    """(size, 4) neighbours in grid.Grid order ((x - 1), (x + 1), (y - 1), (y + 1)), -1 off the board."""
+    x, y = np.divmod(np.arange(width * height), height)
+    i = x * height + y
+    return np.stack([
+        np.where(x > 0, i - height, -1),
+        np.where(x + 1 < width, i + height, -1),
+        np.where(y > 0, i - 1, -1),
+        np.where(y + 1 < height, i + 1, -1),
+    ], axis=1)
+
+
+def _waves(directions: np.ndarray, rows: int, seeds: np.ndarray, free: Optional[np.ndarray] = None,
+           vacate: Optional[np.ndarray] = None, start: int = 0) -> np.ndarray:
+    """
+    BFS from `seeds` over `rows` stacked boards at once (cell c of row r is
+    r * size + c); returns the distance to every cell (-1 where unreached).
+    Seeds are expanded whatever their state. A cell is entered if `free`,
+    or, with `vacate`, once vacate[cell] <= start + distance (as in
+    grid.timed_flood). Both arrays have one extra cell at the end, which
+    missing neighbours point to and which must never be enterable.
+    """
+    size = len(directions)
+    outside = rows * size
+    dist = np.full(outside + 1, -1, np.int32)
+    claim = np.empty(outside + 1, np.int64)
+    dist[seeds] = 0
+    frontier = seeds
+    d = 0
+    while frontier.size:
+        d += 1
+        cell = frontier % size
+        step = directions[cell]
+        cand = np.where(step >= 0, step + (frontier - cell)[:, None], outside).ravel()
+        ok = dist[cand] < 0
+        ok &= free[cand] if vacate is None else vacate[cand] <= start + d
+        cells = cand[ok]
+        # Keep each cell once: writing the positions back to front leaves the
+        # first one standing (last write wins)
+        at = np.arange(len(cells))
+        claim[cells[::-1]] = at[::-1]
+        cells = cells[claim[cells] == at]
+        dist[cells] = d
+        frontier = cells
+    return dist
+
+
+def precompute(boards: Sequence[Board]) -> List[dict]:
+    """
+    planner.choose_from_board's `oracle`, `legal`, `danger` and `spaces` for
+    boards of one size, in order.
+    """
+    grid: Grid = boards[0].grid
+    n, size = len(boards), grid.size
+    directions = _directions(grid.width, grid.height)
+    rows = np.arange(n)
+    heads = np.array([b.you.head for b in boards])
+
+    mask = np.frombuffer(b"".join(b.occupied for b in boards), np.uint8).reshape(n, size) > 0
+    mask[rows, heads] = False
+    vacate = np.array([b.vacate for b in boards], np.int32)
+
+    step = directions[heads]
+    legal = (step >= 0) & ~mask[rows[:, None], np.maximum(step, 0)]
+
+    danger = _danger(boards, directions, mask)
+
+    # BFS from every head over its planner mask
+    free = np.append(~mask.ravel(), False)
+    dist = _waves(directions, n, rows * size + heads, free)[:-1].reshape(n, size)
+
+    # Areas next to each head: one labelling wave per first step, in
+    # neighbour order, each skipping steps an earlier wave already reached
+    without_head = mask.copy()
+    without_head[rows, heads] = True
+    free = np.append(~without_head.ravel(), False)
+    area = np.full(n * size + 1, -1, np.int8)
+    for k in range(4):
+        seeds = rows * size + np.maximum(step[:, k], 0)
+        seeds = seeds[legal[:, k] & (area[seeds] < 0)]
+        if seeds.size:
+            reached = _waves(directions, n, seeds, free)
+            area[reached >= 0] = k
+    area = area[:-1].reshape(n, size)
+
+    # Timed space behind every first step, one stacked board per (board, step)
+    timed = np.append(np.repeat(vacate, 4, axis=0).ravel(), NEVER)
+    seeds = (rows[:, None] * 4 + np.arange(4)) * size + np.maximum(step, 0)
+    reached = _waves(directions, 4 * n, seeds[legal], vacate=timed, start=1)
+    space = (reached[:-1] >= 0).reshape(n, 4, size).sum(axis=2)
+
+    # Centres of every area next to a head, sweeping all of them in step
+    regions = [(j, k) for j in range(n) for k in range(4) if (area[j] == k).any()]
+    centres = dict(zip(regions, _centres(directions, without_head, area, regions)))
+
+    out = []
+    for j, b in enumerate(boards):
+        oracle = DistanceOracle(grid, bytearray(mask[j].tobytes()))
+        oracle.preload(b.you.head, dist[j].tolist())
+        cells = [int(c) for c in step[j][legal[j]]]
+        spaces = _spaces(size, cells, [int(k) for k in np.flatnonzero(legal[j])], area[j], space[j])
+        out.append({
+            "oracle": oracle,
+            "legal": cells,
+            "danger": bytearray(danger[j].tobytes()),
+            "spaces": spaces,
+            "area_centres": {spaces[1][c]: centres[j, int(area[j, c])] for c in cells},
+        })
+    return out
+
+
+def _danger(boards: Sequence[Board], directions: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """threats.ThreatModel(...).danger of every board: four arrival layers per board, one BFS."""
+    n, size = mask.shape
+    seeds = []
+    for j, b in enumerate(boards):
+        base = 4 * j
+        mine = b.you.length
+        for o in b.opponents:
+            group = LONGER if o.length > mine else EQUAL if o.length == mine else SHORTER
+            seeds.append((base + group) * size + o.head)
+        seeds.append((base + US) * size + b.you.head)
+    free = np.append(np.repeat(~mask, 4, axis=0).ravel(), False)
+    arrival = _waves(directions, 4 * n, np.unique(seeds), free)
+    arrival = arrival[:-1].reshape(n, 4, size)
+
+    us = arrival[:, US]
+    reached = us >= 0
+    longer, equal = arrival[:, LONGER], arrival[:, EQUAL]
+    deadly = reached & (longer >= 0) & (longer <= us)
+    tie = reached & ~deadly & (equal >= 0) & (equal <= us)
+    return np.where(deadly, DEADLY, np.where(tie, TIE, 0)).astype(np.uint8)
+
+
+def _spaces(size: int, cells: List[int], slots: List[int], area: np.ndarray,
+            space: np.ndarray) -> Tuple[Dict[int, int], Dict[int, int], Components]:
+    """
+    directional_spaces' result from the stacked passes. The Components hold
+    only the areas next to the head (all the planner looks at), numbered in
+    neighbour order; every other cell is labelled -1.
+    """
+    labels = np.full(size, -1, np.int64)
+    sizes: List[int] = []
+    starts: List[int] = []
+    order: List[int] = []
+    size_by_n: Dict[int, int] = {}
+    comp_by_n: Dict[int, int] = {}
+    ids: Dict[int, int] = {}
+    for c, k in zip(cells, slots):
+        a = int(area[c])
+        if a not in ids:
+            members = np.flatnonzero(area == a)
+            ids[a] = len(sizes)
+            labels[members] = ids[a]
+            starts.append(len(order))
+            sizes.append(len(members))
+            order += members.tolist()
+        comp_by_n[c] = ids[a]
+        size_by_n[c] = int(space[k])
+    return size_by_n, comp_by_n, Components(labels.tolist(), sizes, order, starts)
+
+
+def _centres(directions: np.ndarray, blocked: np.ndarray, area: np.ndarray, regions: List[Tuple[int, int]],
+             exact_limit: int = 150, max_sweeps: int = 12) -> List[List[int]]:
+    """
+    grid.centre_cells of every region (board j, cells labelled k in `area`),
+    sweeping all regions in step: each round picks every unfinished region's
+    next sweep source exactly as centre_cells would and runs those BFSes as
+    one batch.
+    """
+    if not regions:
+        return []
+    size = len(directions)
+    board = np.array([j for j, _ in regions])
+    member = area[board] == np.array([k for _, k in regions])[:, None]
+    count = member.sum(axis=1)
+    big = np.int64(10**9)
+    lo = np.zeros(member.shape, np.int64)
+    hi = np.full(member.shape, big, np.int64)
+    cand = member.copy()
+    budget = np.where(count <= exact_limit, np.iinfo(np.int64).max, max_sweeps)
+    sweeps = np.zeros(len(regions), np.int64)
+    live = count > 1
+
+    while True:
+        unresolved = cand & (lo != hi)
+        live &= unresolved.any(axis=1) & (sweeps < budget)
+        act = np.flatnonzero(live)
+        if not act.size:
+            break
+        un = unresolved[act]
+        by_lo = np.where(un, lo[act], big + 1).argmin(axis=1)
+        by_hi = np.where(un, hi[act], -1).argmax(axis=1)
+        source = np.where(sweeps[act] % 2 == 0, by_lo, by_hi)
+        sweeps[act] += 1
+
+        free = np.append(~blocked[board[act]].ravel(), False)
+        dist = _waves(directions, len(act), np.arange(len(act)) * size + source, free)
+        d = dist[:-1].reshape(len(act), size).astype(np.int64)
+        e = np.where(member[act], d, -1).max(axis=1)[:, None]
+        c = cand[act]
+        lo_a = np.where(c, np.maximum(lo[act], np.maximum(d, e - d)), lo[act])
+        hi_a = np.where(c, np.minimum(hi[act], e + d), hi[act])
+        rows = np.arange(len(act))
+        lo_a[rows, source] = hi_a[rows, source] = e[:, 0]
+        best_ub = np.where(c, hi_a, big).min(axis=1)[:, None]
+        lo[act], hi[act] = lo_a, hi_a
+        cand[act] = c & (lo_a <= best_ub)
+
+    best_ub = np.where(cand, hi, big).min(axis=1)[:, None]
+    centre = np.where(count[:, None] > 1, cand & (hi == best_ub), member)
+    return [np.flatnonzero(row).tolist() for row in centre]
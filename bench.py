@@ -0,0 +1,301 @@
+# bench.py
+# -----------------------------------------------------------------------------
+# Offline benchmarks over a corpus of game states.
+#
+# The corpus comes from self-play games (simulate.play_game, every snake
+# driven by the planner) on 7x7 to 25x25 boards with 2 to 8 snakes, sampled
+# from the opening to the end of each game. Every state is tagged with its
+# board size, snake count and stage (by how much of the board is covered).
+#
+# Each state is timed end to end (move.choose_move, no session, so uncached)
+# and phase by phase (decode, mask build, threat model, directional_spaces,
+# trap_door_target, area centre, space_delta_choice). Per state the best of
+# --repeat runs is kept; results are summarised per metric in a JSON file.
+#
+#   python bench.py corpus --out corpus.jsonl          write the corpus
+#   python bench.py run --corpus corpus.jsonl --out base.json
+#   python bench.py compare base.json new.json         exit 1 on regression
+#   python bench.py batch --corpus corpus.jsonl        batch.choose_moves throughput
+#
+# Self-play depends on the planner, so compare runs over one saved corpus.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from typing import Callable, Dict, Iterable, List, Optional
+import argparse
+import hashlib
+import json
+import platform
+import random
+import sys
+import time
+
+import move
+from board import decode
+from distances import DistanceOracle
+from grid import centre_cells
+from planner import directional_spaces, space_delta_cells, trap_door_target
+from rules import to_game_state
+from simulate import play_game
+from threats import ThreatModel
+
+SIZES = (7, 11, 19, 25)
+SNAKE_COUNTS = (2, 4, 6, 8)
+MAX_TURNS = 500
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Corpus
+# ──────────────────────────────────────────────────────────────────────────────
+
+def stage(game_state: dict) -> str:
+    board = game_state["board"]
+    covered = sum(len(s["body"]) for s in board["snakes"]) / (board["width"] * board["height"])
+    return "early" if covered < 0.15 else "mid" if covered < 0.35 else "late"
+
+
+def record_game(size: int, n_snakes: int, rng: random.Random, per_game: int) -> List[dict]:
+    """Play one self-play game; return `per_game` states spread over its length."""
+    seen = []
+
+    def keep(pos, game_id):
+        seen.append(to_game_state(pos, rng.choice(pos.snakes).id, game_id))
+
+    play_game(size, ["planner"] * n_snakes, rng.getrandbits(32), MAX_TURNS, on_turn=keep)
+    if len(seen) > per_game:
+        seen = [seen[round(k * (len(seen) - 1) / (per_game - 1))] for k in range(per_game)]
+    return [{"tags": {"size": size, "snakes": n_snakes, "stage": stage(s)}, "game_state": s} for s in seen]
+
+
+def build_corpus(seed: int = 1, games: int = 1, per_game: int = 8) -> List[dict]:
+    rng = random.Random(seed)
+    corpus = []
+    for size in SIZES:
+        for n in SNAKE_COUNTS:
+            for _ in range(games):
+                corpus.extend(record_game(size, n, rng, per_game))
+    return corpus
+
+
+def load_corpus(path: str) -> List[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_corpus(corpus: Iterable[dict], path: str) -> None:
+    with open(path, "w") as f:
+        for entry in corpus:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def corpus_digest(corpus: List[dict]) -> str:
+    h = hashlib.sha1()
+    for entry in corpus:
+        h.update(json.dumps(entry["game_state"], sort_keys=True).encode())
+    return h.hexdigest()[:12]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Timing
+# ──────────────────────────────────────────────────────────────────────────────
+
+def phases(game_state: dict) -> Dict[str, Callable[[], object]]:
+    """One zero-argument callable per planner phase, set up for this state."""
+    board = decode(game_state)
+    grid, h = board.grid, board.you.head
+    mask = board.mask()
+    legal = [n for n in grid.neighbours[h] if not mask[n]]
+    opponents = [(o.head, o.length) for o in board.opponents]
+    opp = opponents[0] if opponents else None
+    _sizes, comp_by_n, comps = directional_spaces(grid, mask, h)
+    largest = max(comp_by_n.values(), key=lambda k: comps.sizes[k], default=None)
+    without_head = bytearray(mask)
+    without_head[h] = 1
+    # trap_door_target gives up at once on a blocked opponent head, and in
+    # the full mask every head is blocked
+    opp_open = bytearray(mask)
+    if opp:
+        opp_open[opp[0]] = 0
+
+    def area_centre():
+        if largest is None:
+            return None
+        area_oracle = DistanceOracle(grid, without_head)
+        return centre_cells(grid, without_head, comps.cells(largest), distances=area_oracle.distances)
+
+    return {
+        "decode": lambda: decode(game_state),
+        "graph_build": board.mask,
+        "threats": lambda: ThreatModel(grid, mask, h, board.you.length, opponents),
+        "directional_spaces": lambda: directional_spaces(grid, mask, h, board.vacate),
+        "trap_door_target": lambda: opp and trap_door_target(grid, opp_open, h, opp[0], opp[1]),
+        "area_centre": area_centre,
+        "space_delta_choice": lambda: space_delta_cells(grid, bytearray(mask), legal, [o for o, _ in opponents], 1.5,
+                                                        board.vacate),
+    }
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    """Fastest of `repeat` calls, in microseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        fn()
+        t = time.perf_counter_ns() - t0
+        if t < best:
+            best = t
+    return best / 1000.0
+
+
+def summarise(samples: List[float]) -> Dict[str, float]:
+    s = sorted(samples)
+    n = len(s)
+    return {
+        "n": n,
+        "mean_us": round(sum(s) / n, 2),
+        "p50_us": round(s[n // 2], 2),
+        "p95_us": round(s[min(n - 1, int(0.95 * n))], 2),
+        "max_us": round(s[-1], 2),
+    }
+
+
+def run(corpus: List[dict], repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    samples: Dict[str, List[float]] = {}
+
+    def add(name: str, us: float):
+        samples.setdefault(name, []).append(us)
+
+    for entry in corpus:
+        gs, tags = entry["game_state"], entry["tags"]
+        random.seed(0)
+        us = best_of(lambda: move.choose_move(gs), repeat)
+        add("choose_move", us)
+        for tag in ("size", "snakes", "stage"):
+            add(f"choose_move[{tag}={tags[tag]}]", us)
+        for name, fn in phases(gs).items():
+            add(f"phase.{name}", best_of(fn, repeat))
+    return {name: summarise(s) for name, s in sorted(samples.items())}
+
+
+def batch_throughput(corpus: List[dict], batch_sizes: Iterable[int]) -> int:
+    """
+    Boards per second of move.choose_move one state at a time and of
+    batch.choose_moves at each batch size. Returns how many batched moves differed from the per-state ones.
+    """
+    import batch
+
+    states = [entry["game_state"] for entry in corpus]
+
+    def timed(fn, size: int) -> List[str]:
+        random.seed(0)
+        t0 = time.perf_counter()
+        moves = [m for k in range(0, len(states), size) for m in fn(states[k:k + size])]
+        print(f"{len(states) / (time.perf_counter() - t0):10.0f} boards/s")
+        return moves
+
+    print(f"{'per state':>12}", end="")
+    expected = timed(lambda chunk: [move.choose_move(chunk[0]).move], 1)
+    mismatches = 0
+    for size in batch_sizes:
+        print(f"{f'batch {size}':>12}", end="")
+        got = timed(lambda chunk: [r.move for r in batch.choose_moves(chunk)], size)
+        mismatches += sum(a != b for a, b in zip(expected, got))
+    if mismatches:
+        print(f"{mismatches} batched moves differ from the per-state path", file=sys.stderr)
+    return mismatches
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Regression comparison
+# ──────────────────────────────────────────────────────────────────────────────
+
+def compare(base: dict, new: dict, tolerance: float = 0.10, stat: str = "p50_us") -> List[str]:
+    """Print both runs side by side; return the metrics slower by more than `tolerance`."""
+    if base["meta"].get("corpus") != new["meta"].get("corpus"):
+        print("warning: runs used different corpora", file=sys.stderr)
+    regressions = []
+    print(f"{'metric':40} {'base':>10} {'new':>10} {'ratio':>7}")
+    for name in sorted(set(base["metrics"]) & set(new["metrics"])):
+        a, b = base["metrics"][name][stat], new["metrics"][name][stat]
+        ratio = b / a if a else float("inf") if b else 1.0
+        flag = ""
+        if ratio > 1.0 + tolerance:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif ratio < 1.0 - tolerance:
+            flag = "  faster"
+        print(f"{name:40} {a:10.1f} {b:10.1f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline planner benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("corpus", help="generate the self-play corpus")
+    p.add_argument("--out", required=True)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--games", type=int, default=1, help="games per (size, snakes) setup")
+    p.add_argument("--per-game", type=int, default=8, help="states kept per game")
+
+    p = sub.add_parser("run", help="time the corpus")
+    p.add_argument("--corpus", help="JSON-lines corpus (default: generate one with --seed)")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--out", default="-", help="results file (default: stdout)")
+
+    p = sub.add_parser("compare", help="compare two result files")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--tolerance", type=float, default=0.10)
+    p.add_argument("--stat", default="p50_us", choices=("mean_us", "p50_us", "p95_us", "max_us"))
+
+    p = sub.add_parser("batch", help="batched choose_moves throughput by batch size")
+    p.add_argument("--corpus", help="JSON-lines corpus (default: generate one with --seed)")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--sizes", default="1,16,128,1024", help="comma-separated batch sizes")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "corpus":
+        corpus = build_corpus(args.seed, args.games, args.per_game)
+        save_corpus(corpus, args.out)
+        print(f"{len(corpus)} states written to {args.out}")
+        return 0
+
+    if args.command == "batch":
+        corpus = load_corpus(args.corpus) if args.corpus else build_corpus(args.seed)
+        return 1 if batch_throughput(corpus, [int(s) for s in args.sizes.split(",")]) else 0
+
+    if args.command == "run":
+        corpus = load_corpus(args.corpus) if args.corpus else build_corpus(args.seed)
+        t0 = time.perf_counter()
+        metrics = run(corpus, args.repeat)
+        result = {
+            "meta": {
+                "corpus": corpus_digest(corpus),
+                "states": len(corpus),
+                "repeat": args.repeat,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "wall_s": round(time.perf_counter() - t0, 2),
+            },
+            "metrics": metrics,
+        }
+        text = json.dumps(result, indent=2)
+        if args.out == "-":
+            print(text)
+        else:
+            with open(args.out, "w") as f:
+                f.write(text + "\n")
+        return 0
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    return 1 if compare(base, new, args.tolerance, args.stat) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+# board.py
+# -----------------------------------------------------------------------------
+# Single-pass decoder from the /move JSON to a compact board record.
+#
+# One walk over game_state["board"] fills flat occupancy counts, the turn each
+# body cell frees up, and one rules.Snake per snake (body as cell indices,
+# health), plus food and hazard indices. Everything downstream (move,
+# planner, sessions, search) reads from the record instead of re-walking the
+# JSON.
+#
+# advance() builds the next turn's record from the last one instead: only
+# each snake's new head, popped or stacked tail, and the snakes that died
+# are read from the JSON. session.GameSession carries a game's board forward
+# this way and falls back to decode whenever a request doesn't line up.
+#
+# loads/dumps use orjson when it is installed and the json module otherwise.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from grid import Grid, get_grid
+from rules import Snake
+
+try:
+    import orjson
+
+    loads = orjson.loads
+    dumps = orjson.dumps
+except ImportError:  # pragma: no cover - orjson is optional
+    import json
+
+    loads = json.loads
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+
+class Board:
+    """
+      occupied[i]: body segments on cell i, heads included (stacked tails count twice)
+      vacate[i]:   turns until cell i is free if nobody eats (0 if free now):
+                   segment k of a length-L snake leaves after L - k moves, and
+                   a stacked tail after 2, when its last copy moves on
+      snakes:      every snake on the board, in request order
+      you:         our snake (also in `snakes`)
+      opponents:   every other snake
+      food, hazards: cell indices
+      hazard_damage: health lost per turn on a hazard (ruleset setting)
+    """
+
+    __slots__ = ("game_id", "timeout", "turn", "grid", "occupied", "vacate", "snakes", "you", "opponents", "food",
+                 "hazards", "hazard_damage")
+
+    def __repr__(self):
+        return f"<Board {self.grid.width}x{self.grid.height} turn={self.turn} snakes={len(self.snakes)}>"
+
+    @property
+    def width(self) -> int:
+        return self.grid.width
+
+    @property
+    def height(self) -> int:
+        return self.grid.height
+
+    def mask(self) -> bytearray:
+        """The planner's obstacle mask: every body cell except our own head."""
+        m = bytearray(self.grid.size)
+        occ = self.occupied
+        for i in range(self.grid.size):
+            if occ[i]:
+                m[i] = 1
+        m[self.you.head] = 0
+        return m
+
+
+def decode(game_state: dict) -> Board:
+    b = game_state["board"]
+    grid: Grid = get_grid(b["width"], b["height"])
+    h = grid.height
+    occupied = bytearray(grid.size)
+    vacate = [0] * grid.size
+
+    my_id = game_state["you"]["id"]
+    snakes = []
+    you = None
+    opponents = []
+    for s in b["snakes"]:
+        body = []
+        left = len(s["body"])
+        for p in s["body"]:
+            c = p["x"] * h + p["y"]
+            body.append(c)
+            if not occupied[c]:
+                # Head first, so the first segment seen on a cell leaves last
+                vacate[c] = left
+            occupied[c] += 1
+            left -= 1
+        info = Snake(s["id"], body, s["health"])
+        snakes.append(info)
+        if info.id == my_id:
+            you = info
+        else:
+            opponents.append(info)
+    if you is None:
+        y = game_state["you"]
+        you = Snake(my_id, [p["x"] * h + p["y"] for p in y["body"]], y["health"])
+
+    board = Board()
+    game = game_state.get("game", {})
+    board.game_id = game.get("id", "")
+    board.timeout = game.get("timeout", 500)
+    board.turn = game_state.get("turn", 0)
+    board.grid = grid
+    board.occupied = occupied
+    board.vacate = vacate
+    board.snakes = snakes
+    board.you = you
+    board.opponents = opponents
+    board.food = [p["x"] * h + p["y"] for p in b["food"]]
+    board.hazards = [p["x"] * h + p["y"] for p in b.get("hazards", ())]
+    board.hazard_damage = game.get("ruleset", {}).get("settings", {}).get("hazardDamagePerTurn", 14)
+    return board
+
+
+def advance(board: Board, game_state: dict) -> Optional[Board]:
+    """
+    The board one turn after `board`, as decode(game_state) would build it,
+    or None if `game_state` is not exactly one turn later: a different turn
+    or board size, a snake we haven't seen, or a body whose head, neck, tail
+    or length doesn't follow from last turn's.
+    """
+    b = game_state["board"]
+    grid = board.grid
+    if game_state.get("turn", 0) != board.turn + 1 or b["width"] != grid.width or b["height"] != grid.height:
+        return None
+    h = grid.height
+    my_id = game_state["you"]["id"]
+    gone: Dict[str, Snake] = {s.id: s for s in board.snakes}
+    snakes: List[Snake] = []
+    you = None
+    opponents = []
+    moved = []
+    for s in b["snakes"]:
+        old = gone.pop(s["id"], None)
+        segments = s["body"]
+        if old is None or len(old.body) < 2 or len(segments) < 2:
+            return None
+        body = [segments[0]["x"] * h + segments[0]["y"]] + old.body[:-1]
+        stacked = len(segments) == len(old.body) + 1
+        if stacked:
+            body.append(body[-1])
+        elif len(segments) != len(old.body):
+            return None
+        neck, tail = segments[1], segments[-1]
+        if neck["x"] * h + neck["y"] != old.head or tail["x"] * h + tail["y"] != body[-1]:
+            return None
+        info = Snake(s["id"], body, s["health"])
+        snakes.append(info)
+        moved.append((body, old.body, stacked))
+        if info.id == my_id:
+            you = info
+        else:
+            opponents.append(info)
+    if you is None:
+        return None
+
+    occupied = bytearray(board.occupied)
+    vacate = list(board.vacate)
+    freed = []
+    for old in gone.values():
+        for c in old.body:
+            occupied[c] -= 1
+            freed.append(c)
+    for body, old, stacked in moved:
+        occupied[old[-1]] -= 1
+        freed.append(old[-1])
+        if stacked:
+            # Grown by one: every segment is as many turns from leaving as before
+            occupied[body[-1]] += 1
+        else:
+            # One turn closer for every segment; a stacked tail moves once
+            for c in body[1:]:
+                vacate[c] -= 1
+            k = len(body) - 1
+            while k > 1 and body[k] == body[k - 1]:
+                vacate[body[k]] += 1
+                k -= 1
+    for c in freed:
+        if not occupied[c]:
+            vacate[c] = 0
+    # Heads last: one may have moved onto a tail that left this turn
+    for body, _, _ in moved:
+        occupied[body[0]] += 1
+        vacate[body[0]] = len(body)
+
+    nxt = Board()
+    nxt.game_id = board.game_id
+    nxt.timeout = game_state.get("game", {}).get("timeout", board.timeout)
+    nxt.turn = board.turn + 1
+    nxt.grid = grid
+    nxt.occupied = occupied
+    nxt.vacate = vacate
+    nxt.snakes = snakes
+    nxt.you = you
+    nxt.opponents = opponents
+    nxt.food = [p["x"] * h + p["y"] for p in b["food"]]
+    nxt.hazards = [p["x"] * h + p["y"] for p in b.get("hazards", ())]
+    nxt.hazard_damage = board.hazard_damage
+    return nxt
@@ -0,0 +1,60 @@
+# distances.py
+# -----------------------------------------------------------------------------
+# Per-move distance oracle.
+#
+# Every planner phase asks "how far is X from Y" or "which way to Y". Rather
+# than each phase running its own BFS, one oracle per obstacle mask runs a BFS
+# the first time a source is asked about and keeps its distances for the rest
+# of the move. First steps come from grid.shortest_path, so ties between
+# equally short paths resolve as they always have.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from typing import Dict, List, Optional
+
+from grid import Grid, bfs, shortest_path
+
+
+class DistanceOracle:
+    """
+    Cached BFS results over one obstacle mask. The mask must not change while
+    the oracle is in use; build a new oracle for a different board.
+    """
+
+    __slots__ = ("grid", "blocked", "_dist")
+
+    def __init__(self, grid: Grid, blocked: bytearray):
+        self.grid = grid
+        self.blocked = blocked
+        self._dist: Dict[int, List[int]] = {}
+
+    def __repr__(self):
+        return f"<DistanceOracle {self.grid.width}x{self.grid.height} sources={len(self._dist)}>"
+
+    def preload(self, source: int, dist: List[int]) -> None:
+        """Adopt a search from `source` over this mask that was run elsewhere (as grid.bfs would)."""
+        self._dist[source] = dist
+
+    def distances(self, source: int) -> List[int]:
+        """Distance from `source` to every cell (-1 where unreachable)."""
+        dist = self._dist.get(source)
+        if dist is None:
+            dist = self._dist[source] = bfs(self.grid, self.blocked, source)
+        return dist
+
+    def distance(self, source: int, target: int) -> int:
+        """
+        Distance from `source` to `target`. Always searched from `source`:
+        a blocked source is still expanded, but a blocked target is never
+        entered, so the two directions can differ.
+        """
+        return self.distances(source)[target]
+
+    def first_step(self, source: int, target: int) -> Optional[int]:
+        """
+        The cell after `source` on a shortest path to `target`, or None. Ties
+        between equally short paths go as in grid.shortest_path.
+        """
+        if self.distances(source)[target] <= 0:
+            return None
+        return shortest_path(self.grid, self.blocked, source, target)[1]
@@ -0,0 +1,111 @@
+# doors.py
+# -----------------------------------------------------------------------------
+# "Door" analysis: articulation points of the open grid, and how much space a
+# given snake is left with if one of them gets closed.
+#
+# A single iterative DFS rooted at the snake's head computes discovery times,
+# low-links and subtree sizes. From those we get, in the same traversal:
+#   - the articulation points of the root's component,
+#   - its biconnected blocks (and so the block-cut tree),
+#   - for every cell v, the size of the root's side once v is removed.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from typing import Dict, List
+
+from grid import Grid
+
+
+class DoorAnalysis:
+    """
+    Block-cut structure of the component containing `root`.
+
+      size:                number of open cells in the root's component
+      articulation_points: cut cells of that component, in cell order
+      blocks:              biconnected blocks, each a list of cells (a cut
+                           cell appears in every block it joins)
+      cut_blocks[v]:       ids of the blocks that cut cell v joins
+    """
+
+    __slots__ = ("grid", "root", "size", "articulation_points", "blocks", "cut_blocks",
+                 "_disc", "_separated")
+
+    def __init__(self, grid: Grid, blocked: bytearray, root: int):
+        self.grid = grid
+        self.root = root
+
+        nbrs = grid.neighbours
+        disc = [-1] * grid.size
+        low = [0] * grid.size
+        parent = [-1] * grid.size
+        sub = [1] * grid.size
+        separated = [0] * grid.size
+        blocks: List[List[int]] = []
+        root_children = 0
+
+        disc[root] = low[root] = 0
+        t = 1
+        vstack = [root]
+        stack = [(root, iter(nbrs[root]))]
+        while stack:
+            v, it = stack[-1]
+            for u in it:
+                if blocked[u]:
+                    continue
+                if disc[u] < 0:
+                    parent[u] = v
+                    disc[u] = low[u] = t
+                    t += 1
+                    vstack.append(u)
+                    stack.append((u, iter(nbrs[u])))
+                    break
+                if u != parent[v] and disc[u] < low[v]:
+                    low[v] = disc[u]
+            else:
+                stack.pop()
+                p = parent[v]
+                if p < 0:
+                    continue
+                sub[p] += sub[v]
+                if low[v] < low[p]:
+                    low[p] = low[v]
+                if low[v] >= disc[p]:
+                    # p separates v's subtree from the rest: close off a block
+                    if p == root:
+                        root_children += 1
+                    else:
+                        separated[p] += sub[v]
+                    block = [p]
+                    while True:
+                        w = vstack.pop()
+                        block.append(w)
+                        if w == v:
+                            break
+                    blocks.append(block)
+
+        if root_children >= 2:
+            separated[root] = t - 1
+
+        cut_blocks: Dict[int, List[int]] = {}
+        for b, block in enumerate(blocks):
+            for v in block:
+                if separated[v]:
+                    cut_blocks.setdefault(v, []).append(b)
+
+        self.size = t
+        self.articulation_points = [v for v in range(grid.size) if separated[v]]
+        self.blocks = blocks
+        self.cut_blocks = cut_blocks
+        self._disc = disc
+        self._separated = separated
+
+    def __contains__(self, v: int) -> bool:
+        return self._disc[v] >= 0
+
+    def root_side(self, v: int) -> int:
+        """Open cells left connected to the root if cell `v` is closed."""
+        if v == self.root:
+            return 0
+        if self._disc[v] < 0:
+            return self.size
+        return self.size - 1 - self._separated[v]
@@ -0,0 +1,334 @@
+# grid.py
+# -----------------------------------------------------------------------------
+# Compact, array-backed board representation for the planner.
+#
+# Cells are flat integer indices numbered column-major (i = x * height + y);
+# "first in cell order" tie-breaks follow that numbering. Obstacles live in a
+# bytearray (1 = blocked). Neighbour tables are built once per board size and
+# shared by every request on that size.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Tuple
+
+Coord = Tuple[int, int]
+
+
+class Grid:
+    """
+    Static geometry of a width x height board: index <-> coordinate tables
+    and the 4-neighbour lists of every cell. Neighbours are ordered
+    (x - 1), (x + 1), (y - 1), (y + 1).
+    """
+
+    __slots__ = ("width", "height", "size", "coords", "neighbours")
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.coords: List[Coord] = [(x, y) for x in range(width) for y in range(height)]
+
+        neighbours = []
+        for x, y in self.coords:
+            i = x * height + y
+            out = []
+            if x > 0: out.append(i - height)
+            if x + 1 < width: out.append(i + height)
+            if y > 0: out.append(i - 1)
+            if y + 1 < height: out.append(i + 1)
+            neighbours.append(tuple(out))
+        self.neighbours: List[Tuple[int, ...]] = neighbours
+
+    def __repr__(self):
+        return f"<Grid {self.width}x{self.height}>"
+
+    def contains(self, p: Coord) -> bool:
+        return 0 <= p[0] < self.width and 0 <= p[1] < self.height
+
+    def index(self, p: Coord) -> int:
+        return p[0] * self.height + p[1]
+
+    def index_or_none(self, p: Optional[Coord]) -> Optional[int]:
+        if p is None or not self.contains(p):
+            return None
+        return p[0] * self.height + p[1]
+
+    def mask(self, blocked: Iterable[Coord]) -> bytearray:
+        """Obstacle mask with every in-bounds cell of `blocked` set to 1."""
+        m = bytearray(self.size)
+        w, h = self.width, self.height
+        for p in blocked:
+            x, y = p[0], p[1]
+            if 0 <= x < w and 0 <= y < h:
+                m[x * h + y] = 1
+        return m
+
+
+@lru_cache(maxsize=None)
+def get_grid(width: int, height: int) -> Grid:
+    return Grid(width, height)
+
+
+def overlay(blocked: bytearray, cells: Iterable[int], value: int) -> List[Tuple[int, int]]:
+    """
+    Set `cells` of the mask to `value` in place, returning what `undo` needs
+    to put them back. Used to try hypothetical moves without copying boards.
+    """
+    saved = []
+    for i in cells:
+        saved.append((i, blocked[i]))
+        blocked[i] = value
+    return saved
+
+
+def undo(blocked: bytearray, saved: List[Tuple[int, int]]) -> None:
+    for i, v in reversed(saved):
+        blocked[i] = v
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Traversals over an obstacle mask
+# ──────────────────────────────────────────────────────────────────────────────
+
+def bfs(grid: Grid, blocked: bytearray, source: int) -> List[int]:
+    """
+    Breadth-first distances from `source` to every open cell (-1 where
+    unreachable). The source itself is always expanded, even if blocked.
+    """
+    nbrs = grid.neighbours
+    dist = [-1] * grid.size
+    dist[source] = 0
+    queue = deque((source,))
+    pop, push = queue.popleft, queue.append
+    while queue:
+        v = pop()
+        d = dist[v] + 1
+        for u in nbrs[v]:
+            if dist[u] < 0 and not blocked[u]:
+                dist[u] = d
+                push(u)
+    return dist
+
+
+def shortest_path(grid: Grid, blocked: bytearray, source: int, target: int) -> Optional[List[int]]:
+    """
+    Shortest path from `source` to `target` (inclusive), or None if there is
+    none. Searches from both ends a level at a time, expanding the smaller
+    fringe first, so ties between equal-length paths resolve exactly as
+    nx.shortest_path does on the equivalent grid graph.
+    """
+    if source == target:
+        return [source]
+
+    nbrs = grid.neighbours
+    unset = -2
+    pred = [unset] * grid.size
+    succ = [unset] * grid.size
+    pred[source] = -1
+    succ[target] = -1
+    forward, reverse = [source], [target]
+    meet = None
+
+    while forward and reverse and meet is None:
+        if len(forward) <= len(reverse):
+            this_level, forward = forward, []
+            for v in this_level:
+                for w in nbrs[v]:
+                    if blocked[w]:
+                        continue
+                    if pred[w] == unset:
+                        forward.append(w)
+                        pred[w] = v
+                    if succ[w] != unset:
+                        meet = w
+                        break
+                if meet is not None:
+                    break
+        else:
+            this_level, reverse = reverse, []
+            for v in this_level:
+                for w in nbrs[v]:
+                    if blocked[w]:
+                        continue
+                    if succ[w] == unset:
+                        succ[w] = v
+                        reverse.append(w)
+                    if pred[w] != unset:
+                        meet = w
+                        break
+                if meet is not None:
+                    break
+
+    if meet is None:
+        return None
+
+    path = []
+    w = meet
+    while w != -1:
+        path.append(w)
+        w = pred[w]
+    path.reverse()
+    w = succ[path[-1]]
+    while w != -1:
+        path.append(w)
+        w = succ[w]
+    return path
+
+
+def timed_flood(grid: Grid, vacate: List[int], source: int, start: int = 0) -> List[int]:
+    """
+    Cells reachable from `source` (inclusive) when `source` is entered on turn
+    `start` and each step takes a turn. A cell can be entered on turn t once
+    vacate[cell] <= t (see board.Board.vacate), so bodies open up as their
+    tails move. Runs a level at a time so every cell is tried at the earliest
+    turn we could get there.
+    """
+    nbrs = grid.neighbours
+    seen = bytearray(grid.size)
+    seen[source] = 1
+    out = [source]
+    level = [source]
+    t = start
+    while level:
+        t += 1
+        nxt = []
+        for v in level:
+            for u in nbrs[v]:
+                if not seen[u] and vacate[u] <= t:
+                    seen[u] = 1
+                    nxt.append(u)
+        out += nxt
+        level = nxt
+    return out
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Connected components
+# ──────────────────────────────────────────────────────────────────────────────
+
+class Components:
+    """
+    Connected-component labelling of the open cells of a mask.
+      labels[i]: component id of cell i (-1 if blocked)
+      sizes[k]:  number of cells in component k
+    Members are stored contiguously in `order` (component k occupies
+    order[starts[k]:starts[k] + sizes[k]]), so no per-component sets exist.
+    """
+
+    __slots__ = ("labels", "sizes", "order", "starts")
+
+    def __init__(self, labels: List[int], sizes: List[int], order: List[int], starts: List[int]):
+        self.labels = labels
+        self.sizes = sizes
+        self.order = order
+        self.starts = starts
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def cells(self, k: int) -> List[int]:
+        s = self.starts[k]
+        return self.order[s:s + self.sizes[k]]
+
+
+def label_components(grid: Grid, blocked: bytearray) -> Components:
+    """Label every open cell with its component id in one linear pass."""
+    nbrs = grid.neighbours
+    labels = [-1] * grid.size
+    sizes: List[int] = []
+    starts: List[int] = []
+    order: List[int] = []
+    push = order.append
+    for i in range(grid.size):
+        if blocked[i] or labels[i] >= 0:
+            continue
+        k = len(sizes)
+        start = len(order)
+        labels[i] = k
+        push(i)
+        j = start
+        # `order` doubles as the BFS queue for this component
+        while j < len(order):
+            v = order[j]
+            j += 1
+            for u in nbrs[v]:
+                if labels[u] < 0 and not blocked[u]:
+                    labels[u] = k
+                    push(u)
+        starts.append(start)
+        sizes.append(len(order) - start)
+    return Components(labels, sizes, order, starts)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Centres
+# ──────────────────────────────────────────────────────────────────────────────
+
+def centre_cells(
+    grid: Grid,
+    blocked: bytearray,
+    cells: List[int],
+    exact_limit: int = 150,
+    max_sweeps: int = 12,
+    distances: Optional[Callable[[int], List[int]]] = None,
+    stop: Optional[Callable[[], bool]] = None,
+) -> List[int]:
+    """
+    Centre (minimum-eccentricity cells) of the connected region `cells`, in
+    cell order.
+
+    Rather than a BFS from every cell, each sweep BFSes from one cell s and
+    tightens every cell's eccentricity bounds:
+        max(d(s, x), ecc(s) - d(s, x)) <= ecc(x) <= ecc(s) + d(s, x)
+    Cells whose lower bound exceeds the best upper bound can't be central and
+    are dropped. Sweeps alternate between the most promising candidate (lowest
+    lower bound) and the least resolved one (highest upper bound), and stop
+    once every remaining candidate is exact. Regions up to `exact_limit` cells
+    always run to completion; larger ones stop after `max_sweeps` sweeps and
+    return the candidates with the lowest upper bound.
+
+    `distances(source)` may supply cached BFS results over `blocked`. Once
+    `stop()` returns True (checked after the first sweep), sweeping ends as
+    if the budget had run out.
+    """
+    if len(cells) <= 1:
+        return list(cells)
+
+    lo = {c: 0 for c in cells}
+    hi = {c: 10**9 for c in cells}
+    candidates = sorted(cells)
+    budget = None if len(cells) <= exact_limit else max_sweeps
+    sweeps = 0
+    while True:
+        unresolved = [c for c in candidates if lo[c] != hi[c]]
+        if not unresolved:
+            break
+        if budget is not None and sweeps >= budget:
+            break
+        if sweeps and stop is not None and stop():
+            break
+        if sweeps % 2 == 0:
+            s = min(unresolved, key=lo.__getitem__)
+        else:
+            s = max(unresolved, key=hi.__getitem__)
+        sweeps += 1
+
+        d = distances(s) if distances is not None else bfs(grid, blocked, s)
+        e = max(d[c] for c in cells)
+        for c in candidates:
+            dc = d[c]
+            lb = dc if dc > e - dc else e - dc
+            if lb > lo[c]:
+                lo[c] = lb
+            if e + dc < hi[c]:
+                hi[c] = e + dc
+        lo[s] = hi[s] = e
+
+        best_ub = min(hi[c] for c in candidates)
+        candidates = [c for c in candidates if lo[c] <= best_ub]
+
+    best_ub = min(hi[c] for c in candidates)
+    return [c for c in candidates if hi[c] == best_ub]
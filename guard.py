@@ -0,0 +1,83 @@
+# guard.py
+# -----------------------------------------------------------------------------
+# Move deadlines.
+#
+# A Deadline is the time.monotonic() by which an answer must be ready:
+# game.timeout after the request arrived, less a safety margin for the network
+# and serialisation. time.monotonic reads the system-wide monotonic clock
+# (CLOCK_MONOTONIC on Linux), so a deadline set when server.on_move received
+# the request still holds in a server.MovePool worker process. The mcts
+# worker processes don't rely on that: they are sent the time left instead.
+#
+# A MoveGuard carries one move's deadline through the planner. The planner
+# settles a cheap safe move first; after that every optional phase asks
+# allow(phase) before it starts, and long phases poll expired(phase) between
+# steps and settle for their best result so far. Phases skipped or cut short
+# are noted on the guard, for the caller to record (see main.move).
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from typing import List, Optional
+import os
+import time
+
+# Milliseconds kept back from game.timeout for network and serialisation.
+SAFETY_MARGIN_MS = float(os.environ.get("SEARCH_SAFETY_MARGIN_MS", "150"))
+
+
+class Deadline:
+    __slots__ = ("at",)
+
+    def __init__(self, at: float):
+        self.at = at
+
+    @classmethod
+    def from_game_state(cls, game_state: dict, started: Optional[float] = None, margin_ms: float = SAFETY_MARGIN_MS) -> "Deadline":
+        """Deadline for this move, counted from `started` (time.monotonic) or now."""
+        return cls.from_timeout(game_state["game"].get("timeout", 500), started, margin_ms)
+
+    @classmethod
+    def from_timeout(cls, timeout_ms: float, started: Optional[float] = None, margin_ms: float = SAFETY_MARGIN_MS) -> "Deadline":
+        start = time.monotonic() if started is None else started
+        return cls(start + max(timeout_ms - margin_ms, 0.0) / 1000.0)
+
+    def remaining(self) -> float:
+        return self.at - time.monotonic()
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.at
+
+
+class MoveGuard:
+    """
+      started:  when the request arrived (time.monotonic)
+      deadline: when the move must be decided
+      skipped:  phases not run for lack of time, in order
+      cut:      phases stopped part way, whose best result so far was used
+    """
+
+    __slots__ = ("started", "deadline", "skipped", "cut")
+
+    def __init__(self, timeout_ms: float, started: Optional[float] = None, margin_ms: float = SAFETY_MARGIN_MS):
+        self.started = time.monotonic() if started is None else started
+        self.deadline = Deadline.from_timeout(timeout_ms, self.started, margin_ms)
+        self.skipped: List[str] = []
+        self.cut: List[str] = []
+
+    def __repr__(self):
+        return f"<MoveGuard {self.deadline.remaining() * 1000:.0f} ms left skipped={self.skipped} cut={self.cut}>"
+
+    def allow(self, phase: str) -> bool:
+        """Whether `phase` may start; once the deadline has passed, notes it as skipped."""
+        if self.deadline.expired():
+            self.skipped.append(phase)
+            return False
+        return True
+
+    def expired(self, phase: str) -> bool:
+        """Whether `phase` must stop now; once the deadline has passed, notes it as cut short."""
+        if self.deadline.expired():
+            if phase not in self.cut:
+                self.cut.append(phase)
+            return True
+        return False
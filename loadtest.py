@@ -0,0 +1,402 @@
+# loadtest.py
+# -----------------------------------------------------------------------------
+# Local load generator: a stand-in for the Battlesnake engine that plays many
+# games at once against the snake server over HTTP.
+#
+# Every game runs the full lifecycle, /start, one /move per turn (the next
+# turn is only sent once the last one is answered) and /end, with up to
+# --concurrency games in flight. Games are replays: the server's answers
+# don't steer them, so every run sends the same requests. They are either
+# recorded (--replay DIR, logs written with REPLAY_DIR) or generated by
+# planner self-play (simulate.play_game), and reused round-robin under fresh
+# game ids when --games asks for more than there are.
+#
+# Requests go out over a pool of HTTP/1.1 keep-alive connections driven by
+# asyncio (plain asyncio streams, no HTTP client dependency). A /move's
+# latency runs from sending the request to reading the whole response; one
+# at or over its game.timeout is a timeout violation.
+#
+# Without --url, a server (main.py) is started on a free port for each of
+# --modes (SERVER_MODE values) in turn, so one run compares serving modes.
+# The report gives, per mode, moves per second, latency percentiles, timeout
+# violations and failed requests. The load generator shares the machine with
+# the server; keep that in mind when reading the numbers.
+#
+#   python loadtest.py --modes dev,production --games 64 --concurrency 16
+#   python loadtest.py --url http://127.0.0.1:8000 --replay replays/
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from board import dumps, loads
+from rules import MOVES, to_game_state
+from simulate import percentiles, play_game
+
+REQUEST_TIMEOUT_S = 30.0
+SERVER_BOOT_S = 60.0
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Games
+# ──────────────────────────────────────────────────────────────────────────────
+
+def generated_games(count: int, size: int, snakes: int, seed: int = 1, max_turns: int = 300,
+                    timeout: int = 500) -> List[List[dict]]:
+    """
+    `count` self-play games, each as the /move requests its first snake
+    received, turn by turn, while it was alive.
+    """
+    games = []
+    for g in range(count):
+        states: List[dict] = []
+        you: List[str] = []
+
+        def keep(pos, game_id):
+            if not you:
+                you.append(pos.snakes[0].id)
+            if any(s.id == you[0] for s in pos.snakes):
+                states.append(to_game_state(pos, you[0], game_id, timeout))
+
+        play_game(size, ["planner"] * snakes, seed + g, max_turns, timeout, on_turn=keep)
+        if states:
+            games.append(states)
+    return games
+
+
+def recorded_games(directory: str) -> List[List[dict]]:
+    """Every game in the replay logs under `directory`, turns in order."""
+    from replay import iter_turns
+
+    by_game: Dict[str, Dict[int, dict]] = {}
+    for t in iter_turns(directory):
+        if t.game_state["you"] is None:
+            continue
+        turns = by_game.setdefault(t.game_state["game"]["id"], {})
+        turns.setdefault(t.game_state["turn"], t.game_state)
+    return [[turns[k] for k in sorted(turns)] for turns in by_game.values()]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# HTTP
+# ──────────────────────────────────────────────────────────────────────────────
+
+class _Connection:
+    __slots__ = ("reader", "writer")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class ConnectionPool:
+    """
+    At most `size` keep-alive HTTP/1.1 connections to one host. Requests
+    wait for a free connection; a connection the server closed is replaced.
+    """
+
+    def __init__(self, host: str, port: int, size: int):
+        self.host = host
+        self.port = port
+        self.opened = 0
+        self._idle: List[_Connection] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def _open(self) -> _Connection:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.opened += 1
+        return _Connection(reader, writer)
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> Tuple[int, bytes]:
+        """Send one request; returns (status, body)."""
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode()
+        async with self._slots:
+            reused = bool(self._idle)
+            conn = self._idle.pop() if reused else await self._open()
+            try:
+                status, data, keep = await _exchange(conn, head + body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                conn.close()
+                if not reused:
+                    raise
+                # The server dropped an idle connection; retry on a new one
+                conn = await self._open()
+                status, data, keep = await _exchange(conn, head + body)
+            except BaseException:
+                conn.close()
+                raise
+            if keep:
+                self._idle.append(conn)
+            else:
+                conn.close()
+            return status, data
+
+    def close(self):
+        for conn in self._idle:
+            conn.close()
+        self._idle.clear()
+
+
+async def _exchange(conn: _Connection, request: bytes) -> Tuple[int, bytes, bool]:
+    conn.writer.write(request)
+    await conn.writer.drain()
+    reader = conn.reader
+    status_line = await reader.readuntil(b"\r\n")
+    version, status, _ = (status_line.decode("latin-1").rstrip("\r\n") + "  ").split(" ", 2)
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            n = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if n == 0:
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                break
+            chunks.append(await reader.readexactly(n))
+            await reader.readexactly(2)
+        data = b"".join(chunks)
+    elif "content-length" in headers:
+        data = await reader.readexactly(int(headers["content-length"]))
+    else:
+        data = await reader.read()
+        keep = False
+    return int(status), data, keep
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Load
+# ──────────────────────────────────────────────────────────────────────────────
+
+class Results:
+    def __init__(self):
+        self.latency_ms: List[float] = []
+        self.timeouts = 0
+        self.errors: Dict[str, int] = {}
+        self.games = 0
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+async def _post(pool: ConnectionPool, path: str, body: bytes, results: Results) -> Optional[bytes]:
+    try:
+        status, data = await asyncio.wait_for(pool.request("POST", path, body), REQUEST_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        results.error(f"{path} no answer")
+        return None
+    except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+        results.error(f"{path} {type(e).__name__}")
+        return None
+    if status != 200:
+        results.error(f"{path} HTTP {status}")
+        return None
+    return data
+
+
+async def play(pool: ConnectionPool, states: Sequence[dict], game_id: str, results: Results) -> None:
+    """Play one game: /start, a /move per state, /end."""
+    game = dict(states[0]["game"], id=game_id)
+    bodies = [dumps(dict(s, game=game)) for s in states]
+    await _post(pool, "/start", bodies[0], results)
+    timeout_ms = game.get("timeout", 500)
+    for body in bodies:
+        t0 = time.perf_counter()
+        data = await _post(pool, "/move", body, results)
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        if data is None:
+            continue
+        results.latency_ms.append(elapsed)
+        if elapsed >= timeout_ms:
+            results.timeouts += 1
+        try:
+            if loads(data).get("move") not in MOVES:
+                results.error("/move bad move")
+        except ValueError:
+            results.error("/move bad JSON")
+    await _post(pool, "/end", bodies[-1], results)
+    results.games += 1
+
+
+async def run_load(url: str, games: Sequence[Sequence[dict]], count: int, concurrency: int,
+                   connections: Optional[int] = None) -> dict:
+    """Play `count` games (cycling through `games`) against `url`; returns the summary."""
+    parts = urlsplit(url)
+    pool = ConnectionPool(parts.hostname or "127.0.0.1", parts.port or 80, connections or concurrency)
+    results = Results()
+    queue: asyncio.Queue = asyncio.Queue()
+    run_id = f"{os.getpid()}-{random.getrandbits(24):06x}"
+    for k in range(count):
+        queue.put_nowait(k)
+
+    async def player():
+        while True:
+            try:
+                k = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await play(pool, games[k % len(games)], f"load-{run_id}-{k}", results)
+
+    t0 = time.perf_counter()
+    try:
+        await asyncio.gather(*(player() for _ in range(min(concurrency, count))))
+    finally:
+        pool.close()
+    wall = time.perf_counter() - t0
+
+    moves = len(results.latency_ms)
+    return {
+        "url": url,
+        "games": results.games,
+        "moves": moves,
+        "concurrency": concurrency,
+        "connections_opened": pool.opened,
+        "wall_s": round(wall, 3),
+        "moves_per_s": round(moves / wall, 1) if wall else None,
+        "latency_ms": percentiles(results.latency_ms),
+        "timeouts": results.timeouts,
+        "errors": results.errors,
+    }
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Servers
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalServer:
+    """main.py in SERVER_MODE `mode` on a free local port, for a `with` block."""
+
+    def __init__(self, mode: str, env: Optional[Dict[str, str]] = None):
+        self.mode = mode
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = dict(os.environ, **(env or {}), SERVER_MODE=mode, PORT=str(self.port))
+        self.process: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "LocalServer":
+        here = os.path.dirname(os.path.abspath(__file__))
+        self.process = subprocess.Popen([sys.executable, os.path.join(here, "main.py")], cwd=here, env=self.env,
+                                        stdout=subprocess.DEVNULL, start_new_session=True)
+        deadline = time.monotonic() + SERVER_BOOT_S
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.mode} server exited with status {self.process.returncode}")
+            try:
+                urllib.request.urlopen(self.url + "/", timeout=1).read()
+                return self
+            except OSError:
+                if time.monotonic() > deadline:
+                    self.__exit__()
+                    raise RuntimeError(f"{self.mode} server did not come up within {SERVER_BOOT_S:.0f}s")
+                time.sleep(0.1)
+
+    def __exit__(self, *exc):
+        if self.process is not None and self.process.poll() is None:
+            # The whole session, so production mode's worker processes go too
+            os.killpg(self.process.pid, signal.SIGTERM)
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Command line
+# ──────────────────────────────────────────────────────────────────────────────
+
+def report(summaries: Dict[str, dict]) -> str:
+    w = max([12] + [len(mode) for mode in summaries])
+    lines = [f"{'mode':{w}} {'games':>6} {'moves':>7} {'moves/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+             f"{'max ms':>8} {'timeouts':>9} {'errors':>7}"]
+    for mode, s in summaries.items():
+        p = s["latency_ms"] or {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+        lines.append(f"{mode:{w}} {s['games']:>6} {s['moves']:>7} {s['moves_per_s'] or 0:>8.1f} {p['p50']:>8.2f} "
+                     f"{p['p90']:>8.2f} {p['p99']:>8.2f} {p['max']:>8.2f} {s['timeouts']:>9} "
+                     f"{sum(s['errors'].values()):>7}")
+    for mode, s in summaries.items():
+        for kind, n in sorted(s["errors"].items()):
+            lines.append(f"{mode}: {n} x {kind}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay games against the snake server under concurrent load")
+    parser.add_argument("--url", help="server to load (default: start main.py for each of --modes)")
+    parser.add_argument("--modes", default="dev,production", help="comma-separated SERVER_MODE values")
+    parser.add_argument("--games", type=int, default=64, help="games played per mode")
+    parser.add_argument("--concurrency", type=int, default=16, help="games in flight at once")
+    parser.add_argument("--connections", type=int, default=None, help="connection pool size (default: --concurrency)")
+    parser.add_argument("--replay", help="replay log directory to take games from (default: self-play)")
+    parser.add_argument("--distinct", type=int, default=8, help="self-play games to generate")
+    parser.add_argument("--size", type=int, default=11)
+    parser.add_argument("--snakes", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-turns", type=int, default=300)
+    parser.add_argument("--timeout", type=int, default=500, help="game.timeout in ms of generated games")
+    parser.add_argument("--json", help="also write the summaries to this file")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        games = recorded_games(args.replay)
+        source = f"recorded games from {args.replay}"
+    else:
+        games = generated_games(args.distinct, args.size, args.snakes, args.seed, args.max_turns, args.timeout)
+        source = f"self-play games on {args.size}x{args.size} with {args.snakes} snakes"
+    if not games:
+        print("no games to play", file=sys.stderr)
+        return 1
+    turns = sum(len(g) for g in games)
+    print(f"{len(games)} {source}, {turns / len(games):.0f} turns on average; "
+          f"{args.games} games per mode, {args.concurrency} at once\n")
+
+    summaries: Dict[str, dict] = {}
+    if args.url:
+        summaries[args.url] = asyncio.run(run_load(args.url, games, args.games, args.concurrency, args.connections))
+    else:
+        for mode in args.modes.split(","):
+            with LocalServer(mode) as server:
+                summaries[mode] = asyncio.run(
+                    run_load(server.url, games, args.games, args.concurrency, args.connections))
+
+    print(report(summaries))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summaries, f, indent=2)
+    return 1 if any(s["errors"] for s in summaries.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,10 +9,37 @@
 #
 # To get you started we've included code to prevent your Battlesnake from moving backwards.
 # For more info see docs.battlesnake.com
+import time
+
+_started = time.perf_counter()
+
+import os
 import random
 from dataclasses import asdict
 
-from move import choose_move
+import metrics
+from guard import MoveGuard
+from metrics import span
+from move import ENGINE, choose_move
+from session import SessionStore
+from startup import prewarm, prewarm_board, prewarm_engine, report
+
+# Board state carried between turns, one entry per live game
+sessions = SessionStore()
+
+# Every request and our answer, written to REPLAY_DIR when it is set
+recorder = None
+if os.environ.get("REPLAY_DIR"):
+    from replay import Recorder
+
+    recorder = Recorder(os.environ["REPLAY_DIR"])
+
+# Sampled and slow moves profiled into PROFILE_DIR when it is set
+profiler = None
+if os.environ.get("PROFILE_DIR"):
+    from profiler import Profiler
+
+    profiler = Profiler(os.environ["PROFILE_DIR"])
 
 
 # info is called when you create your Battlesnake on play.battlesnake.com
@@ -29,20 +56,55 @@ def info() -> dict:
     }
 
 
+# warm is called once in every process that serves moves, before the first:
+# the board tables for common sizes (already there in a worker forked after
+# boot) and the search engine are set up there
+def warm() -> None:
+    prewarm()
+    prewarm_engine(ENGINE)
+
+
 # start is called when your Battlesnake begins a game
 def start(game_state: dict) -> None:
     name = game_state["you"]["name"]
+    prewarm_board(game_state["board"]["width"], game_state["board"]["height"])
+    sessions.start(game_state)
+    if recorder is not None:
+        recorder.start(game_state)
     print(f"Game start {name}")
 
 
 # end is called when your Battlesnake finishes a game
 def end(game_state: dict) -> None:
     name = game_state["you"]["name"]
+    sessions.end(game_state)
+    if recorder is not None:
+        recorder.end(game_state)
     print(f"Game over {name}")
 
 
-def move(game_state: dict) -> dict:
-    m = choose_move(game_state)
+# move is called on every turn; `received` is when the server got the request
+# (time.monotonic), which the move's deadline counts from
+def move(game_state: dict, received: float | None = None) -> dict:
+    if profiler is not None:
+        return profiler.call(_move, game_state, received)
+    return _move(game_state, received)
+
+
+def _move(game_state: dict, received: float | None) -> dict:
+    started = time.monotonic()
+    with span("session_update"):
+        # This game's board, carried forward from last turn (or decoded afresh)
+        session = sessions.move(game_state)
+    board = session.board
+    guard = MoveGuard(board.timeout, started if received is None else received)
+    m = choose_move(board, session, guard=guard)
+    if recorder is not None:
+        recorder.move(game_state, m.move, time.monotonic() - started)
+    if guard.skipped or guard.cut:
+        print(f"Turn {board.turn}: out of time, skipped {guard.skipped or 'nothing'}, cut short {guard.cut or 'nothing'}")
+        if metrics.ENABLED:
+            metrics.registry.count_phases(guard.skipped, guard.cut)
 
     return asdict(m)
 
@@ -50,4 +112,7 @@ def move(game_state: dict) -> dict:
 if __name__ == "__main__":
     from server import run_server
 
-    run_server({"info": info, "start": start, "move": move, "end": end})
+    imported = time.perf_counter() - _started
+    print(report(imported, prewarm()))
+
+    run_server({"info": info, "start": start, "move": move, "end": end, "warm": warm})
@@ -0,0 +1,272 @@
+# mcts.py
+# -----------------------------------------------------------------------------
+# Simultaneous-move Monte Carlo Tree Search (decoupled UCT).
+#
+# Each tree node keeps separate move statistics for every snake alive there.
+# A descent picks each snake's move on its own by UCB1 over that snake's
+# statistics, applies the joint move with rules.Position.step, and expands
+# the first joint move not yet in the tree. From there a short rollout plays
+# every snake with the planner's first phases (see _rollout_moves): never
+# into a wall or a body unless nothing else is left, not next to a longer
+# snake's head (the planner's threat mask when the threat model is skipped),
+# into the largest directional space, then the most open cell. The final
+# position is scored per snake from its territory (see territory.evaluate).
+# Every snake's score is backed up into its own stats.
+#
+# The planner's move for us is the prior: it is tried first at the root and
+# carries a bonus that fades as the other moves collect visits.
+#
+# Runs until the game's timeout less guard.SAFETY_MARGIN_MS, checked after
+# every iteration. With
+# MCTS_WORKERS > 1 the search is root-parallel: worker processes grow
+# independent trees from the same root until the same deadline, and their
+# root visit counts are summed before picking the most visited move. The
+# workers are started by start_pool (startup.prewarm_engine) before the first
+# move, and are sent the time left rather than the deadline, which each turns
+# back into a Deadline on its own clock.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from math import log, sqrt
+from typing import Dict, List, Optional, Tuple
+import multiprocessing.util
+import os
+import random
+import time
+
+from board import Board
+from grid import get_grid, label_components
+from guard import SAFETY_MARGIN_MS, Deadline
+from rules import MOVES, Position, Snake
+from territory import evaluate
+
+EXPLORATION = float(os.environ.get("MCTS_EXPLORATION", "0.7"))
+ROLLOUT_DEPTH = int(os.environ.get("MCTS_ROLLOUT_DEPTH", "8"))
+WORKERS = int(os.environ.get("MCTS_WORKERS", "1"))
+PRIOR_BONUS = 1.0
+
+
+def _blocked(pos: Position) -> bytearray:
+    """Cells no snake may enter this turn: bodies, minus tails about to move."""
+    m = pos.occupancy()
+    for s in pos.snakes:
+        if len(s.body) > 1 and s.body[-1] != s.body[-2]:
+            m[s.body[-1]] = 0
+    return m
+
+
+def _ordered_moves(pos: Position, snake: Snake, blocked: bytearray) -> List[str]:
+    """Moves worth trying, most open first; all candidate moves if none is safe."""
+    safe = pos.candidate_moves(snake, blocked)
+    if not safe:
+        return [m for m, _ in pos.candidate_moves(snake)] or [MOVES[0]]
+    nbrs = pos.grid.neighbours
+    safe.sort(key=lambda mc: -sum(1 for u in nbrs[mc[1]] if not blocked[u]))
+    return [m for m, _ in safe]
+
+
+def _rollout_moves(pos: Position, blocked: bytearray) -> Dict[str, List[str]]:
+    """
+    Every snake's rollout moves, best first, by the planner's cheap phases.
+    One labelling of `blocked` (every head is in it) serves as each snake's
+    directional spaces, so a turn costs one pass over the board however
+    many snakes there are.
+    """
+    comps = label_components(pos.grid, blocked)
+    labels, sizes = comps.labels, comps.sizes
+    nbrs = pos.grid.neighbours
+    out = {}
+    for s in pos.snakes:
+        safe = pos.candidate_moves(s, blocked)
+        if not safe:
+            out[s.id] = [m for m, _ in pos.candidate_moves(s)] or [MOVES[0]]
+            continue
+        longer = [o.head for o in pos.snakes if o.length > s.length]
+        unthreatened = [mc for mc in safe if not any(h in nbrs[mc[1]] for h in longer)] or safe
+        unthreatened.sort(key=lambda mc: (-sizes[labels[mc[1]]], -sum(1 for u in nbrs[mc[1]] if not blocked[u])))
+        out[s.id] = [m for m, _ in unthreatened]
+    return out
+
+
+def score(pos: Position, root_snakes: int) -> Dict[str, float]:
+    """Value in [0, 1] of `pos` for every snake still in it (the dead score 0)."""
+    if len(pos.snakes) <= 1:
+        return {s.id: 1.0 for s in pos.snakes} if root_snakes > 1 else {s.id: 0.5 for s in pos.snakes}
+    t = evaluate(pos.grid, pos.occupancy(), [s.head for s in pos.snakes])
+    total = sum(t.owned) or 1
+    out = {}
+    for k, s in enumerate(pos.snakes):
+        room = 1.0 if t.reachable[k] >= s.length else t.reachable[k] / s.length
+        out[s.id] = 0.2 + 0.4 * room + 0.4 * t.owned[k] / total
+    return out
+
+
+class _Node:
+    __slots__ = ("moves", "visits", "value", "children", "n")
+
+    def __init__(self, pos: Position, prior: Optional[Tuple[str, str]] = None):
+        blocked = _blocked(pos)
+        self.moves: Dict[str, List[str]] = {}
+        for s in pos.snakes:
+            moves = _ordered_moves(pos, s, blocked)
+            if prior is not None and prior[0] == s.id and prior[1] in moves:
+                moves.remove(prior[1])
+                moves.insert(0, prior[1])
+            self.moves[s.id] = moves
+        self.visits = {sid: [0] * len(ms) for sid, ms in self.moves.items()}
+        self.value = {sid: [0.0] * len(ms) for sid, ms in self.moves.items()}
+        self.children: Dict[Tuple[int, ...], _Node] = {}
+        self.n = 0
+
+    def select(self, sid: str, prior_bonus: float) -> int:
+        visits, value = self.visits[sid], self.value[sid]
+        for k, v in enumerate(visits):
+            if v == 0:
+                return k  # untried moves go first, in prior order
+        c = EXPLORATION * sqrt(log(self.n))
+        best, best_k = -1.0, 0
+        for k, v in enumerate(visits):
+            u = value[k] / v + c / sqrt(v)
+            if k == 0 and prior_bonus:
+                u += prior_bonus / (1 + v)
+            if u > best:
+                best, best_k = u, k
+        return best_k
+
+
+class Tree:
+    """One decoupled-UCT tree for snake `you` from `root`."""
+
+    def __init__(self, root: Position, you: str, prior: Optional[str] = None, seed: int = 0):
+        self.root_pos = root
+        self.you = you
+        self.rng = random.Random(seed)
+        self.root = _Node(root, (you, prior) if prior else None)
+        self.has_prior = prior is not None and self.root.moves.get(you, [None])[0] == prior
+        self.root_snakes = len(root.snakes)
+        self.iterations = 0
+
+    def _rollout(self, pos: Position) -> Dict[str, float]:
+        rng = self.rng
+        for _ in range(ROLLOUT_DEPTH):
+            if len(pos.snakes) <= 1 or pos.snake(self.you) is None:
+                break
+            joint = {}
+            for sid, moves in _rollout_moves(pos, _blocked(pos)).items():
+                # Mostly the planner's pick, sometimes any move it allows
+                joint[sid] = moves[0] if rng.random() < 0.75 else rng.choice(moves)
+            pos = pos.step(joint)
+        return score(pos, self.root_snakes)
+
+    def iterate(self) -> None:
+        node, pos = self.root, self.root_pos
+        path: List[Tuple[_Node, List[Tuple[str, int]]]] = []
+        while True:
+            if len(pos.snakes) <= 1 or pos.snake(self.you) is None:
+                values = score(pos, self.root_snakes)
+                break
+            choice = [(s.id, node.select(s.id, PRIOR_BONUS if node is self.root and s.id == self.you and self.has_prior else 0.0))
+                      for s in pos.snakes]
+            path.append((node, choice))
+            pos = pos.step({sid: node.moves[sid][k] for sid, k in choice})
+            key = tuple(k for _, k in choice)
+            child = node.children.get(key)
+            if child is None:
+                node.children[key] = _Node(pos)
+                values = self._rollout(pos)
+                break
+            node = child
+
+        for node, choice in path:
+            node.n += 1
+            for sid, k in choice:
+                node.visits[sid][k] += 1
+                node.value[sid][k] += values.get(sid, 0.0)
+        self.iterations += 1
+
+    def run(self, deadline: Deadline) -> None:
+        # One iteration is well under a millisecond even on 19x19 with
+        # several snakes; checking after each keeps the overrun to one
+        while True:
+            self.iterate()
+            if deadline.expired():
+                return
+
+    def root_stats(self) -> Dict[str, Tuple[int, float]]:
+        """Our root moves: (visits, total value)."""
+        moves = self.root.moves.get(self.you, [])
+        return {m: (self.root.visits[self.you][k], self.root.value[self.you][k]) for k, m in enumerate(moves)}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Root parallelisation
+# ──────────────────────────────────────────────────────────────────────────────
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        # A process leaving through multiprocessing (a server.MovePool worker)
+        # waits for its children, so the pool must be shut down first, and
+        # before its queues stop feeding their pipes (exit priority 10)
+        multiprocessing.util.Finalize(_pool, _pool.shutdown, exitpriority=20)
+    return _pool
+
+
+def start_pool(workers: int = WORKERS) -> None:
+    """Start the worker processes now rather than on the first move."""
+    if workers > 1:
+        pool = _get_pool(workers - 1)
+        for f in [pool.submit(os.getpid) for _ in range(workers - 1)]:
+            f.result()
+
+
+def _pack(pos: Position):
+    return (pos.grid.width, pos.grid.height, [(s.id, s.body, s.health) for s in pos.snakes], pos.food, pos.turn)
+
+
+def _unpack(packed) -> Position:
+    width, height, snakes, food, turn = packed
+    return Position(get_grid(width, height), [Snake(*s) for s in snakes], food, turn)
+
+
+def _search_worker(packed, you: str, prior: Optional[str], remaining: float, seed: int):
+    deadline = Deadline(time.monotonic() + remaining)
+    tree = Tree(_unpack(packed), you, prior, seed)
+    tree.run(deadline)
+    return tree.root_stats(), tree.iterations
+
+
+def mcts_move(board: Board, prior: Optional[str] = None, started: Optional[float] = None,
+              margin_ms: float = SAFETY_MARGIN_MS, workers: int = WORKERS) -> str:
+    """Our most visited root move after searching until the move's deadline."""
+    root = Position.from_board(board)
+    you = board.you.id
+    deadline = Deadline.from_timeout(board.timeout, started, margin_ms)
+
+    futures = []
+    if workers > 1:
+        # Leave the workers a little slack to ship their results back
+        pool = _get_pool(workers - 1)
+        packed = _pack(root)
+        futures = [pool.submit(_search_worker, packed, you, prior, deadline.remaining() - 0.01, board.turn * 31 + w)
+                   for w in range(1, workers)]
+
+    tree = Tree(root, you, prior, board.turn * 31)
+    tree.run(deadline)
+    totals = {m: list(s) for m, s in tree.root_stats().items()}
+    for f in futures:
+        stats, _iterations = f.result()
+        for m, (n, w) in stats.items():
+            t = totals.setdefault(m, [0, 0.0])
+            t[0] += n
+            t[1] += w
+
+    if not totals:
+        return prior or MOVES[0]
+    # Most visited; mean value breaks ties
+    return max(totals, key=lambda m: (totals[m][0], totals[m][1] / max(totals[m][0], 1)))
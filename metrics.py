@@ -0,0 +1,175 @@
+# metrics.py
+# -----------------------------------------------------------------------------
+# Move latency instrumentation.
+#
+# Code on the move path wraps its phases in `with span("name"):`. With
+# SNAKE_METRICS=1 every span is timed into a per-phase latency histogram, and
+# server.run_server exposes the histograms (plus a count of moves that came
+# close to game.timeout, and of planner phases skipped or cut short by the
+# move's deadline) at /metrics in Prometheus text format.
+#
+# When disabled, span() hands back one shared no-op context manager, so an
+# instrumented phase costs a function call and nothing is recorded.
+#
+# Worker processes (server.MovePool) can't update the server's histograms
+# directly; they queue their observations and ship them back with each move
+# (see forward_to_parent, drain and merge).
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from contextlib import nullcontext
+from threading import Lock
+from typing import Dict, List, Tuple
+import os
+import time
+
+ENABLED = os.environ.get("SNAKE_METRICS", "0") == "1"
+
+# A move whose handling takes more than this share of game.timeout counts as
+# near the timeout.
+NEAR_TIMEOUT = float(os.environ.get("METRICS_NEAR_TIMEOUT", "0.8"))
+
+# Upper bounds (seconds) of the histogram buckets; +Inf is implied.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.sum += seconds
+        self.count += 1
+        for k, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[k] += 1
+                break
+
+
+class Registry:
+    """Per-phase histograms and the move counters, safe to share between threads."""
+
+    def __init__(self):
+        self.phases: Dict[str, Histogram] = {}
+        self.moves = 0
+        self.near_timeout = 0
+        self.skipped: Dict[str, int] = {}
+        self.cut: Dict[str, int] = {}
+        self._lock = Lock()
+        self._forward = False
+        self._pending: List[Tuple[str, float]] = []
+        self._pending_phases: List[Tuple[List[str], List[str]]] = []
+
+    def observe(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            if self._forward:
+                self._pending.append((phase, seconds))
+                return
+            hist = self.phases.get(phase)
+            if hist is None:
+                hist = self.phases[phase] = Histogram()
+            hist.observe(seconds)
+
+    def count_move(self, seconds: float, timeout_ms: float) -> None:
+        with self._lock:
+            self.moves += 1
+            if seconds * 1000.0 >= NEAR_TIMEOUT * timeout_ms:
+                self.near_timeout += 1
+
+    def count_phases(self, skipped: List[str], cut: List[str]) -> None:
+        """One move's planner phases skipped and cut short (guard.MoveGuard)."""
+        with self._lock:
+            if self._forward:
+                self._pending_phases.append((skipped, cut))
+                return
+            for phase in skipped:
+                self.skipped[phase] = self.skipped.get(phase, 0) + 1
+            for phase in cut:
+                self.cut[phase] = self.cut.get(phase, 0) + 1
+
+    def forward_to_parent(self) -> None:
+        """Queue observations for drain() instead of recording them here."""
+        self._forward = True
+
+    def drain(self) -> Tuple[List[Tuple[str, float]], List[Tuple[List[str], List[str]]]]:
+        with self._lock:
+            out, self._pending = self._pending, []
+            phases, self._pending_phases = self._pending_phases, []
+        return out, phases
+
+    def merge(self, drained: Tuple[List[Tuple[str, float]], List[Tuple[List[str], List[str]]]]) -> None:
+        observations, phases = drained
+        for phase, seconds in observations:
+            self.observe(phase, seconds)
+        for skipped, cut in phases:
+            self.count_phases(skipped, cut)
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines = [
+            "# HELP snake_phase_seconds Time spent in each phase of handling a move.",
+            "# TYPE snake_phase_seconds histogram",
+        ]
+        with self._lock:
+            for phase in sorted(self.phases):
+                hist = self.phases[phase]
+                running = 0
+                for bound, n in zip(BUCKETS, hist.counts):
+                    running += n
+                    lines.append(f'snake_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {running}')
+                lines.append(f'snake_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {hist.count}')
+                lines.append(f'snake_phase_seconds_sum{{phase="{phase}"}} {hist.sum:.6f}')
+                lines.append(f'snake_phase_seconds_count{{phase="{phase}"}} {hist.count}')
+            lines += [
+                "# HELP snake_moves_total Moves answered.",
+                "# TYPE snake_moves_total counter",
+                f"snake_moves_total {self.moves}",
+                f"# HELP snake_moves_near_timeout_total Moves that took at least {NEAR_TIMEOUT:g} of game.timeout.",
+                "# TYPE snake_moves_near_timeout_total counter",
+                f"snake_moves_near_timeout_total {self.near_timeout}",
+                "# HELP snake_planner_phases_skipped_total Planner phases skipped for lack of time.",
+                "# TYPE snake_planner_phases_skipped_total counter",
+            ]
+            lines += [f'snake_planner_phases_skipped_total{{phase="{p}"}} {n}' for p, n in sorted(self.skipped.items())]
+            lines += [
+                "# HELP snake_planner_phases_cut_total Planner phases stopped early for lack of time.",
+                "# TYPE snake_planner_phases_cut_total counter",
+            ]
+            lines += [f'snake_planner_phases_cut_total{{phase="{p}"}} {n}' for p, n in sorted(self.cut.items())]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class _Span:
+    __slots__ = ("phase", "t0")
+
+    def __init__(self, phase: str):
+        self.phase = phase
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe(self.phase, time.perf_counter() - self.t0)
+        return False
+
+
+_NO_SPAN = nullcontext()
+
+
+def _timed_span(phase: str) -> _Span:
+    return _Span(phase)
+
+
+def _no_span(phase: str) -> nullcontext:
+    return _NO_SPAN
+
+
+span = _timed_span if ENABLED else _no_span
@@ -1,57 +1,98 @@
-from graph import get_food, get_heads, get_occupied, get_lengths
-from planner import choose_next_step
-from utils import Point, MoveResponse
-
-
-def _build_move(head: Point, node: Point):
-    if node.x < head.x:
-        move = "left"
-    elif node.x > head.x:
-        move = "right"
-    elif node.y < head.y:
-        move = "down"
+import os
+
+from board import Board, decode
+from distances import DistanceOracle
+from guard import MoveGuard
+from metrics import span
+from planner import choose_from_board
+from rules import Position, move_between
+from session import GameSession
+from utils import MoveResponse
+from zobrist import EXACT, TranspositionTable, get_zobrist
+
+# Which engine picks our moves: "planner" (the rule cascade), "search"
+# (iterative deepening within game.timeout, seeded with the planner's move) or
+# "mcts" (decoupled-UCT tree search with the planner's move as prior).
+# choose_move's `engine` argument overrides it per call.
+ENGINE = os.environ.get("SNAKE_ENGINE", "planner")
+
+def choose_move(game_state: dict | Board, session: GameSession | None = None, engine: str | None = None,
+                guard: MoveGuard | None = None):
+    """
+    With a `guard` the move is decided within its deadline (counted from when
+    the request arrived): the planner skips or cuts short phases it has no
+    time for, noting them on the guard, and the search engines stop in time.
+    """
+    board = game_state if isinstance(game_state, Board) else decode(game_state)
+    if session is None:
+        move = planner_move(board, guard=guard)
     else:
-        move = "up"
+        move = planner_move(board, guard=guard, cache=session.decisions)
+    return _respond(board, session, move, engine or ENGINE, guard)
 
-    return move
 
-def choose_move(game_state: dict):
-    board_width = game_state["board"]["width"]
-    board_height = game_state["board"]["height"]
-    blocked_cells = get_occupied(game_state, ignore_halo=True)
-    my_head = Point(game_state["you"]["head"]["x"], game_state["you"]["head"]["y"])
-    food_cells = get_food(game_state)
-    my_health = game_state["you"]["health"]
-    heads = get_heads(game_state)
-    their_length = get_lengths(game_state)[0]
-    my_length = game_state["you"]["length"]
-    turn = game_state["turn"]
+def planner_move(board: Board, oracle: DistanceOracle | None = None, guard: MoveGuard | None = None,
+                 cache: TranspositionTable | None = None, **precomputed) -> str:
+    """
+    The planner's move for `board`. With a `cache` (a game's
+    GameSession.decisions), a position seen before in the game, such as a
+    retried request, skips the planner. `precomputed` is passed on to
+    planner.choose_from_board (see batch.choose_moves). Decisions cut short by
+    the guard's deadline are not cached.
+    """
+    you = board.you
+    their_length = max((s.length for s in board.opponents), default=1)
 
     # Because we have some agressive opponents, allow for potential head-to-heads by
-    # ensuring we're at least as long as the opponent. If we are longer and there is a
-    # cell we're both likely to go for, choose it so we win any head-to-heads.
-    should_eat = (my_length <= their_length) or (my_health < 30)
-    # This is a bit of a risk because head-to-heads of equal-length snakes causes
-    # both to be eliminated.
-    threat_radius = 2 if (my_length < their_length) else 0
-
-    # print(f"{turn} - ", end="")
-
-    dest = choose_next_step(
-        board_width,
-        board_height,
-        my_head,
-        blocked_cells,
-        food_cells,
-        should_eat,
-        opponent_head=None if len(heads) == 0 else heads[0],
-        opponent_length=their_length,
-        threat_radius=threat_radius,
-    )
+    # ensuring we're at least as long as the longest opponent. If we are longer and there
+    # is a cell we're both likely to go for, choose it so we win any head-to-heads.
+    should_eat = (you.length <= their_length) or (you.health < 30)
+    # The planner steers clear of cells a longer opponent could also reach next turn.
+    # Equal-length head-to-heads (both eliminated) are a risk we accept.
+
+    key = None
+    if cache is not None:
+        key = decision_key(board)
+        cached = cache.lookup(key)
+        if cached is not None:
+            return cached[3]
+
+    with span("planner"):
+        dest = choose_from_board(board, should_eat, oracle=oracle, guard=guard, **precomputed)
 
     if dest is not None:
-        move = _build_move(my_head, Point(dest[0], dest[1]))
+        move = move_between(board.grid, you.head, dest)
     else:
         move = "up"
+    if key is not None and (guard is None or not (guard.skipped or guard.cut)):
+        cache.store(key, 0, EXACT, 0, move)
+    return move
+
+
+def decision_key(board: Board) -> int:
+    """
+    Key of everything the planner reads from `board`: bodies, healths, food
+    and hazards. Opponents take slots in request order, since the planner
+    treats the first one specially.
+    """
+    slots = {board.you.id: 0}
+    for s in board.opponents:
+        slots.setdefault(s.id, len(slots))
+    zobrist = get_zobrist(board.width, board.height)
+    return zobrist.position(Position.from_board(board), slots) ^ zobrist.hazards(board.hazards)
+
+
+def _respond(board: Board, session: GameSession | None, move: str, engine: str,
+             guard: MoveGuard | None = None) -> MoveResponse:
+    started = None if guard is None else guard.started
+    if engine == "search":
+        from search import search_move
+        with span("search"):
+            move = search_move(board, prior=move, started=started,
+                               tt=None if session is None else session.transpositions())
+    elif engine == "mcts":
+        from mcts import mcts_move
+        with span("mcts"):
+            move = mcts_move(board, prior=move, started=started)
 
     return MoveResponse(move=move, shout="Badger, badger, badger, mushroom!")
@@ -0,0 +1,136 @@
+# pathing.py
+# -----------------------------------------------------------------------------
+# Multi-goal shortest paths over the compact grid.
+#
+# nearest() answers "which of these cells is closest, how far, and which way"
+# with one search from the start that stops as soon as the closest goals are
+# settled, however many goals there are. It replaces one A* (or BFS) per goal.
+#
+# Unit costs run a level-by-level BFS. With `costs` (the price of entering
+# each cell, e.g. hazard_costs) it runs Dijkstra instead.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from heapq import heappop, heappush
+from typing import Iterable, List, Optional, Sequence
+
+from grid import Grid
+
+
+class Route:
+    """
+      goal:  the first closest goal found
+      cost:  its distance (steps, or summed entry costs)
+      ties:  every goal at that same distance, in search order
+      path:  cells from the start to `goal`, both inclusive
+    """
+
+    __slots__ = ("start", "goal", "cost", "ties", "_parent")
+
+    def __init__(self, start: int, goal: int, cost: float, ties: List[int], parent: List[int]):
+        self.start = start
+        self.goal = goal
+        self.cost = cost
+        self.ties = ties
+        self._parent = parent
+
+    def __repr__(self):
+        return f"<Route {self.start}->{self.goal} cost={self.cost} ties={len(self.ties)}>"
+
+    @property
+    def path(self) -> List[int]:
+        return self.path_to(self.goal)
+
+    def path_to(self, goal: int) -> List[int]:
+        """Path to any of `ties` (or any cell settled before them)."""
+        parent = self._parent
+        path = [goal]
+        while path[-1] != self.start:
+            path.append(parent[path[-1]])
+        path.reverse()
+        return path
+
+
+def hazard_costs(grid: Grid, hazards: Iterable[int], damage: float) -> List[float]:
+    """Entry cost per cell: one step, plus `damage` health on hazard cells."""
+    costs = [1.0] * grid.size
+    for c in hazards:
+        costs[c] = 1.0 + damage
+    return costs
+
+
+def nearest(grid: Grid, blocked: bytearray, start: int, goals: Iterable[int],
+            costs: Optional[Sequence[float]] = None) -> Optional[Route]:
+    """
+    Closest of `goals` from `start` through open cells, or None if none is
+    reachable. `start` itself is searched from even if blocked.
+    """
+    is_goal = bytearray(grid.size)
+    for g in goals:
+        is_goal[g] = 1
+    parent = [-1] * grid.size
+    if is_goal[start]:
+        return Route(start, start, 0, [start], parent)
+    if costs is None:
+        return _bfs(grid, blocked, start, is_goal, parent)
+    return _dijkstra(grid, blocked, start, is_goal, parent, costs)
+
+
+def _bfs(grid: Grid, blocked: bytearray, start: int, is_goal: bytearray, parent: List[int]) -> Optional[Route]:
+    nbrs = grid.neighbours
+    seen = bytearray(blocked)
+    seen[start] = 1
+    level = [start]
+    d = 0
+    while level:
+        d += 1
+        nxt: List[int] = []
+        hits: List[int] = []
+        for v in level:
+            for u in nbrs[v]:
+                if not seen[u]:
+                    seen[u] = 1
+                    parent[u] = v
+                    nxt.append(u)
+                    if is_goal[u]:
+                        hits.append(u)
+        if hits:
+            return Route(start, hits[0], d, hits, parent)
+        level = nxt
+    return None
+
+
+def _dijkstra(grid: Grid, blocked: bytearray, start: int, is_goal: bytearray, parent: List[int],
+              costs: Sequence[float]) -> Optional[Route]:
+    nbrs = grid.neighbours
+    inf = float("inf")
+    dist = [inf] * grid.size
+    dist[start] = 0.0
+    done = bytearray(grid.size)
+    heap = [(0.0, 0, start)]
+    seq = 1
+    hits: List[int] = []
+    best = inf
+    while heap:
+        d, _, v = heappop(heap)
+        if done[v]:
+            continue
+        if d > best:
+            break
+        done[v] = 1
+        if is_goal[v]:
+            best = d
+            hits.append(v)
+            continue
+        for u in nbrs[v]:
+            if blocked[u] or done[u]:
+                continue
+            du = d + costs[u]
+            if du < dist[u]:
+                dist[u] = du
+                parent[u] = v
+                heappush(heap, (du, seq, u))
+                seq += 1
+    if not hits:
+        return None
+    return Route(start, hits[0], best, hits, parent)
@@ -1,25 +1,42 @@
-# simple_battlesnake.py
+# planner.py
 # -----------------------------------------------------------------------------
-# Stateless move chooser using only NetworkX and (x, y) tuple nodes.
+# The rule cascade behind move.choose_move, over a compact, array-backed grid
+# (see grid.py).
 #
 # Rules implemented:
 # 1) Move toward the largest open space (directional: past the first step).
 # 2) If already at (or tied for) the largest open space, pick a random nearby
 #    cell among the best directions.
 # 3) If hungry, prefer food that lies inside the largest open space(s).
-#    Move along a shortest path toward the nearest such food.
+#    Move along a shortest path toward the nearest such food (one
+#    pathing.nearest search; on boards with hazards, the path costing the
+#    least health).
 # 4) If the opponent head is "close", avoid stepping into its head square or
 #    any square it could move into next turn. If all moves are threatened,
 #    fall back to the unfiltered legal moves.
 #
-# No cross-turn state. Nodes are plain (x, y) tuples.
+# Space sizes (rules 1 and 2, and the space-delta tie-breaker) count body
+# cells we would reach only after they free up, when the caller has the
+# bodies' order (choose_from_board, via board.Board.vacate).
+#
+# No cross-turn state. Internally cells are flat integer indices; the public
+# API takes and returns (x, y) coordinates (choose_next_step) or reads a
+# decoded board.Board and returns a cell index (choose_from_board).
 # -----------------------------------------------------------------------------
 
 from __future__ import annotations
-from typing import Iterable, Optional, Tuple, Dict, Set, List
+from typing import Callable, Iterable, Optional, Sequence, Tuple, Dict, Set, List
 import random
-import networkx as nx
 
+from board import Board
+from distances import DistanceOracle
+from doors import DoorAnalysis
+from grid import Components, Grid, get_grid, centre_cells, label_components, overlay, timed_flood, undo
+from guard import MoveGuard
+from metrics import span
+from pathing import hazard_costs, nearest
+from territory import evaluate
+from threats import DEADLY, ThreatModel
 from utils import Point
 
 Coord = Point
@@ -44,55 +61,54 @@ def neighbours4(p: Coord, width: int, height: int) -> List[Coord]:
 
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Graph construction
+# Grid construction
 # ──────────────────────────────────────────────────────────────────────────────
 
-def build_open_graph(width: int, height: int, blocked: Iterable[Coord], head: Coord) -> nx.Graph:
+def build_open_grid(width: int, height: int, blocked: Iterable[Coord], head: Coord) -> Tuple[Grid, bytearray]:
     """
-    Create a 4-neighbour grid and remove blocked nodes, except we keep `head`
-    so reachability and paths are computable from the current position.
+    Fetch the (cached) grid for this board size and build its obstacle mask,
+    except we keep `head` open so reachability and paths are computable from
+    the current position.
     """
-    G = nx.grid_2d_graph(width, height)  # nodes are (x, y) tuples
-    blocked_set = set(blocked)
-    blocked_set.discard(head)
-    G.remove_nodes_from([b for b in blocked_set if b in G])
-    return G
+    grid = get_grid(width, height)
+    mask = grid.mask(blocked)
+    h = grid.index_or_none(head)
+    if h is not None:
+        mask[h] = 0
+    return grid, mask
 
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Directional space: size of the area if we step into each neighbour
 # ──────────────────────────────────────────────────────────────────────────────
 
-def directional_spaces(H: nx.Graph, head: Coord) -> Tuple[Dict[Coord, int], Dict[Coord, Set[Coord]]]:
+def directional_spaces(grid: Grid, blocked: bytearray, head: int,
+                       vacate: Optional[List[int]] = None) -> Tuple[Dict[int, int], Dict[int, int], Components]:
     """
-    Compute, for each neighbour n of `head`, the size and node set of the
-    connected component reachable from n when the head node is removed.
+    Label the open cells with the head removed, then report, for each open
+    neighbour n of `head`, the component it leads into and that component's size.
     Returns:
       size_by_n[n]: int
-      area_by_n[n]: set of coords in that component
+      comp_by_n[n]: component id (neighbours sharing an id share an area)
+      comps:        the labelling itself (see grid.Components)
+
+    With `vacate` (board.Board.vacate), size_by_n[n] also counts body cells
+    we could only enter after they free up, stepping into n next turn (see
+    grid.timed_flood). Components stay those of the open cells.
     """
-    if head not in H:
-        return {}, {}
-
-    H_minus_head = H.copy()
-    H_minus_head.remove_node(head)
-
-    # Build a mapping from node -> component set once (cheap on small boards)
-    comp_sets: List[Set[Coord]] = [set(c) for c in nx.connected_components(H_minus_head)]
-    node_to_comp: Dict[Coord, Set[Coord]] = {}
-    for comp in comp_sets:
-        for v in comp:
-            node_to_comp[v] = comp
-
-    size_by_n: Dict[Coord, int] = {}
-    area_by_n: Dict[Coord, Set[Coord]] = {}
-    for n in H.neighbors(head):
-        comp = node_to_comp.get(n)
-        if comp is None:
+    without_head = bytearray(blocked)
+    without_head[head] = 1
+    comps = label_components(grid, without_head)
+
+    size_by_n: Dict[int, int] = {}
+    comp_by_n: Dict[int, int] = {}
+    for n in grid.neighbours[head]:
+        k = comps.labels[n]
+        if k < 0:
             continue
-        area_by_n[n] = comp
-        size_by_n[n] = len(comp)
-    return size_by_n, area_by_n
+        comp_by_n[n] = k
+        size_by_n[n] = comps.sizes[k] if vacate is None else len(timed_flood(grid, vacate, n, 1))
+    return size_by_n, comp_by_n, comps
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -118,71 +134,85 @@ def space_delta_choice(
     blocked_now, candidates,
     w_opp=1.3,
     free_tail: tuple[int,int] | None = None,  # if your tail will vacate
+    other_heads: Iterable[Coord] = (),  # further opponents, weighed like the first
 ):
     if not candidates:
         return None
 
-    def comp_size_after_move(next_head):
-        # Build open graph AFTER we move to next_head (i.e. that cell becomes blocked)
-        blocked_after = set(blocked_now)
-        if free_tail is not None:
-            blocked_after.discard(free_tail)
-        blocked_after.add(next_head)
-
-        G2 = nx.grid_2d_graph(width, height)
-        blocked_copy = blocked_after.copy()
-        # Keep heads present so BFS starts exist
-        blocked_copy.discard(next_head)
-        if opponent_head is not None:
-            blocked_copy.discard(opponent_head)
-        G2.remove_nodes_from([b for b in blocked_copy if b in G2])
-
-        # our space
-        our = 0
-        if next_head in G2:
-            comp = next(c for c in nx.connected_components(G2) if next_head in c)
-            our = len(comp)
-
-        # opponent space
-        opp = 0
-        if opponent_head is not None and opponent_head in G2:
-            comp = next(c for c in nx.connected_components(G2) if opponent_head in c)
-            opp = len(comp)
-
-        return our, opp
+    grid = get_grid(width, height)
+    blocked_after = grid.mask(blocked_now)
+    if free_tail is not None and grid.contains(free_tail):
+        blocked_after[grid.index(free_tail)] = 0
+    opps = [grid.index(o) for o in (opponent_head, *other_heads) if o is not None and grid.contains(o)]
+    best = space_delta_cells(grid, blocked_after, [grid.index(n) for n in candidates], opps, w_opp)
+    return None if best is None else grid.coords[best]
+
+
+def space_delta_cells(grid: Grid, blocked: bytearray, candidates: Sequence[int], opps: Sequence[int],
+                      w_opp: float = 1.3, vacate: Optional[List[int]] = None,
+                      stop: Optional[Callable[[], bool]] = None) -> Optional[int]:
+    """
+    space_delta_choice over cell indices; `blocked` is restored before
+    returning. With `vacate` the territory is timed (see territory.evaluate),
+    which is what free_tail approximates for a single tail: our wave starts
+    on turn 1, when we enter the candidate, and the opponents' on turn 0,
+    so our counts agree with directional_spaces. Once `stop()`
+    returns True, the best candidate scored so far is returned.
+    """
+    def space_after_move(next_head):
+        # Apply our move in place; heads stay open so every BFS has a start,
+        # and the board is restored before the next candidate.
+        heads = [next_head, *opps]
+        saved = overlay(blocked, heads, 0)
+        try:
+            t = evaluate(grid, blocked, heads, vacate, starts)
+        finally:
+            undo(blocked, saved)
+        return t.reachable[0], sum(t.reachable[1:])
 
+    starts = [1] + [0] * len(opps)
     best_n, best_score = None, float("-inf")
     for n in candidates:
-        our, opp = comp_size_after_move(n)
+        if best_n is not None and stop is not None and stop():
+            break
+        our, opp = space_after_move(n)
         score = our - w_opp * opp
         if score > best_score:
             best_score, best_n = score, n
     return best_n
 
 
-def trap_door_target(H, head, opponent_head, opp_len, small_limit_extra=3):
-    if opponent_head is None or head not in H or opponent_head not in H:
+def trap_door_target(grid, blocked, head, opponent_head, opp_len, small_limit_extra=3, doors=None, oracle=None):
+    """
+    Nearest articulation point ("door") we reach strictly before the opponent
+    whose closing leaves the opponent's side smaller than opp_len + small_limit_extra.
+    `blocked` must leave the opponent head open. `doors` (a DoorAnalysis
+    rooted at the opponent head) and `oracle` (a DistanceOracle over
+    `blocked`, or over the planner's mask, which differs only in closing the
+    opponent head) may be passed in to share them across phases; otherwise
+    they are built here.
+    """
+    if opponent_head is None or blocked[head] or blocked[opponent_head]:
+        return None
+
+    if doors is None:
+        doors = DoorAnalysis(grid, blocked, opponent_head)
+    if head not in doors:
         return None
 
-    you_d = nx.single_source_shortest_path_length(H, head)
-    opp_d = nx.single_source_shortest_path_length(H, opponent_head)
+    if oracle is None:
+        oracle = DistanceOracle(grid, blocked)
+    you_d = oracle.distances(head)
+    opp_d = oracle.distances(opponent_head)
 
     best_v, best_d = None, float("inf")
-    for v in nx.articulation_points(H):
-        dy, do = you_d.get(v), opp_d.get(v)
-        if dy is None or do is None:
-            continue
-        if dy >= do:        # you don't win the door race
+    for v in doors.articulation_points:
+        dy, do = you_d[v], opp_d[v]
+        if dy >= do or v == head:  # you don't win the door race (or stand in it)
             continue
 
-        # Remove door and see how big the opponent-side becomes
-        H2 = H.copy()
-        H2.remove_node(v)
-        if opponent_head not in H2:
-            opp_side = 0
-        else:
-            comp = next(c for c in nx.connected_components(H2) if opponent_head in c)
-            opp_side = len(comp)
+        # Size of the opponent's side once the door closes
+        opp_side = doors.root_side(v)
 
         if opp_side < (opp_len + small_limit_extra) and dy < best_d:
             best_d, best_v = dy, v
@@ -207,6 +237,9 @@ def choose_next_step(
     opponent_length: int = 1,
     threat_radius: int = 3,
     rnd: random.Random = random,
+    oracle: Optional[DistanceOracle] = None,
+    opponents: Optional[Sequence[Tuple[Coord, int]]] = None,
+    my_length: Optional[int] = None,
 ) -> Optional[Coord]:
     """
     Stateless move chooser:
@@ -214,118 +247,272 @@ def choose_next_step(
       - Not hungry: go to centre of the largest space; if already there,
         go to centre of the next-largest space; else pick the neighbour with
         greatest local degree (options), breaking ties away from the opponent.
+
+    `oracle` may carry a mask (and searches already run over it); it must
+    describe the same board as `blocked`.
+
+    With `opponents` ((head, length) for every opponent) and `my_length`, the
+    hazard filter and space tie-breaker consider all of them through a
+    threats.ThreatModel instead of `opponent_head` and `threat_radius` alone.
     """
-    H = build_open_graph(width, height, blocked, head)
-    if head not in H:
+    blocked = set(blocked)
+    grid = get_grid(width, height)
+    if not grid.contains(head):
+        return None
+    if oracle is not None and oracle.grid is grid:
+        mask = oracle.blocked
+    else:
+        grid, mask = build_open_grid(width, height, blocked, head)
+        oracle = DistanceOracle(grid, mask)
+    h = grid.index(head)
+
+    legal = [n for n in grid.neighbours[h] if not mask[n]]
+    if not legal:
         return None
 
-    legal = [n for n in H.neighbors(head)]
+    # Avoid opponents' immediate reach if close
+    if opponents is not None and my_length is not None:
+        # Any neighbour a longer opponent could also step into next turn
+        threats = ThreatModel(grid, mask, h, my_length,
+                              [(grid.index(o), n) for o, n in opponents if grid.contains(o)])
+        hazards = {n for n in legal if threats.danger[n] == DEADLY}
+        other_heads = [o for o, _ in opponents if o != opponent_head]
+    else:
+        hazards = {grid.index(c) for c in hazard_cells(width, height, head, opponent_head, threat_radius)
+                   if grid.contains(c)}
+        other_heads = []
+
+    step = _plan(
+        grid, mask, h, legal, hazards,
+        foods=[grid.index(f) for f in foods if grid.contains(f)],
+        hungry=hungry,
+        opp=grid.index_or_none(opponent_head),
+        opponent_length=opponent_length,
+        other_heads=[grid.index(o) for o in other_heads if grid.contains(o)],
+        rnd=rnd,
+        oracle=oracle,
+    )
+    return None if step is None else grid.coords[step]
+
+
+def choose_from_board(
+    board: Board,
+    hungry: bool,
+    rnd: random.Random = random,
+    oracle: Optional[DistanceOracle] = None,
+    legal: Optional[List[int]] = None,
+    danger: Optional[bytearray] = None,
+    spaces: Optional[Tuple[Dict[int, int], Dict[int, int], Components]] = None,
+    area_centres: Optional[Dict[int, List[int]]] = None,
+    guard: Optional[MoveGuard] = None,
+) -> Optional[int]:
+    """
+    choose_next_step for a decoded board.Board, considering every opponent.
+    Returns the cell index to move into, or None if we have no legal move.
+
+    With a `guard`, phases that would start after its deadline are skipped
+    and long ones stop early (see guard.py); the answer is the best decision
+    reached by then, at worst the cheap fallback settled before any of them.
+
+    `legal`, `danger` (threats.ThreatModel.danger), `spaces`
+    (directional_spaces with board.vacate) and `area_centres` (the
+    centre_cells of some of those areas, by component id) may come
+    precomputed for this board, as batch.choose_moves does for many boards
+    at once.
+    """
+    grid = board.grid
+    if oracle is not None and oracle.grid is grid:
+        mask = oracle.blocked
+    else:
+        mask = board.mask()
+        oracle = DistanceOracle(grid, mask)
+    h = board.you.head
+
+    if legal is None:
+        legal = [n for n in grid.neighbours[h] if not mask[n]]
     if not legal:
         return None
 
-    # Avoid opponent's immediate reach if close
-    hazards = hazard_cells(width, height, head, opponent_head, threat_radius)
+    opponents = board.opponents
+    with span("planner.threats"):
+        if danger is None and (guard is None or guard.allow("threats")):
+            danger = ThreatModel(grid, mask, h, board.you.length, [(o.head, o.length) for o in opponents]).danger
+        if danger is not None:
+            hazards = {n for n in legal if danger[n] == DEADLY}
+        else:
+            # No time for the model: the cells next to a longer opponent's
+            # head, which are the ones it calls DEADLY among our moves anyway
+            longer = [o.head for o in opponents if o.length > board.you.length]
+            hazards = {n for n in legal if any(o in grid.neighbours[n] for o in longer)}
+    opp = opponents[0].head if opponents else None
+
+    return _plan(
+        grid, mask, h, legal, hazards,
+        foods=board.food,
+        hungry=hungry,
+        opp=opp,
+        opponent_length=opponents[0].length if opponents else 1,
+        other_heads=[o.head for o in opponents if o.head != opp],
+        rnd=rnd,
+        oracle=oracle,
+        costs=hazard_costs(grid, board.hazards, board.hazard_damage) if board.hazards else None,
+        vacate=board.vacate,
+        spaces=spaces,
+        area_centres=area_centres,
+        guard=guard,
+    )
+
+
+def _plan(
+    grid: Grid,
+    mask: bytearray,
+    h: int,
+    legal: List[int],
+    hazards: Set[int],
+    foods: Iterable[int],
+    hungry: bool,
+    opp: Optional[int],
+    opponent_length: int,
+    other_heads: List[int],
+    rnd: random.Random,
+    oracle: DistanceOracle,
+    costs: Optional[List[float]] = None,
+    vacate: Optional[List[int]] = None,
+    spaces: Optional[Tuple[Dict[int, int], Dict[int, int], Components]] = None,
+    area_centres: Optional[Dict[int, List[int]]] = None,
+    guard: Optional[MoveGuard] = None,
+) -> Optional[int]:
+    coords = grid.coords
     safe_legal = [n for n in legal if n not in hazards] or legal  # fall back if all hazardous
-    # safe_legal = legal
+    without_head = bytearray(mask)
+    without_head[h] = 1
+
+    # Cheap fallback, settled before any costly phase so there is always an
+    # answer: the safe neighbour with the highest local degree with head
+    # removed (keeps options); tie-break by distance from opponent head.
+    def local_degree(n: int) -> int:
+        return sum(1 for u in grid.neighbours[n] if not without_head[u])
+    def away_from_opp(n: int) -> int:
+        return manhattan(coords[n], coords[opp]) if opp is not None else 0
+
+    # Maximise (degree, distance from opponent)
+    fallback = max(safe_legal, key=lambda n: (local_degree(n), away_from_opp(n)))
+
+    def allowed(phase: str) -> bool:
+        return guard is None or guard.allow(phase)
+
+    def stop(phase: str) -> Optional[Callable[[], bool]]:
+        return None if guard is None else lambda: guard.expired(phase)
+
+    if not allowed("directional_spaces"):
+        return fallback
     # Directional spaces (with head removed)
-    size_by_n, area_by_n = directional_spaces(H, head)
+    with span("planner.directional_spaces"):
+        if spaces is None:
+            spaces = directional_spaces(grid, mask, h, vacate)
+        size_by_n, comp_by_n, comps = spaces
     if not size_by_n:  # degenerate: just move safely
         return rnd.choice(safe_legal)
 
     # Build unique areas ranked by size (largest first)
     # Several neighbours can lead into the same area; we collapse them.
     areas = {}
-    for n, area in area_by_n.items():
-        key = frozenset(area)
-        rec = areas.setdefault(key, {"size": len(area), "area": area, "neighs": []})
+    for n, k in comp_by_n.items():
+        rec = areas.setdefault(k, {"size": 0, "comp": k, "neighs": []})
+        rec["size"] = max(rec["size"], size_by_n[n])
         rec["neighs"].append(n)
     ranked = sorted(areas.values(), key=lambda r: r["size"], reverse=True)
     best = ranked[0]
     foods_set = set(foods)
 
-    # Helper: step toward a target node, preferring a safe first step
-    def step_toward(target: Coord) -> Optional[Coord]:
-        if target not in H or head not in H:
+    # Helper: step toward a target cell, preferring a safe first step
+    def step_toward(target: int) -> Optional[int]:
+        if mask[target]:
             return None
-        try:
-            path = nx.shortest_path(H, head, target)
-            if len(path) >= 2 and path[1] in safe_legal:
-                return path[1]
-        except nx.NetworkXNoPath:
-            pass
+        step = oracle.first_step(h, target)
+        if step is not None and step in safe_legal:
+            return step
         # If the exact next step is hazardous, choose the safe neighbour that gets closest to target
-        try:
-            dist_to_target = nx.single_source_shortest_path_length(H, target)
-            candidates = [n for n in safe_legal if n in dist_to_target]
-            if candidates:
-                return min(candidates, key=lambda n: dist_to_target[n])
-        except nx.NetworkXError:
-            pass
+        dist_to_target = oracle.distances(target)
+        candidates = [n for n in safe_legal if dist_to_target[n] >= 0]
+        if candidates:
+            return min(candidates, key=lambda n: dist_to_target[n])
         return None
 
-    # Compute centre(s) of an area; pick the one closest to our head
-    def area_centre(area: Set[Coord]) -> Optional[Coord]:
-        if not area:
-            return None
-        H_area = H.subgraph(area)
-        try:
-            centres = list(nx.center(H_area))
-        except nx.NetworkXError:
-            centres = []
-        if not centres:
+    # Compute centre(s) of an area; pick the one closest to our head.
+    # Memoised per area for the rest of this request.
+    area_oracle = DistanceOracle(grid, without_head)
+    centre_memo: Dict[int, Optional[int]] = {}
+
+    def area_centre(comp: int) -> Optional[int]:
+        if comp in centre_memo:
+            return centre_memo[comp]
+        if not allowed("area_centre"):
             return None
-        d_from_head = nx.single_source_shortest_path_length(H, head)
-        return min(centres, key=lambda c: d_from_head.get(c, 10**9))
+        with span("planner.area_centre"):
+            cells = comps.cells(comp)
+            if area_centres is not None and comp in area_centres:
+                centres = area_centres[comp]
+            else:
+                centres = centre_cells(grid, without_head, cells, distances=area_oracle.distances,
+                                       stop=stop("area_centre")) if cells else []
+            centre = None
+            if centres:
+                d_from_head = oracle.distances(h)
+                centre = min(centres, key=lambda c: d_from_head[c] if d_from_head[c] >= 0 else 10**9)
+        centre_memo[comp] = centre
+        return centre
 
     # ── Hungry: prefer food inside the largest area(s)
-    if hungry and foods_set:
-        # Among neighbours that lead into an area containing food and having max size,
-        # pick the nearest such food.
-        max_size = best["size"]
-        best_dirs = [
-            n for n, sz in size_by_n.items()
-            if sz == max_size and (area_by_n.get(n, set()) & foods_set)
-        ]
-        if best_dirs:
-            d_from_head = nx.single_source_shortest_path_length(H, head)
-            best_food, best_dir, best_dist = None, None, 10**9
-            for n in best_dirs:
-                for f in area_by_n[n] & foods_set:
-                    d = d_from_head.get(f)
-                    if d is not None and d < best_dist:
-                        best_food, best_dir, best_dist = f, n, d
-            if best_food is not None:
-                step = step_toward(best_food)
-                if step is not None:
-                    return step
-                if best_dir in safe_legal:
-                    return best_dir
+    with span("planner.food"):
+        if hungry and foods_set and allowed("food"):
+            # Among neighbours that lead into an area containing food and having max size,
+            # pick the nearest such food.
+            max_size = best["size"]
+            food_comps = {comps.labels[f] for f in foods_set}
+            best_dirs = [
+                n for n, sz in size_by_n.items()
+                if sz == max_size and comp_by_n[n] in food_comps
+            ]
+            if best_dirs:
+                # One search from the head to whichever such food is nearest;
+                # among equally near ones the earliest direction, then the
+                # lowest cell, wins.
+                first_dir: Dict[int, Tuple[int, int]] = {}
+                for r, n in enumerate(best_dirs):
+                    first_dir.setdefault(comp_by_n[n], (r, n))
+                route = nearest(grid, mask, h, [f for f in foods_set if comps.labels[f] in first_dir], costs)
+                if route is not None:
+                    best_food = min(route.ties, key=lambda f: (first_dir[comps.labels[f]][0], f))
+                    best_dir = first_dir[comps.labels[best_food]][1]
+                    # Unit costs: the same first step as any other target.
+                    # Hazard costs: along the path that costs the least health.
+                    step = None if costs is None else route.path_to(best_food)[1]
+                    if step not in safe_legal:
+                        step = step_toward(best_food)
+                    if step is not None:
+                        return step
+                    if best_dir in safe_legal:
+                        return best_dir
         # If no food lies in the largest area(s), we fall through to the non-hungry logic.
 
 
     # 2a) Door trap (if opponent present). Try once; if we get a target, step toward it.
-    if opponent_head is not None:
-        door = trap_door_target(H, head, opponent_head, opp_len=opponent_length)  # you have this value in your state
+    if opp is not None and allowed("trap_door_target"):
+        with span("planner.trap_door_target"):
+            # The opponent head is blocked in `mask`; the doors are found from it
+            door_mask = bytearray(mask)
+            door_mask[opp] = 0
+            door = trap_door_target(grid, door_mask, h, opp, opp_len=opponent_length, oracle=oracle)
         if door is not None:
             # step toward door, preferring a safe first step
-            try:
-                path = nx.shortest_path(H, head, door)
-                if len(path) >= 2 and path[1] in safe_legal:
-                    return path[1]
-            except nx.NetworkXNoPath:
-                pass
-            # fallback: the safe neighbour that gets closest to the door
-            try:
-                dist_to_door = nx.single_source_shortest_path_length(H, door)
-                cand = [n for n in safe_legal if n in dist_to_door]
-                if cand:
-                    return min(cand, key=lambda n: dist_to_door[n])
-            except nx.NetworkXError:
-                pass
+            step = step_toward(door)
+            if step is not None:
+                return step
 
     # ── Not hungry (or hungry but no food in largest area): go to centre of largest area
-    centre1 = area_centre(best["area"])
-    if centre1 is not None and head != centre1:
+    centre1 = area_centre(best["comp"])
+    if centre1 is not None and h != centre1:
         step = step_toward(centre1)
         if step is not None:
             return step
@@ -334,7 +521,7 @@ def choose_next_step(
     # Strategy: head to the centre of the next-largest area (if any).
     if len(ranked) > 1:
         second = ranked[1]
-        centre2 = area_centre(second["area"])
+        centre2 = area_centre(second["comp"])
         if centre2 is not None:
             step = step_toward(centre2)
             if step is not None:
@@ -343,31 +530,13 @@ def choose_next_step(
 
     # 2c) If you still have multiple equivalent candidates (or as a general tie-breaker),
     #     pick the move that maximizes our_space - 1.3*opp_space after we move.
-    step = space_delta_choice(
-        width, height,
-        head=head,
-        opponent_head=opponent_head,
-        blocked_now=set(blocked),
-        candidates=safe_legal,
-        w_opp=1.5,
-        free_tail=None,  # or your tail if you know it will vacate
-    )
-    if step is not None:
-        return step
-
-    # No second area (or couldn’t step safely): pick neighbour with highest local degree
-    # in H with head removed (keeps options); tie-break by distance from opponent head.
-    H_minus_head = H.copy()
-    H_minus_head.remove_node(head)
-    def local_degree(n: Coord) -> int:
-        return H_minus_head.degree(n) if n in H_minus_head else 0
-    def away_from_opp(n: Coord) -> int:
-        return manhattan(n, opponent_head) if opponent_head is not None else 0
-
-    candidates = [n for n in safe_legal]
-    if not candidates:
-        candidates = legal  # absolute fallback
+    opps = [o for o in (opp, *other_heads) if o is not None]
+    if allowed("space_delta_choice"):
+        with span("planner.space_delta_choice"):
+            step = space_delta_cells(grid, bytearray(mask), safe_legal, opps, w_opp=1.5, vacate=vacate,
+                                     stop=stop("space_delta_choice"))
+        if step is not None:
+            return step
 
-    # Maximise (degree, distance from opponent)
-    best_n = max(candidates, key=lambda n: (local_degree(n), away_from_opp(n)))
-    return best_n
+    # No second area (or couldn’t step safely): the fallback from the top
+    return fallback
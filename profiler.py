@@ -0,0 +1,268 @@
+# profiler.py
+# -----------------------------------------------------------------------------
+# Opt-in profiling of individual /move requests.
+#
+# With PROFILE_DIR set, main.move runs every move through a Profiler, which
+# picks moves to profile in two ways:
+#
+#   sampled  PROFILE_SAMPLE of moves (a fraction, 0 to 1) run under cProfile,
+#            one at a time per process. Written as <stem>.prof (pstats; read
+#            with `python -m pstats`, snakeviz, or any pstats flame graph).
+#   slow     moves still running PROFILE_SLOW_MS after the request arrived
+#            have their stack sampled every PROFILE_INTERVAL_MS by a
+#            background thread until they finish. Written as <stem>.folded,
+#            collapsed stacks ("outer;inner count") for flamegraph.pl or
+#            speedscope; it covers the move from the threshold on. While the
+#            move holds the GIL, the sampler gets a turn at most every
+#            sys.getswitchinterval() (5 ms by default).
+#
+# Each dump comes with <stem>.json: why it was taken, how long the move took,
+# and the game state, so `move.choose_move` can be re-run on it. Stems are
+# <UTC time>.<game id>.t<turn>.<pid>.<kind>. Once the directory holds more
+# than PROFILE_MAX_FILES dumps or PROFILE_MAX_MB megabytes, the oldest are
+# deleted.
+#
+# A move not picked costs one random draw (sampling) and one queue put (slow
+# threshold); profilers only ever run on the moves they record. Files are
+# written by the background thread, which starts on first use in each process
+# (workers of server.MovePool each run their own).
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from heapq import heappop, heappush
+from typing import Callable, Dict, List, Optional, Tuple
+import cProfile
+import json
+import os
+import pstats
+import queue
+import random
+import sys
+import threading
+import time
+
+PROFILE_SAMPLE = float(os.environ.get("PROFILE_SAMPLE", "0"))
+PROFILE_SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", "0"))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "100"))
+PROFILE_MAX_MB = float(os.environ.get("PROFILE_MAX_MB", "50"))
+
+QUEUE_SIZE = 1000
+SUFFIXES = (".json", ".prof", ".folded")
+
+
+class _Watch:
+    """A move being timed against the slow threshold."""
+
+    __slots__ = ("game_state", "thread", "started", "at", "done", "elapsed", "stacks", "samples")
+
+    def __init__(self, game_state: dict, thread: int, started: float, at: float):
+        self.game_state = game_state
+        self.thread = thread
+        self.started = started
+        self.at = at
+        self.done = False
+        self.elapsed = 0.0
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+
+
+class Profiler:
+    """
+    Profiles sampled and slow moves into `directory`. Safe to call from any
+    thread; the background thread starts on first use in each process.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample: float = PROFILE_SAMPLE,
+        slow_ms: float = PROFILE_SLOW_MS,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+        max_files: int = PROFILE_MAX_FILES,
+        max_mb: float = PROFILE_MAX_MB,
+    ):
+        self.directory = directory
+        self.sample = sample
+        self.slow = slow_ms / 1000.0
+        self.interval = interval_ms / 1000.0
+        self.max_files = max_files
+        self.max_bytes = int(max_mb * 2**20)
+        self.dropped = 0
+        # A private generator, so sampling never shifts the game's random stream
+        self._rng = random.Random()
+        self._busy = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._pid = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return f"<Profiler {self.directory} sample={self.sample} slow={self.slow * 1000:.0f}ms>"
+
+    def _put(self, item):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(QUEUE_SIZE)
+                    threading.Thread(target=self._run, args=(self._queue,), name="profiler", daemon=True).start()
+                    self._pid = os.getpid()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def call(self, handler: Callable[[dict, Optional[float]], dict], game_state: dict, received: Optional[float] = None) -> dict:
+        """handler(game_state, received), profiled if this move is picked."""
+        started = time.monotonic() if received is None else received
+        if self.sample and self._rng.random() < self.sample and self._busy.acquire(blocking=False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                try:
+                    return handler(game_state, received)
+                finally:
+                    profile.disable()
+            finally:
+                self._busy.release()
+                self._put(("sampled", game_state, time.monotonic() - started, profile))
+        if not self.slow:
+            return handler(game_state, received)
+        watch = _Watch(game_state, threading.get_ident(), started, started + self.slow)
+        self._put(("watch", watch))
+        try:
+            return handler(game_state, received)
+        finally:
+            watch.elapsed = time.monotonic() - started
+            watch.done = True
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # Background thread
+    # ──────────────────────────────────────────────────────────────────────────
+
+    def _run(self, q: queue.Queue):
+        pending: List[Tuple[float, int, _Watch]] = []  # heap by threshold time
+        sampling: List[_Watch] = []
+        seq = 0
+        next_sample = 0.0
+        while True:
+            now = time.monotonic()
+            if sampling:
+                timeout = max(next_sample - now, 0.0)
+            elif pending:
+                timeout = max(pending[0][0] - now, 0.0)
+            else:
+                timeout = None
+            try:
+                item = q.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                if item[0] == "watch":
+                    heappush(pending, (item[1].at, seq, item[1]))
+                    seq += 1
+                else:
+                    _, game_state, elapsed, profile = item
+                    self._dump("sampled", game_state, elapsed, profile=profile)
+
+            now = time.monotonic()
+            while pending and pending[0][0] <= now:
+                watch = heappop(pending)[2]
+                if not watch.done:
+                    if not sampling:
+                        next_sample = now
+                    sampling.append(watch)
+            if not sampling or now < next_sample:
+                continue
+
+            frames = sys._current_frames()
+            for watch in sampling:
+                if watch.done:
+                    self._dump("slow", watch.game_state, watch.elapsed, stacks=watch.stacks, samples=watch.samples)
+                    continue
+                frame = frames.get(watch.thread)
+                if frame is not None:
+                    stack = _collapse(frame)
+                    watch.stacks[stack] = watch.stacks.get(stack, 0) + 1
+                    watch.samples += 1
+            del frames
+            sampling = [w for w in sampling if not w.done]
+            next_sample = now + self.interval
+
+    def _dump(self, kind: str, game_state: dict, elapsed: float,
+              profile: Optional[cProfile.Profile] = None, stacks: Optional[Dict[str, int]] = None, samples: int = 0):
+        try:
+            stem = os.path.join(self.directory, _stem(kind, game_state))
+            if profile is not None:
+                pstats.Stats(profile).dump_stats(stem + ".prof")
+            else:
+                with open(stem + ".folded", "w") as f:
+                    for stack, n in sorted(stacks.items()):
+                        f.write(f"{stack} {n}\n")
+            info = {
+                "kind": kind,
+                "elapsed_ms": round(elapsed * 1000, 3),
+                "timeout_ms": game_state["game"].get("timeout", 500),
+                "pid": os.getpid(),
+                "game_state": game_state,
+            }
+            if kind == "slow":
+                info["threshold_ms"] = self.slow * 1000
+                info["interval_ms"] = self.interval * 1000
+                info["samples"] = samples
+            with open(stem + ".json", "w") as f:
+                json.dump(info, f, separators=(",", ":"))
+            self._rotate()
+        except OSError as e:
+            print(f"Profiler: could not write {kind} profile: {e}")
+
+    def _rotate(self):
+        """Delete the oldest dumps while over max_files or max_bytes."""
+        dumps: Dict[str, List[str]] = {}
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if ext in SUFFIXES:
+                dumps.setdefault(stem, []).append(os.path.join(self.directory, name))
+        sizes, total = [], 0
+        for stem, paths in dumps.items():
+            size, mtime = 0, 0.0
+            for p in paths:
+                try:
+                    st = os.stat(p)
+                except FileNotFoundError:
+                    continue
+                size += st.st_size
+                mtime = max(mtime, st.st_mtime)
+            sizes.append((mtime, stem, size))
+            total += size
+        sizes.sort()
+        count = len(sizes)
+        for _, stem, size in sizes:
+            if count <= self.max_files and total <= self.max_bytes:
+                break
+            for p in dumps[stem]:
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+            count -= 1
+            total -= size
+
+
+def _stem(kind: str, game_state: dict) -> str:
+    game_id = game_state["game"].get("id", "")
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in game_id) or "game"
+    now = time.time()
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f"_{int(now % 1 * 1e6):06d}"
+    return f"{stamp}.{safe}.t{game_state.get('turn', 0)}.{os.getpid()}.{kind}"
+
+
+def _collapse(frame) -> str:
+    """The stack under `frame`, outermost first, as one collapsed-stack line."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
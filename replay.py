@@ -0,0 +1,518 @@
+# replay.py
+# -----------------------------------------------------------------------------
+# Append-only, compressed game replay log.
+#
+# With REPLAY_DIR set, main.start/move/end hand every request (and the move
+# we answered, with how long it took) to a Recorder. Requests only enqueue;
+# a background thread encodes and writes, so the request path never touches
+# the disk. A full queue drops records rather than blocking, and a record
+# that fails to encode or write is reported on stderr and skipped.
+#
+# One file per game and process (workers of server.MovePool each write their
+# own), named <game id>.<pid>.snr:
+#
+#   file   := b"SNR1" block*
+#   block  := <u32 compressed size> <u32 raw size> <u32 first turn> <u16 turns>
+#             zlib(record*)
+#   record := <u8 kind> <u32 size> payload
+#
+# Every block opens with the game's META record (game object as JSON) and the
+# snake id/name string table, so each block decodes on its own. A TURN record
+# is binary: turn, timeout, board size, move, latency, then food, hazards and
+# every snake's body as u16 cell indices (x * height + y); snake latency,
+# shout and customisations are not kept. A block is written once it holds
+# BLOCK_TURNS turns, at /end, and at least every FLUSH_SECONDS; a truncated
+# last block (crash) is ignored by the reader, and an empty file reads as a
+# log with no turns.
+#
+# ReplayFile maps a log with mmap, indexes its block headers without
+# decompressing, and streams turns or seeks to any one of them by position or
+# turn number.
+#
+#   python replay.py stats  DIR           turns, games, bytes per turn
+#   python replay.py check  DIR           re-run move.choose_move on every turn
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+import argparse
+import atexit
+import glob
+import mmap
+import multiprocessing
+import multiprocessing.util
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from board import dumps, loads
+from rules import MOVES
+
+MAGIC = b"SNR1"
+BLOCK_TURNS = 64
+FLUSH_SECONDS = 5.0
+CLOSE_SECONDS = 10.0
+QUEUE_SIZE = 10_000
+
+META, STRING, TURN, END = 1, 2, 3, 4
+
+_BLOCK = struct.Struct("<IIIH")
+_RECORD = struct.Struct("<BI")
+_TURN = struct.Struct("<IHBBBIBBHH")
+_SNAKE = struct.Struct("<HHBH")
+_STRING = struct.Struct("<H")
+
+_MOVE_CODE = {m: k for k, m in enumerate(MOVES)}
+NO_MOVE = 255
+
+
+class Turn:
+    __slots__ = ("game_state", "move", "latency_us")
+
+    def __init__(self, game_state: dict, move: Optional[str], latency_us: int):
+        self.game_state = game_state
+        self.move = move
+        self.latency_us = latency_us
+
+    def __repr__(self):
+        return f"<Turn {self.game_state['turn']} {self.move} {self.latency_us}us>"
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Encoding
+# ──────────────────────────────────────────────────────────────────────────────
+
+class _GameLog:
+    """Writer-side state of one game's file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            # Straight to disk, so a log never sits on disk without its header
+            self.file.write(MAGIC)
+            self.file.flush()
+        self.strings: Dict[str, int] = {}
+        self.block_strings = 0  # strings defined before the open block
+        self.meta = b"{}"
+        self.records: List[bytes] = []
+        self.turns = 0
+        self.first_turn = 0
+        self.touched = time.monotonic()
+
+    def _string(self, s: str) -> int:
+        k = self.strings.get(s)
+        if k is None:
+            k = self.strings[s] = len(self.strings)
+            payload = _STRING.pack(k) + s.encode()
+            self.records.append(_RECORD.pack(STRING, len(payload)) + payload)
+        return k
+
+    def add_meta(self, game: dict):
+        self.meta = dumps(game)
+
+    def add_turn(self, game_state: dict, move: Optional[str], latency_us: int):
+        b = game_state["board"]
+        h = b["height"]
+        you = game_state["you"]["id"]
+        snakes = b["snakes"]
+        you_slot = next((k for k, s in enumerate(snakes) if s["id"] == you), NO_MOVE)
+        parts = [_TURN.pack(
+            game_state["turn"], game_state["game"].get("timeout", 500), b["width"], h,
+            _MOVE_CODE.get(move, NO_MOVE), min(latency_us, 0xFFFFFFFF),
+            len(snakes), you_slot, len(b["food"]), len(b.get("hazards", ())),
+        )]
+        cells = [p["x"] * h + p["y"] for p in b["food"]] + [p["x"] * h + p["y"] for p in b.get("hazards", ())]
+        parts.append(struct.pack(f"<{len(cells)}H", *cells))
+        for s in snakes:
+            body = [p["x"] * h + p["y"] for p in s["body"]]
+            parts.append(_SNAKE.pack(self._string(s["id"]), self._string(s.get("name", "")),
+                                     max(0, min(s["health"], 255)), len(body)))
+            parts.append(struct.pack(f"<{len(body)}H", *body))
+        payload = b"".join(parts)
+        if not self.turns:
+            self.first_turn = game_state["turn"]
+        self.records.append(_RECORD.pack(TURN, len(payload)) + payload)
+        self.turns += 1
+        self.touched = time.monotonic()
+
+    def add_end(self, game_state: dict):
+        payload = dumps(game_state)
+        self.records.append(_RECORD.pack(END, len(payload)) + payload)
+
+    def flush(self):
+        if not self.records:
+            return
+        head = [_RECORD.pack(META, len(self.meta)) + self.meta]
+        # Repeat the strings of earlier blocks; newer ones are among the records
+        for s, k in self.strings.items():
+            if k < self.block_strings:
+                payload = _STRING.pack(k) + s.encode()
+                head.append(_RECORD.pack(STRING, len(payload)) + payload)
+        raw = b"".join(head + self.records)
+        data = zlib.compress(raw, 6)
+        self.file.write(_BLOCK.pack(len(data), len(raw), self.first_turn, self.turns) + data)
+        self.file.flush()
+        self.records = []
+        self.turns = 0
+        self.block_strings = len(self.strings)
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class Recorder:
+    """
+    Queue-fed writer of replay logs under `directory`. Safe to call from any
+    thread; the writer thread starts on first use in each process.
+    """
+
+    def __init__(self, directory: str, block_turns: int = BLOCK_TURNS):
+        self.directory = directory
+        self.block_turns = block_turns
+        self.dropped = 0
+        self.errors = 0
+        self._queue: Optional[queue.Queue] = None
+        self._pid = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _put(self, item):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(QUEUE_SIZE)
+                    threading.Thread(target=self._run, args=(self._queue,), name="replay-writer", daemon=True).start()
+                    self._pid = os.getpid()
+                    if multiprocessing.parent_process() is None:
+                        atexit.register(self.close)
+                    else:
+                        # Pool workers leave through os._exit, which skips
+                        # atexit; multiprocessing still runs its finalizers
+                        multiprocessing.util.Finalize(self, self.close, exitpriority=10)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self, game_state: dict) -> None:
+        self._put(("start", game_state, None, 0))
+
+    def move(self, game_state: dict, move: str, latency_s: float) -> None:
+        self._put(("move", game_state, move, int(latency_s * 1e6)))
+
+    def end(self, game_state: dict) -> None:
+        self._put(("end", game_state, None, 0))
+
+    def close(self, timeout: float = CLOSE_SECONDS) -> bool:
+        """
+        Write out everything queued so far. Waits at most `timeout` seconds;
+        False if the writer had not finished by then.
+        """
+        if self._queue is not None and self._pid == os.getpid():
+            done = threading.Event()
+            try:
+                self._queue.put(("close", None, None, done), timeout=timeout)
+            except queue.Full:
+                return False
+            return done.wait(timeout)
+        return True
+
+    def _path(self, game_id: str) -> str:
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in game_id) or "game"
+        return os.path.join(self.directory, f"{safe}.{os.getpid()}.snr")
+
+    def _run(self, q: queue.Queue):
+        logs: Dict[str, _GameLog] = {}
+        swept = time.monotonic()
+        while True:
+            try:
+                item = q.get(timeout=FLUSH_SECONDS)
+            except queue.Empty:
+                item = None
+            now = time.monotonic()
+            if now - swept >= FLUSH_SECONDS:
+                # Every FLUSH_SECONDS, however busy: write out what we have,
+                # close games gone idle (a pool worker may never see /end)
+                swept = now
+                for gid in list(logs):
+                    try:
+                        log = logs[gid]
+                        if now - log.touched > 60 * FLUSH_SECONDS:
+                            logs.pop(gid).close()
+                        else:
+                            log.flush()
+                    except Exception as e:
+                        self._failed(f"flushing game {gid}", e)
+            if item is None:
+                continue
+            # One bad request or a failed write costs that record, never the
+            # writer thread
+            try:
+                self._handle(logs, *item)
+            except Exception as e:
+                self._failed(f"{item[0]} record", e)
+            finally:
+                if item[0] == "close":
+                    item[3].set()
+
+    def _handle(self, logs: Dict[str, _GameLog], kind: str, game_state: Optional[dict],
+                move: Optional[str], extra):
+        if kind == "close":
+            try:
+                for log in logs.values():
+                    log.close()
+            finally:
+                logs.clear()
+            return
+        gid = game_state["game"]["id"]
+        log = logs.get(gid)
+        if log is None:
+            log = logs[gid] = _GameLog(self._path(gid))
+        log.add_meta(game_state["game"])
+        if kind == "move":
+            log.add_turn(game_state, move, extra)
+            if log.turns >= self.block_turns:
+                log.flush()
+        elif kind == "end":
+            log.add_end(game_state)
+            logs.pop(gid).close()
+
+    def _failed(self, what: str, e: Exception):
+        self.errors += 1
+        print(f"replay: {what} not written: {e!r}", file=sys.stderr)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Reading
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _decode_block(raw: bytes) -> Tuple[List[Turn], Optional[dict]]:
+    turns: List[Turn] = []
+    end = None
+    game: dict = {}
+    strings: Dict[int, str] = {}
+    pos = 0
+    n = len(raw)
+    while pos < n:
+        kind, size = _RECORD.unpack_from(raw, pos)
+        pos += _RECORD.size
+        payload = raw[pos:pos + size]
+        pos += size
+        if kind == META:
+            game = loads(payload)
+        elif kind == STRING:
+            strings[_STRING.unpack_from(payload)[0]] = payload[_STRING.size:].decode()
+        elif kind == END:
+            end = loads(payload)
+        elif kind == TURN:
+            turns.append(_decode_turn(payload, game, strings))
+    return turns, end
+
+
+def _decode_turn(payload: bytes, game: dict, strings: Dict[int, str]) -> Turn:
+    turn, timeout, width, height, move, latency, n_snakes, you_slot, n_food, n_haz = _TURN.unpack_from(payload)
+    at = _TURN.size
+    cells = struct.unpack_from(f"<{n_food + n_haz}H", payload, at)
+    at += 2 * (n_food + n_haz)
+
+    def point(c: int) -> dict:
+        return {"x": c // height, "y": c % height}
+
+    snakes = []
+    for _ in range(n_snakes):
+        sid, name, health, length = _SNAKE.unpack_from(payload, at)
+        at += _SNAKE.size
+        body = [point(c) for c in struct.unpack_from(f"<{length}H", payload, at)]
+        at += 2 * length
+        snakes.append({"id": strings.get(sid, ""), "name": strings.get(name, ""), "health": health,
+                       "body": body, "head": body[0] if body else None, "length": length,
+                       "latency": "0", "shout": ""})
+    game_state = {
+        "game": dict(game, timeout=timeout),
+        "turn": turn,
+        "board": {"width": width, "height": height, "food": [point(c) for c in cells[:n_food]],
+                  "hazards": [point(c) for c in cells[n_food:]], "snakes": snakes},
+        "you": snakes[you_slot] if you_slot < n_snakes else None,
+    }
+    return Turn(game_state, MOVES[move] if move < len(MOVES) else None, latency)
+
+
+class ReplayFile:
+    """
+    Read-only view of one log. len() is the number of turns; indexing by
+    position and turn_at(turn) decode only the block holding that turn.
+    """
+
+    def __init__(self, path: str, cached_blocks: int = 4):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        # An empty file or a cut-off header (a writer killed at once) is a log
+        # with no turns
+        if self._map[:len(MAGIC)] != MAGIC[:size]:
+            self.close()
+            raise ValueError(f"{path}: not a replay log")
+        # (data offset, compressed size, first turn, turns) per complete block
+        self._blocks: List[Tuple[int, int, int, int]] = []
+        self._starts: List[int] = []  # position of each block's first turn
+        self._firsts: List[int] = []  # game turn of each block's first turn
+        total = 0
+        at = len(MAGIC)
+        while at + _BLOCK.size <= size:
+            clen, _raw, first, count = _BLOCK.unpack_from(self._map, at)
+            if at + _BLOCK.size + clen > size:
+                break  # truncated tail
+            self._blocks.append((at + _BLOCK.size, clen, first, count))
+            self._starts.append(total)
+            self._firsts.append(first)
+            total += count
+            at += _BLOCK.size + clen
+        self._len = total
+        self._cache: "OrderedDict[int, Tuple[List[Turn], Optional[dict]]]" = OrderedDict()
+        self._cached_blocks = cached_blocks
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self._len
+
+    def _block(self, b: int) -> Tuple[List[Turn], Optional[dict]]:
+        hit = self._cache.get(b)
+        if hit is not None:
+            self._cache.move_to_end(b)
+            return hit
+        offset, clen, _first, _count = self._blocks[b]
+        decoded = _decode_block(zlib.decompress(self._map[offset:offset + clen]))
+        self._cache[b] = decoded
+        if len(self._cache) > self._cached_blocks:
+            self._cache.popitem(last=False)
+        return decoded
+
+    def __getitem__(self, k: int) -> Turn:
+        if k < 0:
+            k += self._len
+        if not 0 <= k < self._len:
+            raise IndexError(k)
+        b = bisect_right(self._starts, k) - 1
+        return self._block(b)[0][k - self._starts[b]]
+
+    def turn_at(self, turn: int) -> Optional[Turn]:
+        """The recorded move request for game turn `turn`, if any."""
+        b = bisect_right(self._firsts, turn) - 1
+        while 0 <= b < len(self._blocks):
+            turns = self._block(b)[0]
+            for t in turns:
+                if t.game_state["turn"] == turn:
+                    return t
+            if turns and turns[-1].game_state["turn"] > turn:
+                return None
+            b += 1
+        return None
+
+    def __iter__(self) -> Iterator[Turn]:
+        for b in range(len(self._blocks)):
+            # Streaming doesn't go through the cache
+            offset, clen, _first, _count = self._blocks[b]
+            yield from _decode_block(zlib.decompress(self._map[offset:offset + clen]))[0]
+
+    def end_state(self) -> Optional[dict]:
+        """The /end request, if the game's end was recorded."""
+        return self._block(len(self._blocks) - 1)[1] if self._blocks else None
+
+
+def replay_files(directory: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, "*.snr")))
+
+
+def open_logs(directory: str) -> Iterator[ReplayFile]:
+    """Every replay log under `directory`, skipping (with a warning) files that aren't one."""
+    for path in replay_files(directory):
+        try:
+            f = ReplayFile(path)
+        except ValueError as e:
+            print(f"skipped {e}", file=sys.stderr)
+            continue
+        with f:
+            yield f
+
+
+def iter_turns(directory: str) -> Iterator[Turn]:
+    """Every recorded turn under `directory`, file by file."""
+    for f in open_logs(directory):
+        yield from f
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Command line
+# ──────────────────────────────────────────────────────────────────────────────
+
+def _stats(directory: str) -> int:
+    files = replay_files(directory)
+    turns = 0
+    for f in open_logs(directory):
+        turns += len(f)
+    size = sum(os.path.getsize(p) for p in files)
+    games = {os.path.basename(p).rsplit(".", 2)[0] for p in files}
+    print(f"{len(games)} games, {len(files)} files, {turns} turns, {size} bytes"
+          + (f", {size / turns:.1f} bytes/turn" if turns else ""))
+    return 0
+
+
+def _check(directory: str, slow_ms: float) -> int:
+    import random
+
+    from move import choose_move
+
+    n = differ = slow = 0
+    t0 = time.perf_counter()
+    for t in iter_turns(directory):
+        if t.game_state["you"] is None:
+            continue
+        random.seed(0)
+        move = choose_move(t.game_state).move
+        n += 1
+        if t.move is not None and move != t.move:
+            differ += 1
+        if t.latency_us >= slow_ms * 1000:
+            slow += 1
+            print(f"slow: game {t.game_state['game'].get('id')} turn {t.game_state['turn']} "
+                  f"{t.latency_us / 1000:.1f} ms")
+    print(f"{n} turns replayed in {time.perf_counter() - t0:.1f}s, {differ} moves differ from the log, "
+          f"{slow} recorded slower than {slow_ms:g} ms")
+    return 1 if differ else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay log tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("stats")
+    p.add_argument("directory")
+    p = sub.add_parser("check", help="re-run choose_move on every recorded turn")
+    p.add_argument("directory")
+    p.add_argument("--slow-ms", type=float, default=250.0, help="report turns recorded slower than this")
+    args = parser.parse_args(argv)
+    if args.command == "stats":
+        return _stats(args.directory)
+    return _check(args.directory, args.slow_ms)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
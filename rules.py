@@ -0,0 +1,255 @@
+# rules.py
+# -----------------------------------------------------------------------------
+# Compact model of the standard Battlesnake ruleset over the flat-index grid.
+#
+# A Position is one board: snakes (bodies as cell indices, head first), food
+# and turn. Position.step applies one simultaneous turn the way the official
+# engine orders it:
+#   1) move every snake (new head, tail popped)
+#   2) reduce health by 1
+#   3) feed snakes whose head landed on food (health to 100, tail stacked)
+#   4) eliminate snakes that starved, left the board, hit a body, or lost a
+#      head-to-head against an equal or longer snake
+# Setup and food spawning are random; new_game and spawn_food follow the
+# standard settings with a caller-supplied RNG. to_game_state renders a
+# Position back into a /move request body.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from functools import lru_cache
+import random
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from grid import Grid, get_grid
+
+if TYPE_CHECKING:
+    from board import Board
+
+MOVES = ("up", "down", "left", "right")
+MAX_HEALTH = 100
+
+
+@lru_cache(maxsize=None)
+def move_table(width: int, height: int) -> List[Dict[str, int]]:
+    """For every cell, the cell each move leads to (-1 if off the board)."""
+    grid = get_grid(width, height)
+    table = []
+    for x, y in grid.coords:
+        i = x * height + y
+        table.append({
+            "up": i + 1 if y + 1 < height else -1,
+            "down": i - 1 if y > 0 else -1,
+            "left": i - height if x > 0 else -1,
+            "right": i + height if x + 1 < width else -1,
+        })
+    return table
+
+
+def move_between(grid: Grid, a: int, b: int) -> str:
+    """Name of the move that takes a snake from cell `a` to adjacent cell `b`."""
+    d = b - a
+    if d == 1:
+        return "up"
+    if d == -1:
+        return "down"
+    return "left" if d < 0 else "right"
+
+
+class Snake:
+    __slots__ = ("id", "body", "health")
+
+    def __init__(self, id: str, body: List[int], health: int):
+        self.id = id
+        self.body = body
+        self.health = health
+
+    def __repr__(self):
+        return f"<Snake {self.id} len={len(self.body)} hp={self.health}>"
+
+    @property
+    def head(self) -> int:
+        return self.body[0]
+
+    @property
+    def length(self) -> int:
+        return len(self.body)
+
+
+class Position:
+    """One board state. Positions are never mutated after construction."""
+
+    __slots__ = ("grid", "snakes", "food", "turn")
+
+    def __init__(self, grid: Grid, snakes: List[Snake], food: Set[int], turn: int = 0):
+        self.grid = grid
+        self.snakes = snakes
+        self.food = food
+        self.turn = turn
+
+    def __repr__(self):
+        return f"<Position {self.grid.width}x{self.grid.height} turn={self.turn} snakes={len(self.snakes)}>"
+
+    @classmethod
+    def from_game_state(cls, game_state: dict) -> "Position":
+        board = game_state["board"]
+        grid = get_grid(board["width"], board["height"])
+        h = grid.height
+        snakes = [
+            Snake(s["id"], [c["x"] * h + c["y"] for c in s["body"]], s["health"])
+            for s in board["snakes"]
+        ]
+        food = {c["x"] * h + c["y"] for c in board["food"]}
+        return cls(grid, snakes, food, game_state["turn"])
+
+    @classmethod
+    def from_board(cls, board: "Board") -> "Position":
+        """Position of a decoded board.Board (its snakes are shared, not copied)."""
+        return cls(board.grid, list(board.snakes), set(board.food), board.turn)
+
+    def snake(self, snake_id: str) -> Optional[Snake]:
+        for s in self.snakes:
+            if s.id == snake_id:
+                return s
+        return None
+
+    def occupancy(self) -> bytearray:
+        """Mask of every body cell (heads included)."""
+        m = bytearray(self.grid.size)
+        for s in self.snakes:
+            for c in s.body:
+                m[c] = 1
+        return m
+
+    def candidate_moves(self, snake: Snake, blocked: Optional[bytearray] = None) -> List[Tuple[str, int]]:
+        """
+        Moves that stay on the board and don't turn back into the neck. With
+        `blocked`, also drop moves into blocked cells (tails that will move
+        this turn are the caller's business).
+        """
+        table = move_table(self.grid.width, self.grid.height)[snake.head]
+        neck = snake.body[1] if len(snake.body) > 1 else -1
+        out = []
+        for m in MOVES:
+            c = table[m]
+            if c < 0 or c == neck:
+                continue
+            if blocked is not None and blocked[c]:
+                continue
+            out.append((m, c))
+        return out
+
+    def step(self, moves: Dict[str, str]) -> "Position":
+        """
+        Apply one turn. `moves` maps snake id to move name; snakes without an
+        entry move "up", as the engine does for a missing response.
+        """
+        table = move_table(self.grid.width, self.grid.height)
+
+        moved: List[Snake] = []
+        for s in self.snakes:
+            head = table[s.head][moves.get(s.id, "up")]
+            moved.append(Snake(s.id, [head] + s.body[:-1], s.health - 1))
+
+        food = self.food
+        eaten = [s for s in moved if s.body[0] >= 0 and s.body[0] in food]
+        if eaten:
+            food = set(food)
+            for s in eaten:
+                s.health = MAX_HEALTH
+                s.body.append(s.body[-1])
+                food.discard(s.body[0])
+
+        survivors = [s for s in moved if s.health > 0 and s.body[0] >= 0]
+        bodies = bytearray(self.grid.size)
+        for s in survivors:
+            for c in s.body[1:]:
+                bodies[c] = 1
+        heads: Dict[int, List[Snake]] = {}
+        for s in survivors:
+            heads.setdefault(s.body[0], []).append(s)
+
+        alive = []
+        for s in survivors:
+            head = s.body[0]
+            if bodies[head]:
+                continue
+            if any(o is not s and o.length >= s.length for o in heads[head]):
+                continue
+            alive.append(s)
+
+        return Position(self.grid, alive, food, self.turn + 1)
+
+    def with_food(self, cells: Iterable[int]) -> "Position":
+        return Position(self.grid, self.snakes, self.food | set(cells), self.turn)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Game setup
+# ──────────────────────────────────────────────────────────────────────────────
+
+START_LENGTH = 3
+MINIMUM_FOOD = 1
+FOOD_SPAWN_CHANCE = 15  # percent, per turn, once MINIMUM_FOOD is on the board
+
+
+def new_game(width: int, height: int, n_snakes: int, rng: random.Random) -> Position:
+    """
+    Fresh board: snakes coiled on distinct random cells of one parity (so no
+    two can meet head-on on turn 1), one food per snake plus the centre.
+    """
+    grid = get_grid(width, height)
+    starts = [i for i, (x, y) in enumerate(grid.coords) if (x + y) % 2 == 0]
+    rng.shuffle(starts)
+    if n_snakes > len(starts):
+        raise ValueError(f"{n_snakes} snakes don't fit on a {width}x{height} board")
+    snakes = [Snake(f"snake-{k}", [starts[k]] * START_LENGTH, MAX_HEALTH) for k in range(n_snakes)]
+    taken = set(starts[:n_snakes])
+    free = [i for i in range(grid.size) if i not in taken]
+    food = set(rng.sample(free, min(n_snakes, len(free))))
+    centre = grid.index((width // 2, height // 2))
+    if centre not in taken:
+        food.add(centre)
+    return Position(grid, snakes, food, 0)
+
+
+def spawn_food(position: Position, rng: random.Random, minimum: int = MINIMUM_FOOD,
+               chance: int = FOOD_SPAWN_CHANCE) -> Position:
+    """Top food up to `minimum`, else add one with `chance` percent probability."""
+    want = max(0, minimum - len(position.food))
+    if want == 0 and rng.randrange(100) < chance:
+        want = 1
+    if want == 0:
+        return position
+    occupied = position.occupancy()
+    free = [i for i in range(position.grid.size) if not occupied[i] and i not in position.food]
+    if not free:
+        return position
+    return position.with_food(rng.sample(free, min(want, len(free))))
+
+
+def to_game_state(position: Position, you: str, game_id: str = "local", timeout: int = 500) -> dict:
+    """`position` as the /move request body snake `you` would receive."""
+    coords = position.grid.coords
+
+    def point(c: int) -> dict:
+        x, y = coords[c]
+        return {"x": x, "y": y}
+
+    snakes = [{
+        "id": s.id,
+        "name": s.id,
+        "health": s.health,
+        "body": [point(c) for c in s.body],
+        "head": point(s.head),
+        "length": s.length,
+        "latency": "0",
+        "shout": "",
+    } for s in position.snakes]
+    return {
+        "game": {"id": game_id, "ruleset": {"name": "standard", "version": "local"}, "map": "standard",
+                 "source": "local", "timeout": timeout},
+        "turn": position.turn,
+        "board": {"width": position.grid.width, "height": position.grid.height,
+                  "food": [point(c) for c in sorted(position.food)], "hazards": [], "snakes": snakes},
+        "you": next(s for s in snakes if s["id"] == you),
+    }
@@ -0,0 +1,259 @@
+# search.py
+# -----------------------------------------------------------------------------
+# Deadline-aware iterative-deepening search.
+#
+# Paranoid alpha-beta over simultaneous moves: we pick a move, then every
+# nearby opponent jointly picks the reply that is worst for us. Opponents too
+# far away to matter within the remaining depth follow a fixed greedy move so
+# the joint branching factor stays small in royale games.
+#
+# Leaves are scored with the planner's space heuristic (our reachable space
+# minus the opponents', as in space_delta_choice) plus cells we reach first.
+# The planner's own choice is searched first at the root.
+#
+# The time budget is game.timeout minus a safety margin. Depth 1, 2, ... are
+# searched in turn; a depth that runs out of time is abandoned and the best
+# move of the deepest completed depth is returned.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+import os
+import time
+
+from board import Board
+from guard import SAFETY_MARGIN_MS, Deadline
+from rules import MOVES, Position, Snake
+from territory import evaluate
+from zobrist import EXACT, LOWER, UPPER, TranspositionTable, get_zobrist, snake_slots
+
+WIN = 100_000
+LOSS = -100_000
+DRAW = -50_000
+DECIDED = 10_000  # values beyond this are wins/losses, adjusted by ply
+
+MAX_DEPTH = int(os.environ.get("SEARCH_MAX_DEPTH", "16"))
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def leaf_value(pos: Position, me: Snake, w_opp: float = 1.5) -> float:
+    opponents = [s for s in pos.snakes if s is not me]
+    blocked = pos.occupancy()
+    t = evaluate(pos.grid, blocked, [me.head] + [s.head for s in opponents])
+    our = t.reachable[0]
+    if our < me.length:
+        # Not enough room to fit our own body: probably trapped
+        our -= 2 * (me.length - our)
+    opp = max(t.reachable[1:], default=0)
+    return our - w_opp * opp + 0.5 * t.owned[0] + 2 * (me.length - max((s.length for s in opponents), default=0))
+
+
+def _greedy_move(pos: Position, snake: Snake, blocked: bytearray) -> str:
+    moves = pos.candidate_moves(snake, blocked)
+    if not moves:
+        return MOVES[0]
+    nbrs = pos.grid.neighbours
+    return max(moves, key=lambda mc: sum(1 for u in nbrs[mc[1]] if not blocked[u]))[0]
+
+
+def _to_tt(v: float, ply: int) -> float:
+    # Store decided values relative to the stored node, not the root
+    if v > DECIDED:
+        return v + ply
+    if v < -DECIDED:
+        return v - ply
+    return v
+
+
+def _from_tt(v: float, ply: int) -> float:
+    if v > DECIDED:
+        return v - ply
+    if v < -DECIDED:
+        return v + ply
+    return v
+
+
+class Searcher:
+    """
+    One search for snake `you` from `root`, bounded by `deadline`. With a
+    zobrist.TranspositionTable, node results are stored under the position's
+    key and reused across transpositions and, if the table is kept, across
+    turns.
+    """
+
+    def __init__(self, root: Position, you: str, deadline: Deadline, w_opp: float = 1.5,
+                 tt: Optional[TranspositionTable] = None):
+        self.root = root
+        self.you = you
+        self.deadline = deadline
+        self.w_opp = w_opp
+        self.tt = tt
+        self.zobrist = get_zobrist(root.grid.width, root.grid.height)
+        self.slots = snake_slots(root, you)
+        self.root_key = self.zobrist.position(root, self.slots)
+        self.nodes = 0
+        self.depth = 0
+
+    def _check(self):
+        self.nodes += 1
+        if (self.nodes & 15) == 0 and self.deadline.expired():
+            raise SearchTimeout
+
+    def _terminal(self, pos: Position, ply: int) -> Optional[float]:
+        me = pos.snake(self.you)
+        if me is None:
+            return (DRAW if not pos.snakes else LOSS) + ply
+        if len(pos.snakes) == 1 and len(self.root.snakes) > 1:
+            return WIN - ply
+        return None
+
+    def _opponent_replies(self, pos: Position, me: Snake, depth: int) -> List[Dict[str, str]]:
+        blocked = pos.occupancy()
+        # Tails move this turn, so they don't block a reply
+        for o in pos.snakes:
+            blocked[o.body[-1]] = 0
+        grid = pos.grid
+        mx, my = grid.coords[me.head]
+        reach = 2 * depth + 1
+        choices: List[List[Tuple[str, str]]] = []
+        for s in pos.snakes:
+            if s is me:
+                continue
+            sx, sy = grid.coords[s.head]
+            if abs(sx - mx) + abs(sy - my) > reach:
+                choices.append([(s.id, _greedy_move(pos, s, blocked))])
+                continue
+            moves = pos.candidate_moves(s, blocked) or pos.candidate_moves(s)[:1] or [(MOVES[0], -1)]
+            choices.append([(s.id, m) for m, _ in moves])
+        return [dict(c) for c in product(*choices)]
+
+    def _max(self, pos: Position, key: int, depth: int, ply: int, alpha: float, beta: float) -> float:
+        self._check()
+        me = pos.snake(self.you)
+        moves = [m for m, _ in pos.candidate_moves(me)] or [MOVES[0]]
+
+        tt = self.tt
+        alpha0 = alpha
+        if tt is not None:
+            entry = tt.lookup(key)
+            if entry is not None:
+                d, flag, value, hint = entry
+                if d >= depth:
+                    value = _from_tt(value, ply)
+                    if flag == EXACT:
+                        return value
+                    if flag == LOWER and value > alpha:
+                        alpha = value
+                    elif flag == UPPER and value < beta:
+                        beta = value
+                    if alpha >= beta:
+                        return value
+                if hint in moves:
+                    moves.remove(hint)
+                    moves.insert(0, hint)
+
+        best, best_m = LOSS + ply, moves[0]
+        for m in moves:
+            v = self._min(pos, key, me, m, depth, ply, alpha, beta)
+            if v > best:
+                best, best_m = v, m
+            if best > alpha:
+                alpha = best
+            if alpha >= beta:
+                break
+
+        if tt is not None:
+            flag = UPPER if best <= alpha0 else LOWER if best >= beta else EXACT
+            tt.store(key, depth, flag, _to_tt(best, ply), best_m)
+        return best
+
+    def _min(self, pos: Position, key: int, me: Snake, move: str, depth: int, ply: int, alpha: float, beta: float) -> float:
+        worst = WIN
+        for reply in self._opponent_replies(pos, me, depth):
+            reply[self.you] = move
+            child = pos.step(reply)
+            v = self._terminal(child, ply + 1)
+            if v is None:
+                if depth <= 1:
+                    self._check()
+                    v = leaf_value(child, child.snake(self.you), self.w_opp)
+                else:
+                    child_key = self.zobrist.step(key, pos, child, self.slots)
+                    v = self._max(child, child_key, depth - 1, ply + 1, alpha, beta)
+            if v < worst:
+                worst = v
+            if worst < beta:
+                beta = worst
+            if alpha >= beta:
+                break
+        return worst
+
+    def search_depth(self, depth: int, order: List[str]) -> Tuple[str, float, List[str]]:
+        """Full search to `depth`; returns best move, its value and the next move ordering."""
+        me = self.root.snake(self.you)
+        legal = [m for m, _ in self.root.candidate_moves(me)] or [MOVES[0]]
+        ordered = list(dict.fromkeys([m for m in order if m in legal] + legal))
+        alpha = LOSS - 1
+        scored = []
+        for m in ordered:
+            v = self._min(self.root, self.root_key, me, m, depth, 0, alpha, WIN + 1)
+            scored.append((v, m))
+            if v > alpha:
+                alpha = v
+        # Stable: among equal values keep the earlier (better-ordered) move
+        best_v, best_m = max(scored, key=lambda vm: vm[0])
+        next_order = [m for _, m in sorted(scored, key=lambda vm: -vm[0])]
+        if self.tt is not None:
+            self.tt.store(self.root_key, depth, EXACT, _to_tt(best_v, 0), best_m)
+        return best_m, best_v, next_order
+
+    def run(self, prior: Optional[str] = None, max_depth: int = MAX_DEPTH) -> Tuple[str, int]:
+        """
+        Iterative deepening. Returns the best move of the deepest completed
+        depth and that depth (0 if not even depth 1 finished, in which case
+        `prior` or the first legal move is returned).
+        """
+        me = self.root.snake(self.you)
+        legal = [m for m, _ in self.root.candidate_moves(me)] or [MOVES[0]]
+        hints = [prior]
+        if self.tt is not None:
+            self.tt.new_search()
+            entry = self.tt.lookup(self.root_key)
+            if entry is not None:
+                # Seen this position before (a repeated turn, or a line we
+                # searched last turn): its best move goes first
+                hints.insert(0, entry[3])
+        order = list(dict.fromkeys([m for m in hints if m in legal] + legal))
+        best = order[0]
+        last_took = 0.0
+        for depth in range(1, max_depth + 1):
+            # Each depth costs a multiple of the last; don't start one we
+            # can't finish.
+            if depth > 1 and self.deadline.remaining() < 3 * last_took:
+                break
+            t0 = time.perf_counter()
+            try:
+                best, value, order = self.search_depth(depth, order)
+            except SearchTimeout:
+                break
+            self.depth = depth
+            last_took = time.perf_counter() - t0
+            if value >= WIN - depth or value <= LOSS + depth:
+                break  # outcome decided; deeper search can't change it
+        return best, self.depth
+
+
+def search_move(board: Board, prior: Optional[str] = None, started: Optional[float] = None,
+                margin_ms: float = SAFETY_MARGIN_MS, tt: Optional[TranspositionTable] = None) -> str:
+    """
+    Pick our move on a decoded board.Board by iterative deepening within its
+    timeout. Pass the same `tt` on every turn of a game to reuse earlier results.
+    """
+    root = Position.from_board(board)
+    deadline = Deadline.from_timeout(board.timeout, started, margin_ms)
+    move, _depth = Searcher(root, board.you.id, deadline, tt=tt).run(prior)
+    return move
@@ -1,33 +1,142 @@
+import functools
 import logging
 import os
+import signal
+import sys
+import time
 import typing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from flask import Flask
 from flask import request
 
+import metrics
+from board import dumps, loads
+from metrics import span
+
+# "dev" runs Flask's built-in server. "production" serves through waitress
+# (multi-threaded, HTTP/1.1 keep-alive) and runs move handlers in a pool of
+# worker processes, so one slow game can't hold up another's response.
+SERVER_MODE = os.environ.get("SERVER_MODE", "dev")
+
+
+class MovePool:
+    """
+    Runs the move handler (and, through run(), the /start and /end handlers)
+    in worker processes. Each worker keeps its own per-game sessions: a game
+    picked up by a different worker than last turn just rebuilds its session
+    from the request, and sessions of games that ended in another worker are
+    evicted by their SessionStore's idle TTL.
+    """
+
+    def __init__(self, handler: typing.Callable, workers: int, warm: typing.Optional[typing.Callable] = None):
+        self.handler = handler
+        self.workers = workers
+        self.warm_worker = warm
+        self.pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.warm_worker,))
+
+    def warm(self):
+        # Fork every worker (and warm it up) before the first game
+        for f in [self.pool.submit(_ping) for _ in range(self.workers)]:
+            f.result()
+
+    def close(self):
+        # Workers exit cleanly, running their multiprocessing finalizers
+        # (replay.Recorder writes out buffered turns there)
+        self.pool.shutdown(wait=True)
+
+    def run(self, handler: typing.Callable, *args):
+        """handler(*args) in a worker."""
+        try:
+            result, observations = self.pool.submit(_call, handler, *args).result()
+        except BrokenProcessPool:
+            # A worker died; run this one in-process and start a new pool
+            self.pool = self._new_pool()
+            return handler(*args)
+        metrics.registry.merge(observations)
+        return result
+
+    def __call__(self, game_state: dict, received: float) -> dict:
+        return self.run(self.handler, game_state, received)
+
+
+def _init_worker(warm: typing.Optional[typing.Callable]):
+    # SIGTERM (say, to the whole process group) exits through Python, so the
+    # worker's finalizers still run
+    signal.signal(signal.SIGTERM, _exit)
+    if metrics.ENABLED:
+        metrics.registry.forward_to_parent()
+    if warm is not None:
+        warm()
+
+
+def _exit(*_):
+    sys.exit(0)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _call(handler: typing.Callable, *args):
+    # Runs in a worker: the handler's answer, plus the metrics it recorded
+    # for the server
+    return handler(*args), metrics.registry.drain()
+
 
 def run_server(handlers: typing.Dict):
     app = Flask("Battlesnake")
 
+    # handlers["warm"] runs once in every process that serves moves
+    start, move, end = handlers["start"], handlers["move"], handlers["end"]
+    if SERVER_MODE == "production":
+        pool = MovePool(move, int(os.environ.get("PLANNER_WORKERS", os.cpu_count() or 1)), handlers.get("warm"))
+        pool.warm()
+        # Games live in the workers, so their /start and /end go there too
+        move = pool
+        start = functools.partial(pool.run, handlers["start"])
+        end = functools.partial(pool.run, handlers["end"])
+    elif "warm" in handlers:
+        handlers["warm"]()
+
     @app.get("/")
     def on_info():
         return handlers["info"]()
 
     @app.post("/start")
     def on_start():
-        game_state = request.get_json()
-        handlers["start"](game_state)
+        game_state = loads(request.get_data())
+        start(game_state)
         return "ok"
 
     @app.post("/move")
     def on_move():
-        game_state = request.get_json()
-        return handlers["move"](game_state)
+        started = time.monotonic()
+        with span("json_decode"):
+            game_state = loads(request.get_data())
+        # The move's time budget counts from here (see guard.py)
+        result = move(game_state, started)
+        with span("response_encode"):
+            response = app.response_class(dumps(result), mimetype="application/json")
+        if metrics.ENABLED:
+            elapsed = time.monotonic() - started
+            metrics.registry.observe("move", elapsed)
+            metrics.registry.count_move(elapsed, game_state["game"].get("timeout", 500))
+        return response
+
+    if metrics.ENABLED:
+        @app.get("/metrics")
+        def on_metrics():
+            return app.response_class(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
 
     @app.post("/end")
     def on_end():
-        game_state = request.get_json()
-        handlers["end"](game_state)
+        game_state = loads(request.get_data())
+        end(game_state)
         return "ok"
 
     @app.after_request
@@ -43,4 +152,16 @@ def run_server(handlers: typing.Dict):
     logging.getLogger("werkzeug").setLevel(logging.ERROR)
 
     print(f"\nRunning Battlesnake at http://{host}:{port}")
-    app.run(host=host, port=port)
+    # Stop on SIGTERM as on Ctrl-C, so exit handlers run and the worker pool
+    # is shut down
+    signal.signal(signal.SIGTERM, _exit)
+    if SERVER_MODE == "production":
+        from waitress import serve
+
+        logging.getLogger("waitress").setLevel(logging.ERROR)
+        try:
+            serve(app, host=host, port=port, threads=int(os.environ.get("SERVER_THREADS", "16")))
+        finally:
+            pool.close()
+    else:
+        app.run(host=host, port=port)
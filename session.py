@@ -0,0 +1,128 @@
+# session.py
+# -----------------------------------------------------------------------------
+# Cross-turn game state.
+#
+# The planner itself stays stateless; a GameSession carries the board between
+# turns of one game, so each /move only applies what changed (heads pushed,
+# tails popped or stacked, snakes gone, food) instead of decoding every body
+# again (board.advance). A request that doesn't follow from the last one is
+# decoded in full. The session also holds the planner's decisions by position
+# (a retried request skips the planner) and the search engine's
+# transposition table.
+#
+# Sessions live in a SessionStore keyed by (game id, our snake id). They are
+# created on /start, updated on /move and dropped on /end, with an LRU cap and
+# an idle TTL for games that never send /end.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+import time
+
+from board import Board, advance, decode
+from zobrist import TranspositionTable
+
+SessionKey = Tuple[str, str]
+
+
+def session_key(game_state: dict) -> SessionKey:
+    return game_state.get("game", {}).get("id", ""), game_state["you"]["id"]
+
+
+class GameSession:
+    """
+    One game as seen by one of our snakes.
+
+      board:      the game as of the last request, carried forward turn by turn
+      turn:       the last turn seen
+      rebuilt:    requests decoded in full rather than carried forward
+      decisions:  planner moves by position key (move.planner_move)
+      tt:         search results for this game (see transpositions())
+    """
+
+    def __init__(self, game_state: dict):
+        self.key = session_key(game_state)
+        self.board: Optional[Board] = None
+        self.turn = -1
+        self.rebuilt = 0
+        self.decisions = TranspositionTable(bits=8)
+        self.tt: Optional[TranspositionTable] = None
+        self.last_seen = time.monotonic()
+        self.update(game_state)
+
+    def __repr__(self):
+        return f"<GameSession {self.key[0]} turn={self.turn}>"
+
+    def transpositions(self) -> TranspositionTable:
+        """This game's transposition table, allocated on first use."""
+        if self.tt is None:
+            self.tt = TranspositionTable()
+        return self.tt
+
+    def update(self, game_state: dict) -> Board:
+        """
+        Bring the session's board up to `game_state` and return it. Boards
+        are never changed once built, so one still in use by an earlier
+        request is unaffected.
+        """
+        board = None if self.board is None else advance(self.board, game_state)
+        if board is None:
+            board = decode(game_state)
+            self.rebuilt += 1
+        self.board = board
+        self.turn = board.turn
+        self.last_seen = time.monotonic()
+        return board
+
+
+class SessionStore:
+    """
+    Thread-safe map of live GameSessions. At most `max_games` are kept (least
+    recently used go first), and any session idle for `ttl` seconds is
+    dropped, so games that never send /end don't leak.
+    """
+
+    def __init__(self, max_games: int = 64, ttl: float = 300.0):
+        self.max_games = max_games
+        self.ttl = ttl
+        self._sessions: "OrderedDict[SessionKey, GameSession]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict(self, now: float):
+        while self._sessions:
+            key, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_games and now - oldest.last_seen < self.ttl:
+                break
+            del self._sessions[key]
+
+    def start(self, game_state: dict) -> GameSession:
+        session = GameSession(game_state)
+        with self._lock:
+            self._sessions[session.key] = session
+            self._sessions.move_to_end(session.key)
+            self._evict(time.monotonic())
+        return session
+
+    def move(self, game_state: dict) -> GameSession:
+        """Session for this game updated to `game_state` (see GameSession.board), created if missing."""
+        key = session_key(game_state)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+        if session is None or game_state.get("turn", 0) < session.turn:
+            # First sight of this game (or a replayed turn): start afresh
+            return self.start(game_state)
+        session.update(game_state)
+        with self._lock:
+            self._evict(time.monotonic())
+        return session
+
+    def end(self, game_state: dict) -> None:
+        with self._lock:
+            self._sessions.pop(session_key(game_state), None)
@@ -0,0 +1,183 @@
+# simulate.py
+# -----------------------------------------------------------------------------
+# Headless self-play over the rules model, no HTTP and no network.
+#
+# Each game starts from rules.new_game and runs rules.Position.step with the
+# standard food spawning until at most one snake is left (or --max-turns).
+# Every seat is played by an engine: one of move.py's ("planner", "search",
+# "mcts"), called through move.choose_move with its own session store just as
+# the server would, or "random" (any move that doesn't hit a wall, neck or
+# body).
+#
+# Games are spread over a process pool, one game per task. The report gives
+# win rates per seat, per-move latency percentiles per engine and games per
+# second.
+#
+#   python simulate.py --games 2000 --size 11 --engines planner,planner,random,random
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from move import choose_move
+from rules import MOVES, Position, new_game, spawn_food, to_game_state
+from session import SessionStore
+
+ENGINES = ("planner", "search", "mcts", "random")
+MAX_TURNS = 1000
+
+
+def _random_move(pos: Position, snake_id: str, rng: random.Random) -> str:
+    snake = pos.snake(snake_id)
+    moves = pos.candidate_moves(snake, pos.occupancy()) or pos.candidate_moves(snake)
+    return rng.choice(moves)[0] if moves else MOVES[0]
+
+
+def play_game(size: int, engines: Sequence[str], seed: int, max_turns: int = MAX_TURNS, timeout: int = 500,
+              on_turn: Optional[Callable[[Position, str], None]] = None) -> dict:
+    """
+    Play one game with one snake per entry of `engines`. `on_turn(position,
+    game_id)` sees every position before its moves are chosen.
+
+    Returns the winning seat (None for a draw or a game cut off at
+    `max_turns`), the number of turns and every move's latency in ms by seat.
+    """
+    rng = random.Random(seed)
+    pos = new_game(size, size, len(engines), rng)
+    seat = {s.id: k for k, s in enumerate(pos.snakes)}
+    stores = [SessionStore() if e != "random" else None for e in engines]
+    game_id = f"sim-{seed}"
+    latencies: List[List[float]] = [[] for _ in engines]
+
+    while len(pos.snakes) > (1 if len(engines) > 1 else 0) and pos.turn < max_turns:
+        if on_turn is not None:
+            on_turn(pos, game_id)
+        moves: Dict[str, str] = {}
+        for s in pos.snakes:
+            k = seat[s.id]
+            t0 = time.perf_counter()
+            if engines[k] == "random":
+                moves[s.id] = _random_move(pos, s.id, rng)
+            else:
+                session = stores[k].move(to_game_state(pos, s.id, game_id, timeout))
+                random.seed(seed ^ pos.turn)
+                moves[s.id] = choose_move(session.board, session, engine=engines[k]).move
+            latencies[k].append((time.perf_counter() - t0) * 1000.0)
+        pos = spawn_food(pos.step(moves), rng)
+
+    winner = None
+    if len(pos.snakes) == 1 and len(engines) > 1:
+        winner = seat[pos.snakes[0].id]
+    return {"seed": seed, "winner": winner, "turns": pos.turn, "latency_ms": latencies}
+
+
+def _play(args) -> dict:
+    return play_game(*args)
+
+
+def percentiles(samples: List[float], points=(50, 90, 99)) -> Dict[str, float]:
+    if not samples:
+        return {}
+    s = sorted(samples)
+    out = {f"p{p}": round(s[min(len(s) - 1, len(s) * p // 100)], 3) for p in points}
+    out["max"] = round(s[-1], 3)
+    out["mean"] = round(sum(s) / len(s), 3)
+    return out
+
+
+def simulate(games: int, size: int, engines: Sequence[str], seed: int = 1, workers: Optional[int] = None,
+             max_turns: int = MAX_TURNS, timeout: int = 500) -> dict:
+    """Play `games` games across `workers` processes and summarise them."""
+    tasks = [(size, tuple(engines), seed + g, max_turns, timeout) for g in range(games)]
+    workers = workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+    if workers == 1:
+        results = [_play(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_play, tasks, chunksize=max(1, games // (workers * 8))))
+    wall = time.perf_counter() - t0
+
+    wins = [0] * len(engines)
+    draws = 0
+    by_engine: Dict[str, List[float]] = {}
+    over_timeout = 0
+    for r in results:
+        if r["winner"] is None:
+            draws += 1
+        else:
+            wins[r["winner"]] += 1
+        for k, lat in enumerate(r["latency_ms"]):
+            by_engine.setdefault(engines[k], []).extend(lat)
+            over_timeout += sum(1 for t in lat if t >= timeout)
+
+    return {
+        "games": games,
+        "size": size,
+        "engines": list(engines),
+        "workers": workers,
+        "timeout": timeout,
+        "wall_s": round(wall, 3),
+        "games_per_s": round(games / wall, 3) if wall else None,
+        "mean_turns": round(sum(r["turns"] for r in results) / games, 1) if games else 0,
+        "draws": draws,
+        "seats": [{"seat": k, "engine": e, "wins": wins[k], "win_rate": round(wins[k] / games, 4) if games else 0}
+                  for k, e in enumerate(engines)],
+        "latency_ms": {e: percentiles(s) for e, s in by_engine.items()},
+        "moves_over_timeout": over_timeout,
+    }
+
+
+def report(summary: dict) -> str:
+    lines = [
+        f"{summary['games']} games on {summary['size']}x{summary['size']} with {summary['workers']} workers "
+        f"in {summary['wall_s']:.1f}s ({summary['games_per_s']:.2f} games/s), "
+        f"{summary['mean_turns']} turns on average, {summary['draws']} draws",
+        "",
+        f"{'seat':>4}  {'engine':10} {'wins':>6} {'win %':>7}",
+    ]
+    for s in summary["seats"]:
+        lines.append(f"{s['seat']:>4}  {s['engine']:10} {s['wins']:>6} {100 * s['win_rate']:>6.1f}%")
+    lines += ["", f"{'engine':10} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'mean ms':>8}"]
+    for e, p in summary["latency_ms"].items():
+        if p:
+            lines.append(f"{e:10} {p['p50']:>8.2f} {p['p90']:>8.2f} {p['p99']:>8.2f} {p['max']:>8.2f} {p['mean']:>8.2f}")
+    lines.append(f"\nmoves over the {summary['timeout']} ms timeout: {summary['moves_over_timeout']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Headless self-play")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--size", type=int, default=11)
+    parser.add_argument("--engines", default="planner,planner,planner,planner",
+                        help=f"comma-separated, one per snake; each of {', '.join(ENGINES)}")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS)
+    parser.add_argument("--timeout", type=int, default=500, help="game.timeout in ms passed to the engines")
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    engines = args.engines.split(",")
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engine(s): {', '.join(unknown)}")
+
+    summary = simulate(args.games, args.size, engines, args.seed, args.workers, args.max_turns, args.timeout)
+    print(report(summary))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
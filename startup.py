@@ -0,0 +1,81 @@
+# startup.py
+# -----------------------------------------------------------------------------
+# Cold-start helpers.
+#
+# Every board size has lookup tables built on first use: the grid's
+# neighbour lists (grid.get_grid), the move table (rules.move_table) and the
+# Zobrist keys (zobrist.get_zobrist). prewarm() builds them ahead of time for
+# the sizes in PREWARM_BOARDS at boot and again in every process that serves
+# moves (main.warm; a server.MovePool worker forked after boot already shares
+# the tables, a spawned one builds its own). main.start builds them for any
+# other size on a game's /start, in the worker that takes it; other workers
+# build them on first use. prewarm_engine imports the search engine chosen by
+# SNAKE_ENGINE, which move.py otherwise loads on first use, and starts its
+# worker processes, in every process that will serve moves (see main.warm).
+#
+# report() gives how long startup took and the resident set size.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from typing import Iterable, List, Tuple
+import os
+import time
+
+from grid import get_grid
+from rules import move_table
+from zobrist import get_zobrist
+
+# Square board sizes warmed at boot ("" to skip)
+PREWARM_BOARDS = os.environ.get("PREWARM_BOARDS", "7,11,19,25")
+
+
+def board_sizes(spec: str = PREWARM_BOARDS) -> List[Tuple[int, int]]:
+    sizes = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        w, _, h = part.partition("x")
+        sizes.append((int(w), int(h or w)))
+    return sizes
+
+
+def prewarm_board(width: int, height: int) -> None:
+    get_grid(width, height)
+    move_table(width, height)
+    get_zobrist(width, height)
+
+
+def prewarm(sizes: Iterable[Tuple[int, int]] = ()) -> float:
+    """Build the tables for `sizes` (default PREWARM_BOARDS); returns seconds taken."""
+    t0 = time.perf_counter()
+    for width, height in sizes or board_sizes():
+        prewarm_board(width, height)
+    return time.perf_counter() - t0
+
+
+def prewarm_engine(engine: str) -> None:
+    """Import (and start) the engine move.choose_move would otherwise set up on the first move."""
+    if engine == "search":
+        import search  # noqa: F401
+    elif engine == "mcts":
+        import mcts
+
+        mcts.start_pool()
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if os.uname().sysname == "Darwin" else peak / 2**10
+
+
+def report(import_s: float, prewarm_s: float) -> str:
+    return f"Imports {import_s * 1000:.0f} ms, board tables {prewarm_s * 1000:.0f} ms, RSS {rss_mb():.1f} MB"
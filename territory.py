@@ -0,0 +1,117 @@
+# territory.py
+# -----------------------------------------------------------------------------
+# Simultaneous-BFS (Voronoi) territory over the compact grid.
+#
+# One multi-source BFS from every snake head answers, for each snake:
+#   - reachable: open cells in the component its head sits in,
+#   - owned:     cells it reaches strictly before every other snake.
+# Cells reached at the same distance by two or more snakes are contested and
+# belong to nobody.
+#
+# Given a board.Board.vacate array instead of a plain mask, a body cell is
+# open to a wave that reaches it no earlier than the turn it frees up. Each
+# head may start its wave on a later turn (a move we are about to make is
+# entered on turn 1), exactly as grid.timed_flood counts turns.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from typing import List, Optional, Sequence
+
+from grid import Grid
+
+CONTESTED = -2
+
+
+class Territory:
+    """
+    Result of a territory evaluation, indexed like the `heads` it was given.
+      reachable[k]: size of the open component containing head k
+      owned[k]:     cells head k reaches strictly first
+      dist[i]:      distance from the nearest head to cell i (-1 if unreached)
+      owner[i]:     index of that head, CONTESTED on ties, -1 if unreached
+    """
+
+    __slots__ = ("reachable", "owned", "dist", "owner")
+
+    def __init__(self, reachable: List[int], owned: List[int], dist: List[int], owner: List[int]):
+        self.reachable = reachable
+        self.owned = owned
+        self.dist = dist
+        self.owner = owner
+
+    def __repr__(self):
+        return f"<Territory reachable={self.reachable} owned={self.owned}>"
+
+
+def evaluate(grid: Grid, blocked: bytearray, heads: Sequence[int],
+             vacate: Optional[Sequence[int]] = None, starts: Optional[Sequence[int]] = None) -> Territory:
+    """
+    Run one simultaneous BFS from all `heads`. Heads are always expanded even
+    if the mask marks them blocked, so callers needn't open them first.
+
+    With `vacate` it replaces `blocked`: a cell first reached at distance d
+    from head k is entered if vacate[cell] <= starts[k] + d (starts default
+    to 0), and otherwise stays open to later waves.
+    """
+    nbrs = grid.neighbours
+    n_heads = len(heads)
+    dist = [-1] * grid.size
+    owner = [-1] * grid.size
+    # `first` is the head whose wave claimed a cell first (ignoring ties); it
+    # is what we union on to find which heads share a component.
+    first = [-1] * grid.size
+    root = list(range(n_heads))
+    offset = list(starts) if starts is not None else [0] * n_heads
+
+    def find(k: int) -> int:
+        while root[k] != k:
+            root[k] = root[root[k]]
+            k = root[k]
+        return k
+
+    queue: List[int] = []
+    for k, c in enumerate(heads):
+        if dist[c] >= 0:
+            # Two snakes on one cell: same component, and nobody owns it
+            root[find(k)] = find(first[c])
+            owner[c] = CONTESTED
+            continue
+        dist[c] = 0
+        owner[c] = k
+        first[c] = k
+        queue.append(c)
+
+    j = 0
+    while j < len(queue):
+        v = queue[j]
+        j += 1
+        d = dist[v] + 1
+        o = owner[v]
+        f = first[v]
+        for u in nbrs[v]:
+            du = dist[u]
+            if du < 0:
+                if blocked[u] if vacate is None else vacate[u] > d + offset[f]:
+                    continue
+                dist[u] = d
+                owner[u] = o
+                first[u] = f
+                queue.append(u)
+                continue
+            fu = first[u]
+            if fu != f:
+                ra, rb = find(f), find(fu)
+                if ra != rb:
+                    root[ra] = rb
+            if du == d and owner[u] != o:
+                owner[u] = CONTESTED
+
+    by_root = [0] * n_heads
+    owned = [0] * n_heads
+    for v in queue:
+        by_root[find(first[v])] += 1
+        o = owner[v]
+        if o >= 0:
+            owned[o] += 1
+    reachable = [by_root[find(k)] for k in range(n_heads)]
+    return Territory(reachable, owned, dist, owner)
@@ -0,0 +1,34 @@
+# Random positions for the tests: games played with random moves that avoid
+# walls, necks and bodies where they can, sampled every few turns.
+
+from __future__ import annotations
+from typing import Iterator
+import random
+
+from board import Board, decode
+from rules import Position, new_game, spawn_food, to_game_state
+
+
+def random_positions(count: int, seed: int = 1, sizes=(7, 11), snakes=(2, 3, 4), every: int = 3) -> Iterator[Position]:
+    rng = random.Random(seed)
+    made = 0
+    while made < count:
+        size = rng.choice(sizes)
+        pos = new_game(size, size, rng.choice(snakes), rng)
+        while pos.snakes and made < count:
+            if pos.turn % every == 0:
+                yield pos
+                made += 1
+            occupied = pos.occupancy()
+            moves = {}
+            for s in pos.snakes:
+                options = pos.candidate_moves(s, occupied) or pos.candidate_moves(s)
+                if options:
+                    moves[s.id] = rng.choice(options)[0]
+            pos = spawn_food(pos.step(moves), rng)
+
+
+def random_boards(count: int, seed: int = 1, **kwargs) -> Iterator[Board]:
+    """Decoded /move requests for the first snake of random positions."""
+    for pos in random_positions(count, seed, **kwargs):
+        yield decode(to_game_state(pos, pos.snakes[0].id))
@@ -0,0 +1,23 @@
+# NetworkX views of the planner's boards, as the original planner built them.
+
+from __future__ import annotations
+
+import networkx as nx
+
+from grid import Grid
+
+
+def open_graph(grid: Grid, blocked: bytearray, *also: int) -> nx.Graph:
+    """Open cells of `blocked` (and `also`) as a graph over cell indices."""
+    keep = {i for i in range(grid.size) if not blocked[i]} | set(also)
+    g = nx.Graph()
+    g.add_nodes_from(keep)
+    g.add_edges_from((v, u) for v in keep for u in grid.neighbours[v] if u in keep)
+    return g
+
+
+def grid_graph(grid: Grid, blocked: bytearray) -> nx.Graph:
+    """nx.grid_2d_graph with the blocked cells removed: (x, y) nodes, in NetworkX's own order."""
+    g = nx.grid_2d_graph(grid.width, grid.height)
+    g.remove_nodes_from(grid.coords[i] for i in range(grid.size) if blocked[i])
+    return g
@@ -0,0 +1,60 @@
+# The planner against the moves it made before the grid rewrite.
+#
+# baseline_moves.jsonl holds 600 self-play positions (150 on 7x7, 250 on
+# 11x11, 200 on 19x19) as the arguments move.choose_move used to pass
+# planner.choose_next_step, each with the step the original NetworkX planner
+# took there (rnd=random.Random(0)).
+
+import json
+import os
+import random
+
+from grid import bfs
+from planner import build_open_grid, choose_next_step
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Hungry positions with several foods equally near. The NetworkX planner took
+# the first of them in set-iteration order of their coordinates; the grid
+# planner takes the first in direction order, then cell order.
+FOOD_TIES = {109, 130, 131, 183, 456, 478, 578, 581}
+
+# grid.centre_cells stops sweeping regions over 150 cells after max_sweeps
+# sweeps and may then return only some of the exact centres (1 of 300 such
+# regions on 19x19 and 25x25 self-play boards). That changes a move only if a
+# centre it dropped was the one nearest our head; it never does here.
+
+
+def _cases():
+    with open(os.path.join(HERE, "baseline_moves.jsonl")) as f:
+        for line in f:
+            case = json.loads(line)
+            expected = case.pop("expected")
+            case["head"] = tuple(case["head"])
+            if case["opponent_head"] is not None:
+                case["opponent_head"] = tuple(case["opponent_head"])
+            case["blocked"] = [tuple(c) for c in case["blocked"]]
+            case["foods"] = [tuple(c) for c in case["foods"]]
+            yield case, None if expected is None else tuple(expected)
+
+
+def _food_distance(case, step):
+    """Steps from our head to the nearest food through `step`."""
+    grid, mask = build_open_grid(case["width"], case["height"], case["blocked"], case["head"])
+    mask[grid.index(case["head"])] = 1
+    dist = bfs(grid, mask, grid.index(step))
+    return 1 + min(dist[grid.index(f)] for f in case["foods"] if dist[grid.index(f)] >= 0)
+
+
+def test_moves_match_baseline():
+    cases = list(_cases())
+    assert len(cases) == 600
+    differ = set()
+    for i, (case, expected) in enumerate(cases):
+        step = choose_next_step(rnd=random.Random(0), **case)
+        if step != expected:
+            differ.add(i)
+            if i in FOOD_TIES:
+                assert case["hungry"]
+                assert _food_distance(case, step) == _food_distance(case, expected)
+    assert differ == FOOD_TIES
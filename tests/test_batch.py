@@ -0,0 +1,31 @@
+import random
+
+from batch import choose_moves
+from bench import build_corpus
+from move import choose_move
+from rules import to_game_state
+
+from positions import random_positions
+
+
+def _same_moves(states, batch_size):
+    random.seed(0)
+    expected = [choose_move(gs, engine="planner").move for gs in states]
+    random.seed(0)
+    got = [r.move for k in range(0, len(states), batch_size)
+           for r in choose_moves(states[k:k + batch_size], engine="planner")]
+    assert got == expected
+
+
+def test_random_positions():
+    states = [to_game_state(pos, pos.snakes[k % len(pos.snakes)].id, f"g{k}")
+              for k, pos in enumerate(random_positions(240, seed=21, sizes=(7, 11, 19), snakes=(2, 3, 4, 6)))]
+    _same_moves(states, 64)
+
+
+def test_self_play_corpus():
+    # Every board size and snake count of the benchmark corpus, mixed in one batch
+    states = [entry["game_state"] for entry in build_corpus(seed=7, per_game=3)]
+    rng = random.Random(7)
+    rng.shuffle(states)
+    _same_moves(states, len(states))
@@ -0,0 +1,46 @@
+from board import decode
+from grid import get_grid, timed_flood
+
+from positions import random_boards
+
+
+def _state(width, height, *bodies, turn=1):
+    snakes = [{"id": f"s{k}", "name": "", "health": 90, "body": [{"x": x, "y": y} for x, y in body]}
+              for k, body in enumerate(bodies)]
+    return {"game": {"id": "g"}, "turn": turn, "you": snakes[0],
+            "board": {"width": width, "height": height, "food": [], "hazards": [], "snakes": snakes}}
+
+
+def _first_free(board):
+    """Brute force: move every snake on, without eating, until each cell is free."""
+    free = [0] * board.grid.size
+    longest = max(len(s.body) for s in board.snakes)
+    for m in range(longest, 0, -1):
+        # After m moves every body has lost its last m segments
+        for s in board.snakes:
+            for c in s.body[:max(0, len(s.body) - m + 1)]:
+                free[c] = max(free[c], m)
+    return free
+
+
+def test_vacate_just_after_eating():
+    grid = get_grid(7, 7)
+    # s0 ate last turn: its tail is stacked on (0, 1). s1 is at the start of a
+    # game, all three segments on (5, 5).
+    board = decode(_state(7, 7, [(2, 1), (1, 1), (0, 1), (0, 1)], [(5, 5), (5, 5), (5, 5)]))
+    vacate = board.vacate
+    assert [vacate[grid.index(c)] for c in ((2, 1), (1, 1), (0, 1))] == [4, 3, 2]
+    assert vacate[grid.index((5, 5))] == 3
+    assert board.occupied[grid.index((0, 1))] == 2 and board.occupied[grid.index((5, 5))] == 3
+    # Stepping off the head on turn 1, the stacked tail opens on turn 2
+    flood = timed_flood(grid, vacate, grid.index((3, 1)), 1)
+    assert grid.index((0, 1)) in flood
+    assert grid.index((5, 5)) in flood
+
+
+def test_vacate_matches_moving_the_bodies_on():
+    stacked = 0
+    for board in random_boards(300, seed=20):
+        assert board.vacate == _first_free(board)
+        stacked += sum(1 for s in board.snakes if s.body[-1] == s.body[-2])
+    assert stacked > 20
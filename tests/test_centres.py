@@ -0,0 +1,39 @@
+import networkx as nx
+
+from grid import centre_cells, label_components
+
+from positions import random_boards
+from reference import open_graph
+
+
+def test_centre_cells_match_networkx_center():
+    checked = 0
+    for board in random_boards(40, seed=13, sizes=(7, 11)):
+        grid, mask = board.grid, board.mask()
+        comps = label_components(grid, mask)
+        g = open_graph(grid, mask)
+        for k in range(len(comps)):
+            cells = comps.cells(k)
+            if len(cells) > 150:
+                continue  # past exact_limit the sweeps may stop early
+            expected = sorted(nx.center(g.subgraph(cells)))
+            assert centre_cells(grid, mask, cells) == expected
+            checked += 1
+    assert checked > 40
+
+
+def test_bounded_sweeps_return_true_centres():
+    # Past exact_limit the sweeps may stop early, but only ever drop centres
+    checked = 0
+    for board in random_boards(60, seed=17, sizes=(19, 25), every=7):
+        grid, mask = board.grid, board.mask()
+        comps = label_components(grid, mask)
+        for k in range(len(comps)):
+            cells = comps.cells(k)
+            if len(cells) <= 150:
+                continue
+            exact = centre_cells(grid, mask, cells, exact_limit=len(cells))
+            bounded = centre_cells(grid, mask, cells)
+            assert bounded and set(bounded) <= set(exact)
+            checked += 1
+    assert checked > 50
@@ -0,0 +1,33 @@
+import networkx as nx
+
+from grid import label_components
+from planner import directional_spaces
+
+from positions import random_boards
+from reference import open_graph
+
+
+def test_components_match_networkx():
+    for board in random_boards(150, seed=12):
+        grid, mask = board.grid, board.mask()
+        comps = label_components(grid, mask)
+        expected = {frozenset(c) for c in nx.connected_components(open_graph(grid, mask))}
+        assert {frozenset(comps.cells(k)) for k in range(len(comps))} == expected
+        for k in range(len(comps)):
+            assert comps.sizes[k] == len(comps.cells(k))
+            assert all(comps.labels[c] == k for c in comps.cells(k))
+        assert all(comps.labels[i] == -1 for i in range(grid.size) if mask[i])
+
+
+def test_directional_spaces_match_networkx():
+    for board in random_boards(150, seed=16):
+        grid, mask = board.grid, board.mask()
+        h = board.you.head
+        size_by_n, comp_by_n, comps = directional_spaces(grid, mask, h)
+        mask[h] = 1
+        g = open_graph(grid, mask)
+        assert list(size_by_n) == [n for n in grid.neighbours[h] if not mask[n]]
+        for n, size in size_by_n.items():
+            area = nx.node_connected_component(g, n)
+            assert size == len(area)
+            assert set(comps.cells(comp_by_n[n])) == area
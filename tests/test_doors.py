@@ -0,0 +1,35 @@
+import networkx as nx
+
+from doors import DoorAnalysis
+
+from positions import random_boards
+from reference import open_graph
+
+
+def _component(grid, blocked, root):
+    g = open_graph(grid, blocked)
+    return g.subgraph(nx.node_connected_component(g, root)).copy()
+
+
+def test_doors_match_networkx():
+    checked = 0
+    for board in random_boards(150, seed=14):
+        if not board.opponents:
+            continue
+        grid, mask = board.grid, board.mask()
+        root = board.opponents[0].head
+        mask[root] = 0
+        doors = DoorAnalysis(grid, mask, root)
+        comp = _component(grid, mask, root)
+
+        assert doors.size == comp.number_of_nodes()
+        assert doors.articulation_points == sorted(nx.articulation_points(comp))
+        assert sorted(sorted(b) for b in doors.blocks) == sorted(sorted(b) for b in nx.biconnected_components(comp))
+        for v in comp:
+            cut = comp.copy()
+            cut.remove_node(v)
+            side = 0 if v == root else len(nx.node_connected_component(cut, root))
+            assert doors.root_side(v) == side
+            assert v in doors
+        checked += 1
+    assert checked > 30
@@ -0,0 +1,52 @@
+import networkx as nx
+import pytest
+
+from grid import Grid, bfs, get_grid, shortest_path
+
+from positions import random_boards
+from reference import grid_graph, open_graph
+
+
+@pytest.mark.parametrize("width,height", [(1, 1), (1, 5), (7, 7), (11, 11), (19, 7)])
+def test_neighbours_match_grid_graph(width, height):
+    grid = Grid(width, height)
+    g = nx.grid_2d_graph(width, height)
+    for i, (x, y) in enumerate(grid.coords):
+        assert i == grid.index((x, y)) == x * height + y
+        assert {grid.coords[u] for u in grid.neighbours[i]} == set(g[(x, y)])
+        # (x - 1), (x + 1), (y - 1), (y + 1)
+        order = [(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]
+        assert [grid.coords[u] for u in grid.neighbours[i]] == [c for c in order if grid.contains(c)]
+
+
+def test_bfs_matches_networkx():
+    for board in random_boards(150, seed=11):
+        grid, mask = board.grid, board.mask()
+        # Opponent heads are blocked in the mask; searches from them still expand
+        for source in [board.you.head] + [o.head for o in board.opponents]:
+            expected = nx.single_source_shortest_path_length(open_graph(grid, mask, source), source)
+            dist = bfs(grid, mask, source)
+            assert {i: d for i, d in enumerate(dist) if d >= 0} == expected
+
+
+def test_shortest_path_matches_networkx():
+    # Same path, not just the same length, over the graph the planner used to
+    # build: its first steps rely on it
+    for board in random_boards(150, seed=15):
+        grid, mask = board.grid, board.mask()
+        g = grid_graph(grid, mask)
+        source = board.you.head
+        dist = bfs(grid, mask, source)
+        for target in range(0, grid.size, 3):
+            if mask[target]:
+                continue
+            path = shortest_path(grid, mask, source, target)
+            if dist[target] < 0:
+                assert path is None
+            else:
+                expected = nx.shortest_path(g, grid.coords[source], grid.coords[target])
+                assert [grid.coords[c] for c in path] == expected
+
+
+def test_get_grid_is_shared():
+    assert get_grid(11, 11) is get_grid(11, 11)
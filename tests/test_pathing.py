@@ -0,0 +1,67 @@
+from grid import bfs, get_grid
+from pathing import hazard_costs, nearest
+
+from positions import random_boards
+
+GRID = get_grid(7, 7)
+
+
+def _check_path(grid, blocked, route):
+    path = route.path
+    assert path[0] == route.start and path[-1] == route.goal
+    for a, b in zip(path, path[1:]):
+        assert b in grid.neighbours[a] and not blocked[b]
+    return path
+
+
+def test_unit_costs_match_plain_bfs():
+    checked = 0
+    for board in random_boards(200, seed=19):
+        grid, mask, h = board.grid, board.mask(), board.you.head
+        foods = [f for f in board.food if f != h]
+        dist = bfs(grid, mask, h)
+        reachable = [f for f in foods if dist[f] >= 0]
+        plain = nearest(grid, mask, h, foods)
+        dijkstra = nearest(grid, mask, h, foods, hazard_costs(grid, [], 0.0))
+        if not reachable:
+            assert plain is None and dijkstra is None
+            continue
+        closest = min(dist[f] for f in reachable)
+        for route in (plain, dijkstra):
+            assert route.cost == closest
+            assert sorted(route.ties) == sorted(f for f in reachable if dist[f] == closest)
+            assert len(_check_path(grid, mask, route)) == closest + 1
+        assert dijkstra.ties == plain.ties
+        checked += 1
+    assert checked > 100
+
+
+def test_equidistant_goals_in_search_order():
+    # Search order follows grid.neighbours: x - 1, x + 1, y - 1, y + 1
+    start = GRID.index((3, 3))
+    left, right, down, up = (GRID.index(c) for c in ((1, 3), (5, 3), (3, 1), (3, 5)))
+    for costs in (None, hazard_costs(GRID, [], 0.0)):
+        route = nearest(GRID, bytearray(GRID.size), start, [up, right, down, left], costs)
+        assert route.cost == 2 and route.goal == left
+        assert route.ties == [left, right, down, up]
+
+
+def test_hazards_divert_the_route():
+    start, goal = GRID.index((0, 3)), GRID.index((6, 3))
+    hazards = [GRID.index((3, y)) for y in range(1, 7)]
+    route = nearest(GRID, bytearray(GRID.size), start, [goal], hazard_costs(GRID, hazards, 14.0))
+    assert route.cost == 12  # around the hazard column through (3, 0)
+    assert GRID.index((3, 0)) in _check_path(GRID, bytearray(GRID.size), route)
+    route = nearest(GRID, bytearray(GRID.size), start, [goal], hazard_costs(GRID, hazards, 2.0))
+    assert route.cost == 8  # straight through: 6 steps + 2 damage
+
+
+def test_no_reachable_goal():
+    blocked = bytearray(GRID.size)
+    for c in ((1, 0), (1, 1), (0, 2)):
+        blocked[GRID.index(c)] = 1
+    start, goal = GRID.index((0, 0)), GRID.index((6, 6))
+    for costs in (None, hazard_costs(GRID, [], 0.0)):
+        assert nearest(GRID, blocked, start, [goal], costs) is None
+        assert nearest(GRID, blocked, start, [], costs) is None
+        assert nearest(GRID, blocked, start, [GRID.index((1, 1))], costs) is None
@@ -0,0 +1,69 @@
+from board import decode
+from guard import MoveGuard
+from planner import choose_from_board, trap_door_target
+
+
+def _state(snakes, width=11, height=11):
+    bodies = [
+        {"id": sid, "name": sid, "health": 100, "length": len(body), "latency": "0", "shout": "",
+         "head": {"x": body[0][0], "y": body[0][1]},
+         "body": [{"x": x, "y": y} for x, y in body]}
+        for sid, body in snakes
+    ]
+    return {
+        "game": {"id": "test", "ruleset": {"name": "standard", "version": "test"}, "timeout": 500},
+        "turn": 10,
+        "board": {"width": width, "height": height, "food": [], "hazards": [], "snakes": bodies},
+        "you": bodies[0],
+    }
+
+
+# `a` sits in the bottom-right pocket of an 11x11 board, whose only way out
+# is (7, 1); we are next to it and `a` is three moves away. `b` walls the
+# pocket off from above, its head well away from the door.
+#
+#   y=4  . . . . . . . b . . .
+#   y=3  . . . . . . . b . . .
+#   y=2  . . . . . . . b b b b
+#   y=1  . . . . . . Y D . . A
+#   y=0  . . . . . . y y a a a
+POCKET = [
+    ("you", [(6, 1), (6, 0), (7, 0)]),
+    ("a", [(10, 1), (10, 0), (9, 0), (8, 0)]),
+    ("b", [(7, 4), (7, 3), (7, 2), (8, 2), (9, 2), (10, 2)]),
+]
+
+
+def test_trap_door_target_finds_pocket_exit():
+    board = decode(_state(POCKET))
+    grid, opp = board.grid, board.opponents[0]
+    mask = board.mask()
+    mask[opp.head] = 0
+    door = trap_door_target(grid, mask, board.you.head, opp.head, opp.length)
+    assert door == grid.index((7, 1))
+
+
+def test_planner_closes_trap_door():
+    # Without the trap, the centre of the board would lead us up or right
+    board = decode(_state(POCKET))
+    assert choose_from_board(board, hungry=False) == board.grid.index((7, 1))
+
+
+# Our snake's best fallback by open neighbours is (6, 5), next to the head
+# of the longer `l`; (4, 5) is walled in by the shorter `w`.
+#
+#   y=6  . . . w w . . . . . .
+#   y=5  . . . w . Y . . . . .
+#   y=4  . . . w w y L l l l l
+LONGER_HEAD = [
+    ("you", [(5, 5), (5, 4), (5, 3), (5, 2), (5, 1), (5, 0)]),
+    ("w", [(4, 4), (3, 4), (3, 5), (3, 6), (4, 6)]),
+    ("l", [(6, 4), (7, 4), (8, 4), (9, 4), (10, 4), (10, 3), (10, 2), (10, 1)]),
+]
+
+
+def test_out_of_time_fallback_avoids_longer_heads():
+    board = decode(_state(LONGER_HEAD))
+    guard = MoveGuard(0, margin_ms=0)  # already past its deadline
+    assert choose_from_board(board, hungry=False, guard=guard) == board.grid.index((5, 6))
+    assert "threats" in guard.skipped
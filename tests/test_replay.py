@@ -0,0 +1,74 @@
+import random
+
+from replay import Recorder, ReplayFile, iter_turns, replay_files
+from rules import MOVES, new_game, spawn_food, to_game_state
+
+
+def _games(count, seed):
+    """Every /move request of `count` random games, as (game id, states)."""
+    rng = random.Random(seed)
+    for g in range(count):
+        size = rng.choice([7, 11, 19])
+        pos = new_game(size, size, rng.randint(2, 4), rng)
+        you = pos.snakes[0].id
+        states = []
+        while pos.snake(you) is not None and len(pos.snakes) > 1 and pos.turn < 200:
+            state = to_game_state(pos, you, f"game-{seed}-{g}")
+            state["board"]["hazards"] = [{"x": 0, "y": y} for y in range(pos.turn % 3)]
+            states.append(state)
+            occupied = pos.occupancy()
+            moves = {}
+            for s in pos.snakes:
+                options = pos.candidate_moves(s, occupied) or pos.candidate_moves(s)
+                if options:
+                    moves[s.id] = rng.choice(options)[0]
+            pos = spawn_food(pos.step(moves), rng)
+        yield f"game-{seed}-{g}", states
+
+
+def _kept(state):
+    """What a log keeps of a request."""
+    b = state["board"]
+    snakes = [(s["id"], s["name"], s["health"], s["body"]) for s in b["snakes"]]
+    return (state["turn"], state["game"]["id"], state["game"]["timeout"], b["width"], b["height"],
+            b["food"], b["hazards"], snakes, state["you"]["id"])
+
+
+def test_recorded_games_read_back(tmp_path):
+    recorder = Recorder(str(tmp_path), block_turns=16)
+    games = dict(_games(6, seed=16))
+    expected = {}
+    for gid, states in games.items():
+        recorder.start(states[0])
+        for k, state in enumerate(states):
+            move = MOVES[k % 4]
+            recorder.move(state, move, 0.001 * k)
+            expected[gid, state["turn"]] = (_kept(state), move, 1000 * k)
+        recorder.end(states[-1])
+    assert recorder.close()
+    assert recorder.errors == 0 and recorder.dropped == 0
+    assert len(replay_files(str(tmp_path))) == len(games)
+
+    seen = {}
+    for t in iter_turns(str(tmp_path)):
+        seen[t.game_state["game"]["id"], t.game_state["turn"]] = (_kept(t.game_state), t.move, t.latency_us)
+    assert seen == expected
+
+    for path in replay_files(str(tmp_path)):
+        with ReplayFile(path) as f:
+            assert f.end_state() is not None
+            for k in range(len(f) - 1, -1, -7):
+                t = f[k]
+                assert _kept(f.turn_at(t.game_state["turn"]).game_state) == _kept(t.game_state)
+            assert f.turn_at(10_000) is None
+
+
+def test_writer_survives_a_bad_request(tmp_path, capsys):
+    recorder = Recorder(str(tmp_path))
+    gid, states = next(_games(1, seed=17))
+    recorder.move({"game": {"id": gid}, "turn": 0}, "up", 0.0)  # no board
+    recorder.move(states[0], "up", 0.0)
+    assert recorder.close()
+    assert recorder.errors == 1
+    assert "not written" in capsys.readouterr().err
+    assert [_kept(t.game_state) for t in iter_turns(str(tmp_path))] == [_kept(states[0])]
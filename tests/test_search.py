@@ -0,0 +1,57 @@
+from grid import get_grid
+from guard import Deadline
+from rules import Position, Snake
+from search import Searcher
+from zobrist import TranspositionTable
+
+GRID = get_grid(7, 7)
+
+
+def _position(*snakes):
+    return Position(GRID, [Snake(sid, [GRID.index(c) for c in body], 90) for sid, body in snakes], set(), 5)
+
+
+def _legal(pos, you):
+    return {m for m, _ in pos.candidate_moves(pos.snake(you))}
+
+
+# We are at the left edge heading left. `a` wraps around us with its head
+# just above ours and its body just below, so "up" and "down" both lose.
+#
+#   y=6  a a a a a . .
+#   y=5  a . . . a . .
+#   y=4  A . . . a . .
+#   y=3  Y y y . a . .
+#   y=2  a a . . a . .
+#   y=1  a a a a a . .
+BOXED = _position(
+    ("you", [(0, 3), (1, 3), (2, 3)]),
+    ("a", [(0, 4), (0, 5), (0, 6), (1, 6), (2, 6), (3, 6), (4, 6), (4, 5), (4, 4), (4, 3), (4, 2),
+           (4, 1), (3, 1), (2, 1), (1, 1), (0, 1), (0, 2), (1, 2)]),
+)
+
+
+def test_expired_deadline_returns_prior_or_first_legal():
+    pos = BOXED
+    for prior, expected in (("down", "down"), ("right", "up"), (None, "up")):
+        move, depth = Searcher(pos, "you", Deadline(0.0)).run(prior)
+        # Depth 1 may still finish: the clock is read every few nodes
+        assert depth <= 1
+        assert move == expected and move in _legal(pos, "you")
+
+
+def test_lost_position_still_returns_a_legal_move():
+    searcher = Searcher(BOXED, "you", Deadline.from_timeout(500), tt=TranspositionTable(bits=10))
+    move, depth = searcher.run()
+    assert move in _legal(BOXED, "you")
+    assert depth == 1  # every move loses at once, so deeper search stops
+
+
+def test_picks_the_only_move_that_survives():
+    # (0, 4) is in the middle of `a`'s body; (0, 2) is open
+    pos = _position(
+        ("you", [(0, 3), (1, 3), (2, 3)]),
+        ("a", [(4, 4), (3, 4), (2, 4), (1, 4), (0, 4), (0, 5), (1, 5), (2, 5), (2, 6), (1, 6), (0, 6)]),
+    )
+    move, depth = Searcher(pos, "you", Deadline.from_timeout(500)).run("up")
+    assert move == "down" and depth >= 1
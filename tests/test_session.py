@@ -0,0 +1,80 @@
+import copy
+import random
+
+from board import advance, decode
+from rules import new_game, spawn_food, to_game_state
+from session import SessionStore
+
+
+def _games(count, seed):
+    """Consecutive /move requests for the first snake of random games, until it dies."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        size = rng.choice([7, 11, 19])
+        pos = new_game(size, size, rng.randint(2, 4), rng)
+        you = pos.snakes[0].id
+        states = []
+        while pos.snake(you) is not None and len(pos.snakes) > 1 and pos.turn < 300:
+            states.append(to_game_state(pos, you, f"g{seed}"))
+            occupied = pos.occupancy()
+            moves = {}
+            for s in pos.snakes:
+                options = pos.candidate_moves(s, occupied) or pos.candidate_moves(s)
+                if options:
+                    moves[s.id] = rng.choice(options)[0]
+            pos = spawn_food(pos.step(moves), rng, minimum=rng.choice([1, 5]))
+        yield states
+
+
+def _same(a, b):
+    return (a.turn == b.turn and a.occupied == b.occupied and a.vacate == b.vacate
+            and [(s.id, s.body, s.health) for s in a.snakes] == [(s.id, s.body, s.health) for s in b.snakes]
+            and a.you.id == b.you.id and [s.id for s in a.opponents] == [s.id for s in b.opponents]
+            and a.food == b.food and a.hazards == b.hazards)
+
+
+def test_advance_matches_decode():
+    turns = grown = 0
+    for states in _games(60, seed=1):
+        board = decode(states[0])
+        for state in states[1:]:
+            nxt = advance(board, state)
+            assert nxt is not None and _same(nxt, decode(state))
+            grown += len(nxt.you.body) > len(board.you.body)
+            board = nxt
+            turns += 1
+    assert turns > 1000 and grown > 20
+
+
+def _edited(state, **changes):
+    """A copy of `state` with `changes` made at the top level, our body reversed if body=reversed."""
+    state = copy.deepcopy(state)
+    if changes.pop("body", None) is reversed:
+        for s in state["board"]["snakes"]:
+            if s["id"] == state["you"]["id"]:
+                s["body"].reverse()
+    state.update(changes)
+    return state
+
+
+def test_advance_falls_back_when_turns_do_not_follow():
+    states = next(s for s in _games(20, seed=2) if len(s) > 10)
+    board = decode(states[5])
+    assert advance(board, states[5]) is None  # the same turn again
+    assert advance(board, states[7]) is None  # a turn skipped
+    assert advance(board, _edited(states[6], body=reversed)) is None
+    assert _same(advance(board, states[6]), decode(states[6]))
+
+
+def test_session_carries_the_board_forward():
+    store = SessionStore()
+    states = next(s for s in _games(20, seed=3) if len(s) > 10)
+    session = store.start(states[0])
+    for state in states[1:]:
+        assert store.move(state) is session
+        assert _same(session.board, decode(state))
+    assert session.rebuilt == 1
+    # A skipped turn is decoded in full; an earlier turn starts a new session
+    store.move(_edited(states[-1], turn=states[-1]["turn"] + 2))
+    assert session.rebuilt == 2
+    assert store.move(states[0]) is not session
@@ -0,0 +1,52 @@
+from collections import deque
+
+from grid import timed_flood
+from territory import evaluate
+
+from positions import random_boards
+
+
+def test_timed_evaluate_matches_timed_flood():
+    # A candidate move is entered on turn 1, as directional_spaces assumes
+    checked = 0
+    for board in random_boards(200, seed=20):
+        mask = board.mask()
+        for n in board.grid.neighbours[board.you.head]:
+            if mask[n]:
+                continue
+            t = evaluate(board.grid, mask, [n], board.vacate, starts=[1])
+            assert t.reachable[0] == len(timed_flood(board.grid, board.vacate, n, 1))
+            checked += 1
+    assert checked > 100
+
+
+def _distances(grid, blocked, source):
+    """Plain BFS over open cells, entering `source` even if it is blocked."""
+    dist = {source: 0}
+    queue = deque([source])
+    while queue:
+        v = queue.popleft()
+        for u in grid.neighbours[v]:
+            if u not in dist and not blocked[u]:
+                dist[u] = dist[v] + 1
+                queue.append(u)
+    return dist
+
+
+def test_evaluate_matches_brute_force():
+    # Each head's own BFS, every head's cell opened, compared cell by cell
+    for board in random_boards(200, seed=21):
+        grid, mask = board.grid, board.mask()
+        heads = [board.you.head] + [o.head for o in board.opponents]
+        for h in heads:
+            mask[h] = 0
+        t = evaluate(grid, mask, heads)
+        dists = [_distances(grid, mask, h) for h in heads]
+        for k, dk in enumerate(dists):
+            assert t.reachable[k] == len(dk)
+            assert t.owned[k] == sum(
+                1 for c, d in dk.items()
+                if all(j == k or d < other.get(c, d + 1) for j, other in enumerate(dists)))
+        for c in range(grid.size):
+            best = min((dk[c] for dk in dists if c in dk), default=-1)
+            assert t.dist[c] == best
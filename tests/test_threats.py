@@ -0,0 +1,33 @@
+from grid import bfs, get_grid
+from threats import DEADLY, SAFE, TIE, ThreatModel
+
+from positions import random_boards
+
+GRID = get_grid(7, 7)
+
+
+def test_danger_by_opponent_length():
+    # Our head and one opponent's face each other across the middle row
+    me, them = GRID.index((1, 3)), GRID.index((5, 3))
+    near, middle, far = GRID.index((2, 3)), GRID.index((3, 3)), GRID.index((4, 3))
+    for length, at_middle in ((3, SAFE), (4, TIE), (5, DEADLY), (9, DEADLY)):
+        t = ThreatModel(GRID, bytearray(GRID.size), me, 4, [(them, length)])
+        assert t.danger[near] == SAFE
+        assert t.danger[middle] == at_middle  # both arrive on turn 2
+        assert t.danger[far] == (SAFE if length < 4 else at_middle)
+        assert t.danger[them] == t.danger[far]
+
+
+def test_danger_matches_per_opponent_bfs():
+    for board in random_boards(150, seed=9):
+        grid, mask = board.grid, board.mask()
+        mine = bfs(grid, mask, board.you.head)
+        opponents = [(o.head, o.length) for o in board.opponents]
+        t = ThreatModel(grid, mask, board.you.head, board.you.length, opponents)
+        reach = [(bfs(grid, mask, head), length) for head, length in opponents]
+        for i in range(grid.size):
+            us = mine[i]
+            longer = any(0 <= d[i] <= us for d, length in reach if length > board.you.length)
+            equal = any(0 <= d[i] <= us for d, length in reach if length == board.you.length)
+            expected = SAFE if us < 0 else DEADLY if longer else TIE if equal else SAFE
+            assert t.danger[i] == expected, i
@@ -0,0 +1,70 @@
+import random
+
+from board import decode
+from move import decision_key
+from rules import new_game, spawn_food, to_game_state
+from zobrist import TranspositionTable, get_zobrist, snake_slots
+
+
+def _random_games(count, seed):
+    """Every (parent, child) step of `count` random games, as random as legal."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        size = rng.choice([7, 11])
+        position = new_game(size, size, rng.randint(2, 4), rng)
+        while len(position.snakes) > 1 and position.turn < 150:
+            occupied = position.occupancy()
+            moves = {}
+            for s in position.snakes:
+                options = position.candidate_moves(s, occupied) or position.candidate_moves(s)
+                moves[s.id] = rng.choice(options)[0] if options else "up"
+            child = spawn_food(position.step(moves), rng)
+            yield position, child
+            position = child
+
+
+def test_step_matches_full_recompute():
+    steps = 0
+    for parent, child in _random_games(40, seed=3):
+        z = get_zobrist(parent.grid.width, parent.grid.height)
+        if parent.turn == 0:
+            slots = snake_slots(parent, parent.snakes[0].id)
+            key = z.position(parent, slots)
+        key = z.step(key, parent, child, slots)
+        assert key == z.position(child, slots)
+        steps += 1
+    assert steps > 500
+
+
+def test_body_order_changes_the_key():
+    position = next(p for p, _ in _random_games(1, seed=4) if p.turn == 5)
+    z = get_zobrist(position.grid.width, position.grid.height)
+    slots = snake_slots(position, position.snakes[0].id)
+    key = z.position(position, slots)
+    s = position.snakes[0]
+    s.body.reverse()
+    assert z.position(position, slots) != key
+    s.body.reverse()
+    assert z.position(position, slots) == key
+
+
+def test_decision_key_covers_hazards():
+    position = next(p for p, _ in _random_games(1, seed=5) if p.turn == 3)
+    state = to_game_state(position, position.snakes[0].id)
+    key = decision_key(decode(state))
+    state["board"]["hazards"] = [{"x": 0, "y": 0}]
+    assert decision_key(decode(state)) != key
+
+
+def test_transposition_table_replacement():
+    tt = TranspositionTable(bits=4)
+    tt.store(3, depth=5, flag=0, value=1.0, move="up")
+    assert tt.lookup(3) == (5, 0, 1.0, "up")
+    assert tt.lookup(3 + 16) is None
+    # A shallower clash in the same search keeps the deeper resident
+    tt.store(3 + 16, depth=2, flag=0, value=2.0)
+    assert tt.lookup(3) == (5, 0, 1.0, "up")
+    # After new_search anything may replace it
+    tt.new_search()
+    tt.store(3 + 16, depth=2, flag=0, value=2.0)
+    assert tt.lookup(3) is None and tt.lookup(3 + 16) == (2, 0, 2.0, None)
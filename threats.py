@@ -0,0 +1,87 @@
+# threats.py
+# -----------------------------------------------------------------------------
+# Batched threat model for any number of opponents.
+#
+# Opponents are grouped by how a head-to-head with us would end (they are
+# longer: we die; equal: we both die; shorter: they die). One BFS over
+# (cell, group) states, seeded from every opponent head plus our own, gives
+# the earliest turn each group (and we) can reach every cell. The work is
+# four waves over the board however many snakes there are.
+#
+# From that, each cell gets a danger level relative to when we can get there.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from typing import List, Sequence, Tuple
+
+from grid import Grid
+
+LONGER, EQUAL, SHORTER, US = 0, 1, 2, 3
+
+SAFE, TIE, DEADLY = 0, 1, 2
+
+
+class ThreatModel:
+    """
+      arrival(group)[i]: earliest turn any snake of `group` can reach cell i (-1 if never)
+      danger[i]:         DEADLY if a longer opponent can be on i no later than us,
+                         TIE if an equal-length one can, else SAFE
+    """
+
+    __slots__ = ("grid", "danger", "_arrival")
+
+    def __init__(self, grid: Grid, blocked: bytearray, my_head: int, my_length: int,
+                 opponents: Sequence[Tuple[int, int]]):
+        self.grid = grid
+        size = grid.size
+        nbrs = grid.neighbours
+        arrival = [-1] * (4 * size)
+        queue: List[int] = []
+
+        def seed(group: int, cell: int):
+            s = group * size + cell
+            if arrival[s] < 0:
+                arrival[s] = 0
+                queue.append(s)
+
+        for head, length in opponents:
+            seed(LONGER if length > my_length else EQUAL if length == my_length else SHORTER, head)
+        seed(US, my_head)
+
+        j = 0
+        while j < len(queue):
+            s = queue[j]
+            j += 1
+            base = s - s % size
+            d = arrival[s] + 1
+            for u in nbrs[s - base]:
+                t = base + u
+                if arrival[t] < 0 and not blocked[u]:
+                    arrival[t] = d
+                    queue.append(t)
+
+        danger = bytearray(size)
+        longer = LONGER * size
+        equal = EQUAL * size
+        us = US * size
+        for i in range(size):
+            t = arrival[us + i]
+            if t < 0:
+                continue
+            a = arrival[longer + i]
+            if 0 <= a <= t:
+                danger[i] = DEADLY
+                continue
+            a = arrival[equal + i]
+            if 0 <= a <= t:
+                danger[i] = TIE
+
+        self.danger = danger
+        self._arrival = arrival
+
+    def __repr__(self):
+        return f"<ThreatModel {self.grid.width}x{self.grid.height} deadly={self.danger.count(DEADLY)}>"
+
+    def arrival(self, group: int) -> List[int]:
+        size = self.grid.size
+        return self._arrival[group * size:(group + 1) * size]
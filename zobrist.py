@@ -0,0 +1,177 @@
+# zobrist.py
+# -----------------------------------------------------------------------------
+# Zobrist hashing of board positions and a fixed-size transposition table.
+#
+# A position's key is the XOR of one random 64-bit word per feature:
+#   - each link of a snake's body: a segment's cell and the direction to the
+#     next segment (per snake slot), so segment order and the tail are keyed
+#   - each snake's head cell, length and health bucket (per snake slot)
+#   - each food cell
+#   - each hazard cell, when the caller folds them in (hazards())
+# Snakes are identified by slot (0 = us, then opponents in id order) so the
+# same arrangement hashes the same whatever the ids. A stacked tail links a
+# cell to itself; repeated links cancel out, and the length word tells how
+# many there were. Keys can be updated incrementally from a parent position
+# to its child, touching only the links that changed.
+# -----------------------------------------------------------------------------
+
+from __future__ import annotations
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import random
+
+from rules import MAX_HEALTH, Position, Snake
+
+HEALTH_BUCKET = 10  # health // 10; the planner's "hungry below 30" falls on a boundary
+MAX_SLOTS = 8
+
+
+def health_bucket(health: int) -> int:
+    return max(0, min(health, MAX_HEALTH)) // HEALTH_BUCKET
+
+
+def snake_slots(position: Position, you: str) -> Dict[str, int]:
+    """Slot of every snake: us first, then opponents by id."""
+    others = sorted(s.id for s in position.snakes if s.id != you)
+    return {sid: i for i, sid in enumerate([you] + others)}
+
+
+class Zobrist:
+    """
+    Random key tables for one board size. link[slot][c * 5 + d] keys a body
+    segment on cell c whose next segment lies in direction d (up, down, left,
+    right, or the same cell for a stacked tail).
+    """
+
+    __slots__ = ("size", "link", "direction", "head", "length", "health", "food", "hazard")
+
+    def __init__(self, width: int, height: int, seed: int = 0x5EED):
+        rng = random.Random(seed ^ (width << 16) ^ height)
+        size = width * height
+        word = lambda: rng.getrandbits(64)
+        self.size = size
+        self.link = [[word() for _ in range(5 * size)] for _ in range(MAX_SLOTS)]
+        self.direction = {1: 0, -1: 1, -height: 2, height: 3, 0: 4}
+        self.head = [[word() for _ in range(size)] for _ in range(MAX_SLOTS)]
+        self.length = [[word() for _ in range(size + 2)] for _ in range(MAX_SLOTS)]
+        self.health = [[word() for _ in range(MAX_HEALTH // HEALTH_BUCKET + 1)] for _ in range(MAX_SLOTS)]
+        self.food = [word() for _ in range(size)]
+        self.hazard = [word() for _ in range(size)]
+
+    def _link(self, slot: int, a: int, b: int) -> int:
+        return self.link[slot][a * 5 + self.direction.get(b - a, 4)]
+
+    def _snake(self, slot: int, s: Snake) -> int:
+        body = s.body
+        k = self.head[slot][s.head] ^ self.length[slot][min(len(body), self.size + 1)]
+        k ^= self.health[slot][health_bucket(s.health)]
+        for i in range(len(body) - 1):
+            k ^= self._link(slot, body[i], body[i + 1])
+        return k
+
+    def position(self, position: Position, slots: Dict[str, int]) -> int:
+        """Full key of `position`."""
+        k = 0
+        for s in position.snakes:
+            slot = slots.get(s.id)
+            if slot is not None and slot < MAX_SLOTS:
+                k ^= self._snake(slot, s)
+        for c in position.food:
+            k ^= self.food[c]
+        return k
+
+    def hazards(self, cells: Iterable[int]) -> int:
+        """Key words of hazard `cells`, to XOR into a position's key."""
+        k = 0
+        for c in cells:
+            k ^= self.hazard[c]
+        return k
+
+    def step(self, key: int, parent: Position, child: Position, slots: Dict[str, int]) -> int:
+        """Key of `child` (one Position.step after `parent`) from the parent's key."""
+        survivors = {s.id: s for s in child.snakes}
+        for old in parent.snakes:
+            slot = slots.get(old.id)
+            if slot is None or slot >= MAX_SLOTS:
+                continue
+            new = survivors.get(old.id)
+            if new is None:
+                key ^= self._snake(slot, old)
+                continue
+            ob, nb = old.body, new.body
+            if len(ob) < 2 or len(nb) < 2 or nb[1] != ob[0]:
+                key ^= self._snake(slot, old) ^ self._snake(slot, new)
+                continue
+            key ^= self.head[slot][old.head] ^ self.head[slot][new.head]
+            lengths = self.length[slot]
+            key ^= lengths[min(len(ob), self.size + 1)] ^ lengths[min(len(nb), self.size + 1)]
+            healths = self.health[slot]
+            key ^= healths[health_bucket(old.health)] ^ healths[health_bucket(new.health)]
+            # The body moved up one segment: a link at the head, the old last
+            # link gone, and after eating a stacked link at the tail
+            key ^= self._link(slot, nb[0], nb[1]) ^ self._link(slot, ob[-2], ob[-1])
+            if len(nb) > len(ob):
+                key ^= self._link(slot, nb[-2], nb[-1])
+        if child.food is not parent.food:
+            for c in parent.food.symmetric_difference(child.food):
+                key ^= self.food[c]
+        return key
+
+
+@lru_cache(maxsize=None)
+def get_zobrist(width: int, height: int) -> Zobrist:
+    return Zobrist(width, height)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Transposition table
+# ──────────────────────────────────────────────────────────────────────────────
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class TranspositionTable:
+    """
+    Fixed number of slots (2 ** bits), so memory is bounded up front. Each key
+    maps to one slot; on a clash the newcomer replaces the resident entry if
+    the resident came from an earlier search (new_search) or was searched no
+    deeper. Lookups check the full key, so clashes never return wrong data.
+    A slot holds (key, generation, entry) as one tuple, replaced in a single
+    store, so a lookup racing a store on another thread sees one or the other.
+    """
+
+    __slots__ = ("_mask", "_slots", "generation", "hits", "misses")
+
+    def __init__(self, bits: int = 14):
+        n = 1 << bits
+        self._mask = n - 1
+        self._slots: List[Optional[Tuple[int, int, Tuple[int, int, float, Optional[str]]]]] = [None] * n
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._slots) - self._slots.count(None)
+
+    def clear(self) -> None:
+        self._slots = [None] * len(self._slots)
+
+    def new_search(self) -> None:
+        """Age every stored entry so fresh results may replace them."""
+        self.generation += 1
+
+    def lookup(self, key: int) -> Optional[Tuple[int, int, float, Optional[str]]]:
+        """(depth, flag, value, best move) stored for `key`, or None."""
+        slot = self._slots[key & self._mask]
+        if slot is not None and slot[0] == key:
+            self.hits += 1
+            return slot[2]
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, flag: int, value: float, move: Optional[str] = None) -> None:
+        i = key & self._mask
+        resident = self._slots[i]
+        if resident is not None and resident[0] != key and resident[1] == self.generation and resident[2][0] > depth:
+            return
+        self._slots[i] = (key, self.generation, (depth, flag, value, move))